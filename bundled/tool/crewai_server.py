@@ -39,6 +39,24 @@ except ImportError:
     except ImportError:
         print("Could not import indexer module, codebase indexing will be disabled")
 
+# Import the event bus used to push events to subscribed clients
+try:
+    from .mightydev.events import EventBus
+except ImportError:
+    from mightydev.events import EventBus
+
+# Import the shared embedding service used for crew memory
+try:
+    from .mightydev.embeddings import crew_embedder_config, embedding_service
+except ImportError:
+    from mightydev.embeddings import crew_embedder_config, embedding_service
+
+# Import the packer that puts relevant code from the index into agent prompts
+try:
+    from .mightydev.context import ContextPacker
+except ImportError:
+    from mightydev.context import ContextPacker
+
 # Check for different virtual environments
 venv_paths = [
     # Custom crewai_venv for Python 3.13
@@ -133,12 +151,25 @@ class CrewAIServer:
         # Agent performance metrics
         self.agent_performance = {} # agent_id -> performance metrics
 
+        # Events pushed to clients that sent a "subscribe" command
+        self.events = EventBus()
+
         # Initialize codebase indexer if available
         self.codebase_indexer = None
+        self.context_packer = None
         try:
-            from mightydev.indexer import CodebaseIndexer
-            self.codebase_indexer = CodebaseIndexer(workspace_root=project_path)
-            logger.info(f"Initialized CodebaseIndexer for workspace: {project_path}")
+            from mightydev.sharding import create_indexer
+            # One database per package when MIGHTYDEV_INDEX_SHARDS is "auto" or "on"
+            self.codebase_indexer = create_indexer(project_path)
+            logger.info(f"Initialized {type(self.codebase_indexer).__name__} for workspace: {project_path}")
+            
+            # Code context for agent prompts, within MIGHTYDEV_CONTEXT_TOKENS tokens
+            self.context_packer = ContextPacker(self.codebase_indexer)
+            
+            # Continue an indexing job the previous server process didn't finish
+            job = self.codebase_indexer.resume_index_job(self._index_progress_callback())
+            if job:
+                logger.info(f"Resumed interrupted indexing job {job.id}")
         except ImportError:
             logger.warning("CodebaseIndexer not available - codebase indexing will be disabled")
         except Exception as e:
@@ -1690,38 +1721,21 @@ class CrewAIServer:
 
             # Create the CrewAI Crew with extra error handling
             try:
-                # Set up embeddings for the crew
-                try:
-                    from langchain_huggingface import HuggingFaceEmbeddings
-                    sentence_transformer_model = "all-MiniLM-L6-v2"
-                    # Create embedder config dictionary instead of passing the object directly
-                    embedder_config = {
-                        "provider": "huggingface",
-                        "model": sentence_transformer_model
-                    }
-                    logger.info(f"Created sentence-transformers embeddings config with model {sentence_transformer_model} for crew")
-                except ImportError:
-                    logger.warning("Could not import HuggingFaceEmbeddings - will use default embeddings")
-                    embedder_config = None
-
-                # Create crew with embeddings if available
-                if embedder_config:
-                    crew = Crew(
-                        agents=agents,
-                        tasks=tasks,
-                        verbose=True,
-                        process=Process.sequential,
-                        memory=True,
-                        embedder=embedder_config,
-                    )
+                # Embed crew memory with the process-wide service of the bundled model
+                embedder_config = crew_embedder_config()
+                if embedder_config["provider"] == "custom":
+                    logger.info("Using the shared embedding service for crew memory")
                 else:
-                    crew = Crew(
-                        agents=agents,
-                        tasks=tasks,
-                        verbose=True,
-                        process=Process.sequential,
-                        memory=True,
-                    )
+                    logger.warning(f"Shared embedding service unavailable - using the {embedder_config['provider']} embedder with model {embedder_config['model']}")
+
+                crew = Crew(
+                    agents=agents,
+                    tasks=tasks,
+                    verbose=True,
+                    process=Process.sequential,
+                    memory=True,
+                    embedder=embedder_config,
+                )
 
                 # Store the crew
                 self.crews[crew_id] = crew
@@ -2944,6 +2958,47 @@ class CrewAIServer:
             }
         }
 
+    def _index_progress_callback(self, payload=None):
+        """
+        Build the progress callback of an indexing job
+
+        Progress is pushed to clients subscribed to "codebase_index." events, and
+        passed to payload["progress_callback"] when one is given.
+
+        Args:
+            payload (dict): Request payload of the index action, if any
+
+        Returns:
+            callable: (processed_files, total_files, current_file) callback
+        """
+        def progress_callback(processed_files, total_files, current_file=None):
+            # If a progress_callback was provided in the payload, call it
+            if payload and callable(payload.get("progress_callback")):
+                payload["progress_callback"]({
+                    "processed_files": processed_files,
+                    "total_files": total_files,
+                    "current_file": current_file
+                })
+            
+            # Push progress to subscribed clients; the indexer already limits
+            # how often this runs, so every call is forwarded
+            job = self.codebase_indexer.get_index_job()
+            self.events.publish("codebase_index.progress", {
+                "job_id": job.id if job else None,
+                "processed_files": processed_files,
+                "total_files": total_files,
+                "current_file": current_file or ""
+            })
+            logger.debug(f"Indexing progress: {processed_files}/{total_files} files - Current: {current_file}")
+        
+        return progress_callback
+
+    def _watch_after_job(self, job):
+        """Start watching the workspace once an indexing job has completed"""
+        job.thread.join()
+        if job.state == "completed":
+            self.codebase_indexer.start_watching()
+
     def handle_codebase_index(self, payload):
         """
         Handle codebase indexing operations
@@ -2985,66 +3040,114 @@ class CrewAIServer:
                     }
             
             elif action == "index":
-                # Perform indexing of the codebase
-                force = payload.get("force", False)
-                max_file_size = payload.get("max_file_size", 1024 * 1024)  # Default 1MB
-                with_progress = payload.get("with_progress", False)
+                # Index the codebase on a background job and return its id right away
+                options = {
+                    "force": payload.get("force", False),
+                    "max_file_size": payload.get("max_file_size", 1024 * 1024),  # Default 1MB
+                    "parse_mode": payload.get("parse_mode")  # "thread" or "process"
+                }
+                job, started = self.codebase_indexer.start_index_job(
+                    progress_callback=self._index_progress_callback(payload),
+                    **options
+                )
                 
-                # If progress tracking is requested, use the progress callback
-                if with_progress:
-                    # Define a progress callback that will send progress to the UI
-                    def progress_callback(processed_files, total_files, current_file=None):
-                        # If a progress_callback was provided in the payload, call it
-                        if callable(payload.get("progress_callback")):
-                            payload["progress_callback"]({
-                                "processed_files": processed_files,
-                                "total_files": total_files,
-                                "current_file": current_file
-                            })
-                        
-                        # Skip simulated progress - don't report to UI
-                        if current_file and ("Simulated" in current_file or "simulation" in current_file):
-                            return
-                            
-                        # Print progress directly to stdout where the extension can capture it
-                        try:
-                            # Create JSON data that the extension can parse
-                            progress_data = {
-                                "processed_files": processed_files,
-                                "total_files": total_files,
-                                "current_file": current_file or ""
-                            }
-                            
-                            # Print with special marker that the extension will look for
-                            # This will be captured by the extension process
-                            message = f"PROGRESS_UPDATE: {json.dumps(progress_data)}"
-                            print(message, flush=True)
-                            # Add a newline to ensure messages don't get combined
-                            sys.stdout.flush()
-                            print(f"DEBUG_INDEXER: Sent progress update: {processed_files}/{total_files}", flush=True)
-                            
-                            # Also log progress for diagnostics
-                            progress_pct = int(processed_files/max(total_files, 1)*100)
-                            logger.info(f"Indexing progress: {processed_files}/{total_files} files ({progress_pct}%) - Current: {current_file}")
-                        except Exception as e:
-                            logger.error(f"Error sending progress update: {e}")
-                    
-                    # Call index_workspace with progress tracking
-                    success = self.codebase_indexer.index_workspace(
-                        force=force, 
-                        max_file_size=max_file_size,
-                        progress_callback=progress_callback
+                # Optionally keep the index fresh once the job is done
+                if payload.get("watch", False):
+                    watcher = threading.Thread(target=self._watch_after_job, args=(job,), daemon=True)
+                    watcher.start()
+                
+                # Callers that need the finished index can still wait for it
+                if payload.get("wait", False):
+                    job.thread.join()
+                    success = job.state == "completed"
+                    return {
+                        "status": "success" if success else "error",
+                        "message": "Indexing completed successfully" if success else f"Indexing {job.state}",
+                        "job": job.to_dict(),
+                        "index_status": self.codebase_indexer.get_index_status()
+                    }
+                
+                return {
+                    "status": "success",
+                    "message": "Indexing started" if started else "Indexing is already running",
+                    "job_id": job.id,
+                    "job": job.to_dict()
+                }
+            
+            elif action == "job_status":
+                # State and progress of a background indexing job (default: the latest)
+                job = self.codebase_indexer.get_index_job(payload.get("job_id"))
+                if job is None:
+                    return {"status": "error", "message": "No such indexing job"}
+                return {
+                    "status": "success",
+                    "job": job.to_dict(),
+                    "index_status": self.codebase_indexer.get_index_status()
+                }
+            
+            elif action == "cancel":
+                # Stop a background indexing job after the files in flight
+                job = self.codebase_indexer.cancel_index_job(payload.get("job_id"))
+                if job is None:
+                    return {"status": "error", "message": "No such indexing job"}
+                return {
+                    "status": "success",
+                    "message": "Indexing job cancelled" if not job.done else f"Indexing job already {job.state}",
+                    "job": job.to_dict()
+                }
+                
+            elif action == "prioritize":
+                # Files opened or saved in the editor are indexed ahead of the rest
+                paths = payload.get("paths") or ([payload["file_path"]] if payload.get("file_path") else [])
+                if not paths:
+                    return {"status": "error", "message": "paths is required for prioritize"}
+                counts = self.codebase_indexer.prioritize_files(paths, reindex=payload.get("reindex", True))
+                return {"status": "success", **counts}
+                
+            elif action == "export_snapshot":
+                # Portable, content-hash keyed copy of the index for other machines and CI
+                path = payload.get("path")
+                if path and not os.path.isabs(path):
+                    path = os.path.join(self.codebase_indexer.workspace_root, path)
+                info = self.codebase_indexer.export_snapshot(path, compress=payload.get("compress", True))
+                if info is None:
+                    return {"status": "error", "message": "Failed to export snapshot, see the server log"}
+                return {"status": "success", "snapshot": info}
+                
+            elif action == "import_snapshot":
+                # Take unchanged files from a snapshot, then index only what differs
+                path = payload.get("path")
+                if path and not os.path.isabs(path):
+                    path = os.path.join(self.codebase_indexer.workspace_root, path)
+                try:
+                    counts = self.codebase_indexer.import_snapshot(path)
+                except (OSError, ValueError) as e:
+                    return {"status": "error", "message": f"Cannot import snapshot: {e}"}
+                if counts is None:
+                    return {"status": "error", "message": "Indexing is in progress, try again when it is done"}
+                result = {"status": "success", **counts}
+                if payload.get("reindex", True):
+                    job, _ = self.codebase_indexer.start_index_job(
+                        progress_callback=self._index_progress_callback(payload)
                     )
-                else:
-                    # Call without progress tracking
-                    success = self.codebase_indexer.index_workspace(force=force, max_file_size=max_file_size)
+                    result["job_id"] = job.id
+                return result
+                
+            elif action == "watch":
+                # Start or stop incremental reindexing on file changes
+                enabled = payload.get("enabled", True)
                 
-                index_status = self.codebase_indexer.get_index_status()
+                if enabled:
+                    success = self.codebase_indexer.start_watching(
+                        debounce=payload.get("debounce", 0.2)
+                    )
+                else:
+                    self.codebase_indexer.stop_watching()
+                    success = True
                 
                 return {
                     "status": "success" if success else "error",
-                    "message": "Indexing completed successfully" if success else "Indexing failed",
-                    "index_status": index_status
+                    "watching": self.codebase_indexer.get_index_status()["watching"]
                 }
                 
             elif action == "search":
@@ -3052,6 +3155,7 @@ class CrewAIServer:
                 query = payload.get("query")
                 symbol_type = payload.get("symbol_type")
                 language = payload.get("language")
+                path_glob = payload.get("path_glob")
                 limit = payload.get("limit", 100)
                 
                 if not query:
@@ -3061,15 +3165,60 @@ class CrewAIServer:
                     query=query,
                     symbol_type=symbol_type,
                     language=language,
-                    limit=limit
+                    limit=limit,
+                    path_glob=path_glob,
+                    fields=payload.get("fields"),
+                    cursor=payload.get("cursor")
                 )
                 
+                return {
+                    "status": "success",
+                    "symbols": symbols,
+                    "count": len(symbols),
+                    "next_cursor": getattr(symbols, "next_cursor", None)
+                }
+                
+            elif action == "fuzzy_search":
+                # Fuzzy "go to symbol" search (prefix, substring or camelCase abbreviation)
+                query = payload.get("query")
+                limit = payload.get("limit", 20)
+                
+                if not query:
+                    return {"status": "error", "message": "Query parameter is required"}
+                    
+                symbols = self.codebase_indexer.fuzzy_search(query=query, limit=limit)
+                
                 return {
                     "status": "success",
                     "symbols": symbols,
                     "count": len(symbols)
                 }
                 
+            elif action == "semantic_search":
+                # Search symbols by meaning with the bundled embedding model, fully offline
+                query = payload.get("query")
+                if not query:
+                    return {"status": "error", "message": "Query parameter is required"}
+                
+                try:
+                    symbols = self.codebase_indexer.semantic_search(
+                        query=query,
+                        limit=payload.get("limit", 20),
+                        symbol_type=payload.get("symbol_type"),
+                        language=payload.get("language"),
+                        wait=payload.get("wait", False)
+                    )
+                except RuntimeError as e:
+                    # The model or numpy isn't installed
+                    return {"status": "error", "message": f"Semantic search unavailable: {e}"}
+                
+                return {
+                    "status": "success",
+                    "symbols": symbols,
+                    "count": len(symbols),
+                    "semantic_index": self.codebase_indexer.get_semantic_status()
+                }
+                
             elif action == "find_references":
                 # Find references to a symbol
                 symbol_name = payload.get("symbol_name")
@@ -3080,13 +3229,17 @@ class CrewAIServer:
                     
                 references = self.codebase_indexer.find_references(
                     symbol_name=symbol_name,
-                    file_path=file_path
+                    file_path=file_path,
+                    limit=payload.get("limit", 1000),
+                    fields=payload.get("fields"),
+                    cursor=payload.get("cursor")
                 )
                 
                 return {
                     "status": "success",
                     "references": references,
-                    "count": len(references)
+                    "count": len(references),
+                    "next_cursor": getattr(references, "next_cursor", None)
                 }
                 
             elif action == "get_dependencies":
@@ -3119,6 +3272,24 @@ class CrewAIServer:
                     "count": len(dependents)
                 }
                 
+            elif action in ("transitive_dependents", "transitive_dependencies"):
+                # Impact analysis over the resolved import graph
+                file_path = payload.get("file_path") or payload.get("module_name")
+                
+                if not file_path:
+                    return {"status": "error", "message": "file_path parameter is required"}
+                
+                if action == "transitive_dependents":
+                    files = self.codebase_indexer.transitive_dependents(file_path)
+                else:
+                    files = self.codebase_indexer.transitive_dependencies(file_path)
+                
+                return {
+                    "status": "success",
+                    "files": files,
+                    "count": len(files)
+                }
+                
             elif action == "get_file_symbols":
                 # Get symbols defined in a file
                 file_path = payload.get("file_path")
@@ -3126,12 +3297,18 @@ class CrewAIServer:
                 if not file_path:
                     return {"status": "error", "message": "file_path parameter is required"}
                     
-                symbols = self.codebase_indexer.get_file_symbols(file_path)
+                symbols = self.codebase_indexer.get_file_symbols(
+                    file_path,
+                    fields=payload.get("fields"),
+                    limit=payload.get("limit"),
+                    cursor=payload.get("cursor")
+                )
                 
                 return {
                     "status": "success",
                     "symbols": symbols,
-                    "count": len(symbols)
+                    "count": len(symbols),
+                    "next_cursor": getattr(symbols, "next_cursor", None)
                 }
                 
             elif action == "get_symbol_by_location":
@@ -3168,6 +3345,14 @@ class CrewAIServer:
                     "index_status": status
                 }
                 
+            elif action == "metrics":
+                # Per-phase indexing counters, latency histograms and the last run's throughput
+                return {
+                    "status": "success",
+                    "metrics": self.codebase_indexer.get_metrics(),
+                    "embedding_service": embedding_service().stats()
+                }
+                
             else:
                 return {"status": "error", "message": f"Unknown codebase index action: {action}"}
                 
@@ -3985,6 +4170,28 @@ class CrewAIServer:
             "data": conflicts
         }
 
+    def _pack_code_context(self, message):
+        """
+        Code from the codebase index relevant to a message, for the agent prompt
+
+        Args:
+            message (str): Message to an agent
+
+        Returns:
+            str: Markdown with the code, or "" if there is none or no index
+        """
+        if not self.context_packer or not message:
+            return ""
+        try:
+            packed = self.context_packer.pack(message)
+        except Exception as e:
+            logger.warning(f"Could not pack code context for message: {e}")
+            return ""
+        if packed.text:
+            logger.info(f"Packed {len(packed.symbols)} of {packed.candidates} candidate symbols "
+                        f"({packed.tokens} tokens) into the prompt in {packed.elapsed:.3f} seconds")
+        return packed.text
+
     def send_message_to_agent(self, agent_id, message, is_group=False, metadata=None, direct_to=None):
         """
         Send a message to an agent or a group of agents. You can use agent_id
@@ -4063,6 +4270,9 @@ class CrewAIServer:
                 # Modify message to indicate it's for the whole team
                 team_message = f"[TEAM MESSAGE] The user has sent the following message to the entire team. " \
                              f"Provide a response on behalf of the team: {message}"
+                code_context = self._pack_code_context(message)
+                if code_context:
+                    team_message = f"{code_context}\n{team_message}"
 
                 # Create a task for the agent to process the team message
                 task = Task(
@@ -4256,6 +4466,14 @@ You can access these tools by mentioning them in your responses. Remember that y
 """
                     task_description = f"{character_story}\n\nProcess the following message and respond appropriately: {message}"
 
+                    # Put the relevant code in the prompt once, rather than leaving the agent to look it up
+                    code_context = self._pack_code_context(message)
+                    if code_context:
+                        task_description = (
+                            f"{character_story}\n\n{code_context}\n"
+                            f"Process the following message and respond appropriately: {message}"
+                        )
+
                     # Log that we added the character story
                     logger.info(f"Added character story for {agent_name} to task description")
 
@@ -4372,35 +4590,18 @@ You can access these tools by mentioning them in your responses. Remember that y
 
                 # Create a temporary crew with just this agent and task
                 # Tools are now attached directly to the task, following task-based approach
-                # Set up embeddings for the crew's memory
-                try:
-                    from langchain_huggingface import HuggingFaceEmbeddings
-                    sentence_transformer_model = "all-MiniLM-L6-v2"
-                    # Create embedder config dictionary instead of passing the object directly
-                    embedder_config = {
-                        "provider": "huggingface",
-                        "model": sentence_transformer_model
-                    }
-                    logger.info(f"Created embeddings config with model {sentence_transformer_model} for message handling")
-
-                    temp_crew = Crew(
-                        agents=[agent],
-                        tasks=[task],
-                        verbose=True,
-                        process=Process.sequential,
-                        memory=True,
-                        embedder=embedder_config
-                    )
-                except ImportError:
-                    logger.warning("Could not import HuggingFaceEmbeddings - using default memory")
-
-                    temp_crew = Crew(
-                        agents=[agent],
-                        tasks=[task],
-                        verbose=True,
-                        process=Process.sequential,
-                        memory=True
-                    )
+                # Set up embeddings for the crew's memory, shared with every other crew
+                embedder_config = crew_embedder_config()
+                if embedder_config["provider"] != "custom":
+                    logger.warning(f"Shared embedding service unavailable - using the {embedder_config['provider']} embedder with model {embedder_config['model']}")
+                temp_crew = Crew(
+                    agents=[agent],
+                    tasks=[task],
+                    verbose=True,
+                    process=Process.sequential,
+                    memory=True,
+                    embedder=embedder_config
+                )
 
                 # Run the crew to get the response
                 response = temp_crew.kickoff()
@@ -4866,6 +5067,11 @@ def handle_client(client_socket, server):
         request_str = data.decode('utf-8').strip()
         request = json.loads(request_str)
 
+        # Subscriptions keep the connection open and stream events
+        if (request.get("command") or "").lower() == "subscribe":
+            stream_events(client_socket, server, request.get("payload") or {})
+            return
+
         # Handle the request
         response = server.handle_request(request)
 
@@ -4884,6 +5090,42 @@ def handle_client(client_socket, server):
         # Close the client socket
         client_socket.close()
 
+def stream_events(client_socket, server, payload, heartbeat=15.0):
+    """
+    Stream server events to a subscribed client until it disconnects
+
+    The client sends {"command": "subscribe", "payload": {"topics": [...]}} and
+    receives one acknowledgement line, then one line per event:
+    {"event": topic, "data": {...}}. Topics ending in "." match a prefix, e.g.
+    "codebase_index."; no topics subscribes to everything. A heartbeat event
+    is sent when nothing happened for a while, which also detects clients
+    that went away.
+
+    Args:
+        client_socket: Connected client socket
+        server: CrewAIServer whose events are streamed
+        payload: Subscribe payload
+        heartbeat: Seconds between heartbeats on an idle connection
+    """
+    topics = payload.get("topics") or None
+    subscription = server.events.subscribe(topics)
+    logger.info(f"Client subscribed to events: {topics or 'all'}")
+    try:
+        client_socket.sendall(json.dumps({"status": "success", "topics": topics}).encode('utf-8') + b'\n')
+        while True:
+            events = subscription.get(timeout=heartbeat)
+            if not events:
+                events = [("heartbeat", {"dropped": subscription.dropped})]
+            lines = b''.join(
+                json.dumps({"event": topic, "data": data}).encode('utf-8') + b'\n'
+                for topic, data in events
+            )
+            client_socket.sendall(lines)
+    except OSError as e:
+        logger.info(f"Event subscriber disconnected: {e}")
+    finally:
+        subscription.close()
+
 def cleanup_resources(server_socket, port_file, pid_file):
     """Cleanup function to release resources on exit"""
     logger.info("Cleaning up server resources...")
@@ -8,8 +8,10 @@ import json
 import os
 import pathlib
 import re
+import socket
 import sys
 import sysconfig
+import threading
 import traceback
 from typing import Any, Optional, Sequence
 
@@ -85,6 +87,7 @@ def did_open(params: lsp.DidOpenTextDocumentParams) -> None:
     document = LSP_SERVER.workspace.get_document(params.text_document.uri)
     # We don't publish any diagnostics here - empty list
     LSP_SERVER.publish_diagnostics(document.uri, [])
+    _prioritize_in_index(document)
 
 
 @LSP_SERVER.feature(lsp.TEXT_DOCUMENT_DID_SAVE)
@@ -93,6 +96,7 @@ def did_save(params: lsp.DidSaveTextDocumentParams) -> None:
     document = LSP_SERVER.workspace.get_document(params.text_document.uri)
     # We don't publish any diagnostics here - empty list
     LSP_SERVER.publish_diagnostics(document.uri, [])
+    _prioritize_in_index(document)
 
 
 @LSP_SERVER.feature(lsp.TEXT_DOCUMENT_DID_CLOSE)
@@ -102,6 +106,32 @@ def did_close(params: lsp.DidCloseTextDocumentParams) -> None:
     # Publishing empty diagnostics to clear the entries for this file.
     LSP_SERVER.publish_diagnostics(document.uri, [])
 
+def _prioritize_in_index(document: workspace.Document) -> None:
+    """Ask the CrewAI server to index a file the user is working on ahead of the rest."""
+    key = _get_document_key(document) if document.path else None
+    if key is None:
+        return
+    port_file = os.path.join(key, ".tribe", "server_port.txt")
+
+    def send() -> None:
+        try:
+            with open(port_file, encoding="utf-8") as f:
+                port = int(f.read().strip())
+            request = {
+                "command": "codebase_index",
+                "payload": {"action": "prioritize", "paths": [document.path]},
+            }
+            with socket.create_connection(("localhost", port), timeout=2) as client:
+                client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                client.recv(4096)
+        except (OSError, ValueError):
+            # The CrewAI server isn't running; the next full index picks the file up
+            pass
+
+    # Never hold up the LSP request loop on the CrewAI server
+    threading.Thread(target=send, daemon=True).start()
+
+
 # MightyDev doesn't use traditional formatting features
 # Instead, we use AI agents to handle code transformations
 
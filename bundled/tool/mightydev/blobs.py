@@ -0,0 +1,113 @@
+"""
+Content-addressed blob store for indexed file contents.
+
+Symbols only record byte offsets into their file; their code is sliced from
+the file on demand. When a file has changed since it was indexed, the
+offsets no longer match its current content, so the indexed content is also
+kept here, zlib-compressed and keyed by its content hash, in a two-level
+directory layout (ab/cdef...) next to the index database.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import zlib
+from typing import Iterable, Optional
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Compressed file contents keyed by content hash"""
+
+    def __init__(self, root: str, level: int = 6):
+        """
+        Args:
+            root: Directory holding the blobs
+            level: zlib compression level
+        """
+        self.root = root
+        self.level = level
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash[2:])
+
+    def put(self, content_hash: str, data: bytes) -> bool:
+        """
+        Store a blob unless it is already present
+
+        Writes go to a temporary file that is renamed into place, so readers
+        (and concurrent writers of the same content) never see a partial blob.
+
+        Returns:
+            True if the blob was written
+        """
+        path = self._path(content_hash)
+        if os.path.exists(path):
+            return False
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(zlib.compress(data, self.level))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return True
+        except OSError as e:
+            logger.error(f"Error storing blob {content_hash}: {e}")
+            return False
+
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """Load a blob, or None if it is missing or corrupt"""
+        try:
+            with open(self._path(content_hash), 'rb') as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error) as e:
+            logger.error(f"Error reading blob {content_hash}: {e}")
+            return None
+
+    def gc(self, live_hashes: Iterable[str]) -> int:
+        """
+        Delete blobs that no indexed file refers to any more
+
+        Args:
+            live_hashes: Content hashes still referenced by the index
+
+        Returns:
+            Number of blobs deleted
+        """
+        live = set(live_hashes)
+        deleted = 0
+        try:
+            prefixes = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0
+        for prefix in prefixes:
+            directory = os.path.join(self.root, prefix)
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                if prefix + name in live or name.startswith('.tmp-'):
+                    continue
+                try:
+                    os.unlink(os.path.join(directory, name))
+                    deleted += 1
+                except OSError:
+                    continue
+        if deleted:
+            logger.info(f"Removed {deleted} unreferenced blobs")
+        return deleted
+
+    def clear(self):
+        """Delete every blob"""
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,406 @@
+"""
+Code context for agent prompts.
+
+ContextPacker turns a message into a block of relevant code to put in the
+prompt, so an agent doesn't have to spend tool calls reading and searching
+files first. Candidates come from the codebase index:
+
+- lexical: symbols whose names match identifiers, backticked spans and words
+  of the message, and the top-level symbols of files it names
+- structural: the class of a matching method, the members of a matching
+  class, and the functions that call a matching symbol
+
+Candidates are ranked, and their code is added best first until the token
+budget is spent; a symbol too long for what is left is cut short. Tokens are
+counted with the bundled model's WordPiece tokenizer, which tracks the
+tokenizers of the LLMs closely enough to budget with.
+"""
+
+import logging
+import os
+import re
+import time
+import unicodedata
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .embeddings import DEFAULT_MODEL_DIR
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = 2000
+
+# Symbol fields the packer needs (code is read from the file when chosen)
+_FIELDS = ['name', 'type', 'path', 'line_start', 'line_end', 'signature', 'parent']
+
+# Words too common in messages to search for
+_STOPWORDS = frozenset('''
+a about above after again all also an and any are as at be because been before being below between both but by
+can could did do does doing done down during each few for from further get had has have having help here how i if
+in into is it its just like make me more most my need no not now of off on once only or other our out over own
+please same should show so some such than that the their them then there these they this those through to too
+under until up use using very want was way we were what when where which while who why will with would you your
+code file function method class fix add change update bug error work works working does return returns
+'''.split())
+
+# Relative weights of where a candidate came from
+_WEIGHT_EXACT = 3.0
+_WEIGHT_CASELESS = 2.0
+_WEIGHT_MATCH = 1.0
+_WEIGHT_FILE = 2.0
+_WEIGHT_PARENT = 0.3
+_WEIGHT_MEMBER = 0.4
+_WEIGHT_CALLER = 0.25
+# Callers are only looked up for names with at most this many references
+_MAX_REFERENCES = 30
+# Multipliers for a symbol whose class or file the message also names, and for test code
+_BOOST_PARENT_NAMED = 2.0
+_BOOST_FILE_NAMED = 1.5
+_PENALTY_TEST = 0.5
+# Candidates scoring less are left out; a plain word must match a name exactly
+_MIN_SCORE = 2.0
+
+_FENCE_LANGUAGES = {
+    '.py': 'python', '.js': 'javascript', '.jsx': 'jsx', '.ts': 'typescript', '.tsx': 'tsx',
+    '.java': 'java', '.go': 'go', '.rs': 'rust', '.rb': 'ruby', '.c': 'c', '.h': 'c', '.cpp': 'cpp',
+    '.cs': 'csharp', '.php': 'php', '.swift': 'swift', '.kt': 'kotlin',
+}
+
+
+class TokenCounter:
+    """
+    Counts tokens with the tokenizer of the bundled model
+
+    Uses the tokenizers library with tokenizer.json when it is installed, and
+    otherwise the same lowercasing BERT WordPiece over vocab.txt in Python.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None):
+        """
+        Args:
+            model_dir: Directory of the model (defaults to bundled/model)
+        """
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self._tokenizer = None
+        self._vocab: Optional[frozenset] = None
+        self._word_counts: Dict[str, int] = {}
+        try:
+            from tokenizers import Tokenizer
+            self._tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, 'tokenizer.json'))
+            self._tokenizer.no_truncation()
+            self._tokenizer.no_padding()
+        except ImportError:
+            with open(os.path.join(self.model_dir, 'vocab.txt'), 'r', encoding='utf-8') as f:
+                self._vocab = frozenset(line.rstrip('\n') for line in f)
+
+    def _wordpiece(self, word: str) -> int:
+        """Number of WordPiece tokens of one pre-tokenized word"""
+        count = self._word_counts.get(word)
+        if count is not None:
+            return count
+        if len(word) > 100:
+            count = 1  # [UNK]
+        else:
+            count, start = 0, 0
+            while start < len(word):
+                end = len(word)
+                while end > start:
+                    piece = word[start:end] if start == 0 else '##' + word[start:end]
+                    if piece in self._vocab:
+                        break
+                    end -= 1
+                if end == start:
+                    count = 1  # The whole word is [UNK]
+                    break
+                count += 1
+                start = end
+        if len(self._word_counts) > 100000:
+            self._word_counts.clear()
+        self._word_counts[word] = count
+        return count
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text, without the [CLS]/[SEP] markers"""
+        if not text:
+            return 0
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        text = unicodedata.normalize('NFD', text.lower())
+        text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+        # BERT splits on whitespace and makes every punctuation character (including _) a word
+        return sum(self._wordpiece(word) for word in re.findall(r'[^\W_]+|[^\w\s]|_', text))
+
+
+class PackedContext(NamedTuple):
+    """Code context for a prompt"""
+    text: str                     # Markdown to put in the prompt; empty if nothing relevant was found
+    tokens: int                   # Tokens of text
+    symbols: List[Dict[str, Any]]  # Symbols included: name, type, path, line_start, line_end, score, truncated
+    candidates: int               # Candidates ranked
+    elapsed: float                # Seconds spent
+
+
+def extract_terms(message: str, limit: int = 12) -> Tuple[List[Tuple[str, float]], List[str]]:
+    """
+    Search terms and file paths mentioned in a message
+
+    Args:
+        message: Message to an agent
+        limit: Maximum number of terms
+
+    Returns:
+        ([(term, weight)] best first, [paths])
+    """
+    weights: Dict[str, float] = {}
+
+    def add(term: str, weight: float):
+        # Dunder names match in every class; the class named with them is the useful term
+        if len(term) >= 3 and term.lower() not in _STOPWORDS and not term.startswith('__'):
+            weights[term] = max(weights.get(term, 0.0), weight)
+
+    paths = []
+    words = []
+    for token in message.split():
+        stripped = token.strip('`\'"()[]{}<>,;:!?')
+        if '/' in stripped or os.path.splitext(stripped)[1] in _FENCE_LANGUAGES:
+            paths.append(stripped[2:] if stripped.startswith('./') else stripped)
+        else:
+            words.append(token)
+    message = ' '.join(words)
+
+    # Backticked spans are the strongest hint of what the message is about
+    for span in re.findall(r'`([^`]+)`', message):
+        for name in re.findall(r'[A-Za-z_][A-Za-z0-9_]*', span):
+            add(name, 3.0)
+    for match in re.finditer(r'[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*', message):
+        for part in match.group().split('.'):
+            # snake_case, camelCase, dotted names and calls look like code; plain words less so
+            code_like = ('_' in part or re.search(r'[a-z][A-Z]', part) or '.' in match.group()
+                         or message[match.end():match.end() + 1] == '(')
+            add(part, 2.0 if code_like else 1.0)
+
+    terms = sorted(weights.items(), key=lambda item: -item[1])[:limit]
+    return terms, list(dict.fromkeys(paths))
+
+
+def _is_test_path(path: str) -> bool:
+    parts = path.replace(os.sep, '/').split('/')
+    return any(part in ('test', 'tests', '__tests__') for part in parts[:-1]) or parts[-1].startswith('test_')
+
+
+def _render_block(path: str, start: int, lines: List[str], truncated: bool) -> str:
+    """Fenced code of one symbol, headed by its line range"""
+    fence = _FENCE_LANGUAGES.get(os.path.splitext(path)[1], '')
+    return (f"Lines {start}-{start + len(lines) - 1}:\n```{fence}\n" + "\n".join(lines) +
+            ("\n..." if truncated else "") + "\n```")
+
+
+class ContextPacker:
+    """Ranks the symbols of a CodebaseIndexer for a message and packs their code into a token budget"""
+
+    def __init__(self, indexer, counter: Optional[TokenCounter] = None, budget: Optional[int] = None,
+                 max_symbol_lines: int = 80, results_per_term: int = 8):
+        """
+        Args:
+            indexer: CodebaseIndexer (or ShardedIndexer) to take symbols from
+            counter: Token counter (defaults to the bundled tokenizer, loaded on first use)
+            budget: Tokens to pack (default: MIGHTYDEV_CONTEXT_TOKENS, or 2000; 0 disables packing)
+            max_symbol_lines: Longer symbols are cut to this many lines
+            results_per_term: Symbols taken from the search of each term
+        """
+        self.indexer = indexer
+        self.counter = counter
+        if budget is None:
+            budget = int(os.environ.get('MIGHTYDEV_CONTEXT_TOKENS', DEFAULT_BUDGET))
+        self.budget = budget
+        self.max_symbol_lines = max_symbol_lines
+        self.results_per_term = results_per_term
+
+    def _get_counter(self) -> TokenCounter:
+        if self.counter is None:
+            self.counter = TokenCounter()
+        return self.counter
+
+    def _candidates(self, message: str) -> List[Dict[str, Any]]:
+        """Candidate symbols with a "score", best first"""
+        terms, paths = extract_terms(message)
+        candidates: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+        file_symbols: Dict[str, List[Dict[str, Any]]] = {}
+
+        def add(symbol: Dict[str, Any], score: float, accumulate: bool = True):
+            # Lexical scores add up over terms; a neighbour counts its strongest link only
+            key = (symbol['path'], symbol['line_start'], symbol['name'])
+            if key in candidates:
+                existing = candidates[key]['score']
+                candidates[key]['score'] = existing + score if accumulate else max(existing, score)
+            else:
+                candidates[key] = dict(symbol, score=score)
+
+        def symbols_of(path: str) -> List[Dict[str, Any]]:
+            if path not in file_symbols:
+                rows = self.indexer.get_file_symbols(path, fields=[f for f in _FIELDS if f != 'path'])
+                file_symbols[path] = [dict(row, path=path) for row in rows]
+            return file_symbols[path]
+
+        def match_weight(name: str, term: str) -> int:
+            if name == term:
+                return _WEIGHT_EXACT
+            if name.lower() == term.lower():
+                return _WEIGHT_CASELESS
+            return _WEIGHT_MATCH
+
+        matched = set()
+        for term, weight in terms:
+            for rank, symbol in enumerate(self.indexer.search_symbols(term, limit=self.results_per_term,
+                                                                      fields=_FIELDS)):
+                matched.add((symbol['path'], symbol['line_start'], symbol['name'], term))
+                add(symbol, weight * match_weight(symbol['name'], term) / (1 + 0.3 * rank))
+
+        # The symbols of a file the message names: those named by a term score as
+        # the best match of that term, even if other files crowded them out of
+        # its search results, and its functions and classes are candidates anyway
+        for path in paths:
+            for symbol in symbols_of(path):
+                for term, weight in terms:
+                    key = (symbol['path'], symbol['line_start'], symbol['name'], term)
+                    if symbol['name'].lower() == term.lower() and key not in matched:
+                        matched.add(key)
+                        add(symbol, weight * match_weight(symbol['name'], term))
+                if not symbol['parent'] and symbol['type'] in ('function', 'class'):
+                    add(symbol, _WEIGHT_FILE, accumulate=False)
+
+        term_names = {term for term, _ in terms}
+        for symbol in candidates.values():
+            if symbol['parent'] in term_names:
+                symbol['score'] *= _BOOST_PARENT_NAMED
+            if symbol['path'] in paths:
+                symbol['score'] *= _BOOST_FILE_NAMED
+
+        # Structural neighbours of the strongest lexical matches
+        lexical = sorted(candidates.values(), key=lambda symbol: -symbol['score'])[:8]
+        expanded = set()
+        for symbol in lexical:
+            score = symbol['score']
+            if symbol['parent'] or symbol['type'] == 'class':
+                for other in symbols_of(symbol['path']):
+                    if symbol['parent'] and other['name'] == symbol['parent'] and not other['parent']:
+                        add(other, score * _WEIGHT_PARENT, accumulate=False)
+                    elif symbol['type'] == 'class' and other['parent'] == symbol['name']:
+                        add(other, score * _WEIGHT_MEMBER, accumulate=False)
+            if symbol['type'] in ('function', 'method', 'class') and symbol['name'] not in expanded:
+                expanded.add(symbol['name'])
+                references = self.indexer.find_references(symbol['name'], limit=_MAX_REFERENCES,
+                                                          fields=['path', 'line'])
+                # References to a common name are mostly to other symbols of that name
+                if getattr(references, 'next_cursor', None):
+                    continue
+                callers = set()
+                for reference in references:
+                    caller = self.indexer.get_symbol_by_location(reference['path'], reference['line'])
+                    if caller is None or caller['name'] == symbol['name']:
+                        continue
+                    key = (reference['path'], caller['line_start'], caller['name'])
+                    if key in callers:
+                        continue
+                    callers.add(key)
+                    caller = {field: caller.get(field) for field in _FIELDS}
+                    caller['path'] = reference['path']
+                    add(caller, score * _WEIGHT_CALLER, accumulate=False)
+                    if len(callers) >= 5:
+                        break
+
+        if 'test' not in message.lower():
+            for symbol in candidates.values():
+                if _is_test_path(symbol['path']):
+                    symbol['score'] *= _PENALTY_TEST
+
+        return sorted(candidates.values(),
+                      key=lambda symbol: (-symbol['score'], symbol['line_end'] - symbol['line_start']))
+
+    def _read_lines(self, path: str, cache: Dict[str, Optional[List[str]]]) -> Optional[List[str]]:
+        if path not in cache:
+            try:
+                with open(os.path.join(self.indexer.workspace_root, path), 'r', encoding='utf-8',
+                          errors='replace') as f:
+                    cache[path] = f.read().splitlines()
+            except OSError:
+                cache[path] = None
+        return cache[path]
+
+    def pack(self, message: str, budget: Optional[int] = None) -> PackedContext:
+        """
+        Pack the code most relevant to a message into a token budget
+
+        Args:
+            message: Message to an agent
+            budget: Tokens to spend (defaults to the packer's budget)
+
+        Returns:
+            PackedContext, whose text is empty if nothing relevant was found
+        """
+        started = time.time()
+        budget = self.budget if budget is None else budget
+        if budget <= 0:
+            return PackedContext("", 0, [], 0, 0.0)
+        counter = self._get_counter()
+        candidates = self._candidates(message)
+
+        header = ("# Relevant code\n"
+                  "Code from the workspace index related to this message, as it is on disk now. "
+                  "Use it directly instead of reading these files again.\n")
+        remaining = budget - counter.count(header)
+        lines_cache: Dict[str, Optional[List[str]]] = {}
+        chosen: List[Tuple[Dict[str, Any], List[str], bool]] = []
+        covered: Dict[str, List[Tuple[int, int]]] = {}
+        for symbol in candidates:
+            if remaining < 20 or symbol['score'] < _MIN_SCORE:
+                break
+            path, start, end = symbol['path'], symbol['line_start'], symbol['line_end'] or symbol['line_start']
+            ranges = covered.get(path, [])
+            # Skip symbols already shown, and enclosing ones that would repeat them
+            if any((a <= start and end <= b) or (start <= a and b <= end) for a, b in ranges):
+                continue
+            lines = self._read_lines(path, lines_cache)
+            if not lines or start < 1 or start > len(lines):
+                continue
+            body = lines[start - 1:end]
+            truncated = len(body) > self.max_symbol_lines
+            body = body[:self.max_symbol_lines]
+            kept, cost = body, 0
+            while kept:
+                # The count of a whole block is exact: tokens never span lines
+                cost = counter.count(_render_block(path, start, kept, truncated or len(kept) < len(body)))
+                if path not in covered:
+                    cost += counter.count(f"## {path}")
+                if cost <= remaining:
+                    break
+                # Drop lines in proportion to the overshoot, at least one
+                excess = max(1, len(kept) * (cost - remaining) // cost)
+                kept = kept[:len(kept) - excess]
+            truncated = truncated or len(kept) < len(body)
+            if not kept or (truncated and len(kept) < min(3, len(body))):
+                continue
+            remaining -= cost
+            chosen.append((symbol, kept, truncated))
+            # Members past the cut of a truncated symbol can still be shown on their own
+            covered.setdefault(path, []).append((start, start + len(kept) - 1))
+
+        if not chosen:
+            return PackedContext("", 0, [], len(candidates), time.time() - started)
+
+        # Group by file, files in order of their best symbol, symbols in line order
+        files: Dict[str, List[Tuple[Dict[str, Any], List[str], bool]]] = {}
+        for entry in chosen:
+            files.setdefault(entry[0]['path'], []).append(entry)
+        parts = [header]
+        for path, entries in files.items():
+            parts.append(f"## {path}")
+            for symbol, kept, truncated in sorted(entries, key=lambda entry: entry[0]['line_start']):
+                parts.append(_render_block(path, symbol['line_start'], kept, truncated))
+        text = "\n".join(parts) + "\n"
+
+        symbols = [{"name": symbol['name'], "type": symbol['type'], "path": symbol['path'],
+                    "line_start": symbol['line_start'], "line_end": symbol['line_end'],
+                    "score": round(symbol['score'], 3), "truncated": truncated}
+                   for symbol, _, truncated in chosen]
+        return PackedContext(text, counter.count(text), symbols, len(candidates), time.time() - started)
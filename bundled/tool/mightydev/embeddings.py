@@ -0,0 +1,446 @@
+"""
+Sentence embeddings from the bundled all-MiniLM-L6-v2 model.
+
+The model is only ever loaded from bundled/model; the Hugging Face hub is
+never contacted, so embeddings work offline. sentence-transformers runs the
+model when it is installed. Otherwise the ONNX export of the model
+(onnx/model.onnx in the model directory) runs on onnxruntime with the
+tokenizers library, followed by the same mean pooling. Either way vectors
+are L2-normalized float32, so a dot product is their cosine similarity.
+
+EmbeddingService shares the one loaded model between all callers in the
+process: concurrent requests are coalesced into micro-batches, and vectors
+are cached by text hash.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 'model')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIMENSION = 384
+
+# Weight files each backend can load
+_TORCH_WEIGHTS = ('model.safetensors', 'pytorch_model.bin')
+_ONNX_WEIGHTS = (os.path.join('onnx', 'model.onnx'), 'model.onnx')
+
+
+class EmbeddingUnavailable(RuntimeError):
+    """Raised when the embedding model or its runtime isn't installed"""
+
+
+def text_key(text: str) -> bytes:
+    """Hash identifying a text, for caching its vector"""
+    return hashlib.blake2b(text.encode('utf-8', errors='replace'), digest_size=16).digest()
+
+
+class TextEncoder:
+    """
+    Embeds texts with the bundled model, loading it on first use
+
+    encode is safe to call from several threads; calls run one at a time.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None, max_tokens: int = 256, batch_size: int = 32):
+        """
+        Args:
+            model_dir: Directory of the model (defaults to bundled/model)
+            max_tokens: Texts are truncated to this many tokens
+            batch_size: Texts run through the model at once
+        """
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.dimension = EMBEDDING_DIMENSION
+        self.backend: Optional[str] = None
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _find_weights(self, candidates: Sequence[str]) -> Optional[str]:
+        for name in candidates:
+            path = os.path.join(self.model_dir, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _load(self):
+        """Load the model with the first backend that is installed and has its weights"""
+        if np is None:
+            raise EmbeddingUnavailable("numpy is not installed")
+
+        # Never fall back to downloading from the hub
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+        os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+        if self._find_weights(_TORCH_WEIGHTS):
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_dir, device='cpu')
+                self._model.max_seq_length = self.max_tokens
+                self.backend = 'sentence-transformers'
+                logger.info(f"Loaded {MODEL_NAME} from {self.model_dir} with sentence-transformers")
+                return
+            except ImportError:
+                pass
+
+        onnx_path = self._find_weights(_ONNX_WEIGHTS)
+        if onnx_path:
+            try:
+                import onnxruntime
+                from tokenizers import Tokenizer
+            except ImportError as e:
+                raise EmbeddingUnavailable(f"Cannot run the ONNX model: {e}") from None
+            tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, 'tokenizer.json'))
+            tokenizer.enable_truncation(max_length=self.max_tokens)
+            tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = os.cpu_count() or 1
+            self._model = onnxruntime.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+            self._tokenizer = tokenizer
+            self.backend = 'onnxruntime'
+            logger.info(f"Loaded {MODEL_NAME} from {onnx_path} with onnxruntime")
+            return
+
+        raise EmbeddingUnavailable(
+            f"No usable {MODEL_NAME} weights in {self.model_dir}: install sentence-transformers "
+            f"with {' or '.join(_TORCH_WEIGHTS)}, or onnxruntime and tokenizers with onnx/model.onnx"
+        )
+
+    def _encode_onnx(self, texts: Sequence[str]) -> 'np.ndarray':
+        encodings = self._tokenizer.encode_batch(list(texts))
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': ids, 'attention_mask': mask,
+                 'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)}
+        wanted = {node.name for node in self._model.get_inputs()}
+        hidden = self._model.run(None, {name: value for name, value in feeds.items() if name in wanted})[0]
+        # Mean over the real tokens, as the model's pooling config prescribes
+        weights = mask[:, :, None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+    def encode(self, texts: Sequence[str]) -> 'np.ndarray':
+        """
+        Embed texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Normalized float32 vectors, one row per text
+
+        Raises:
+            EmbeddingUnavailable: If the model can't be loaded
+        """
+        with self._lock:
+            if self._model is None:
+                self._load()
+            if not texts:
+                return np.zeros((0, self.dimension), dtype=np.float32)
+
+            # Batches of similar length waste less work on padding
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                batch_texts = [texts[i] for i in batch]
+                if self.backend == 'sentence-transformers':
+                    encoded = self._model.encode(batch_texts, batch_size=len(batch_texts), convert_to_numpy=True,
+                                                 show_progress_bar=False)
+                else:
+                    encoded = self._encode_onnx(batch_texts)
+                vectors[batch] = encoded
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+_default_encoder: Optional[TextEncoder] = None
+_default_encoder_lock = threading.Lock()
+
+
+def _get_default_encoder() -> TextEncoder:
+    global _default_encoder
+    if _default_encoder is None:
+        _default_encoder = TextEncoder()
+    return _default_encoder
+
+
+def default_encoder() -> TextEncoder:
+    """The process-wide encoder for the bundled model, so it is loaded once"""
+    with _default_encoder_lock:
+        return _get_default_encoder()
+
+
+class _Request:
+    """Texts of one embed call waiting for the service's worker"""
+
+    __slots__ = ('texts', 'keys', 'future', 'enqueued')
+
+    def __init__(self, texts: List[str], keys: List[bytes]):
+        self.texts = texts
+        self.keys = keys
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingService:
+    """
+    Shares one encoder between threads, batching their requests
+
+    embed blocks until its texts are embedded. A worker thread takes the
+    oldest waiting request, waits up to max_wait seconds for more to arrive
+    (or until max_batch texts are waiting), and encodes the distinct uncached
+    texts of all of them in one call. Vectors are kept in an LRU cache keyed
+    by text hash.
+    """
+
+    def __init__(self, encoder: Optional[TextEncoder] = None, max_batch: int = 64, max_wait: float = 0.005,
+                 cache_size: int = 10000):
+        """
+        Args:
+            encoder: Encoder to share (defaults to the process-wide encoder of the bundled model)
+            max_batch: Most texts encoded in one call
+            max_wait: Seconds a request waits for others to batch with
+            cache_size: Vectors kept in the cache
+        """
+        self.encoder = encoder or default_encoder()
+        self.dimension = self.encoder.dimension
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._pending: Deque[_Request] = deque()
+        self._pending_texts = 0
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self._started = time.time()
+        self._requests = 0
+        self._texts = 0
+        self._cache_hits = 0
+        self._batches = 0
+        self._encoded = 0
+        self._encode_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._queued_requests = 0
+
+    def load(self):
+        """
+        Load the model now rather than on the first request
+
+        Raises:
+            EmbeddingUnavailable: If the model can't be loaded
+        """
+        self.encoder.encode([])
+
+    def embed(self, texts: Sequence[str], timeout: Optional[float] = None) -> 'np.ndarray':
+        """
+        Embed texts, batched with the requests of other threads
+
+        Args:
+            texts: Texts to embed
+            timeout: Seconds to wait for the vectors (default: no limit)
+
+        Returns:
+            Normalized float32 vectors, one row per text
+
+        Raises:
+            EmbeddingUnavailable: If the model can't be loaded
+        """
+        if np is None:
+            raise EmbeddingUnavailable("numpy is not installed")
+        texts = list(texts)
+        keys = [text_key(text) for text in texts]
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        missing = []
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Embedding service is closed")
+            self._requests += 1
+            self._texts += len(texts)
+            for i, key in enumerate(keys):
+                vector = self._cache.get(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    vectors[i] = vector
+            self._cache_hits += len(texts) - len(missing)
+            if not missing:
+                return vectors
+            request = _Request([texts[i] for i in missing], [keys[i] for i in missing])
+            self._pending.append(request)
+            self._pending_texts += len(missing)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+        vectors[missing] = request.future.result(timeout)
+        return vectors
+
+    # Drop-in for TextEncoder.encode
+    encode = embed
+
+    def _next_batch(self) -> List[_Request]:
+        """Wait for requests and take a batch of them; empty once closed"""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return []
+            # Give other threads a moment to add to the batch
+            deadline = self._pending[0].enqueued + self.max_wait
+            while self._pending_texts < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0].texts) <= self.max_batch):
+                request = self._pending.popleft()
+                batch.append(request)
+                size += len(request.texts)
+            self._pending_texts -= size
+            now = time.perf_counter()
+            self._wait_seconds += sum(now - request.enqueued for request in batch)
+            self._queued_requests += len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            # Texts another request of the batch (or the cache) already covers are encoded once
+            known: Dict[bytes, 'np.ndarray'] = {}
+            todo: Dict[bytes, str] = {}
+            with self._condition:
+                for request in batch:
+                    for key, text in zip(request.keys, request.texts):
+                        if key in known or key in todo:
+                            continue
+                        vector = self._cache.get(key)
+                        if vector is None:
+                            todo[key] = text
+                        else:
+                            known[key] = vector
+
+            started = time.perf_counter()
+            try:
+                encoded = self.encoder.encode(list(todo.values())) if todo else []
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - started
+
+            with self._condition:
+                for key, vector in zip(todo, encoded):
+                    known[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                self._batches += 1
+                self._encoded += len(todo)
+                self._encode_seconds += elapsed
+            for request in batch:
+                request.future.set_result(np.stack([known[key] for key in request.keys]))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Throughput, queue depth and cache counters
+
+        Returns:
+            Dictionary with requests and texts served, cache hits, batches,
+            texts encoded per second of model time, mean queue wait, and the
+            requests and texts waiting now
+        """
+        with self._condition:
+            return {
+                "model": MODEL_NAME,
+                "backend": self.encoder.backend,
+                "queue_depth": len(self._pending),
+                "queued_texts": self._pending_texts,
+                "requests": self._requests,
+                "texts": self._texts,
+                "cache_hits": self._cache_hits,
+                "cache_hit_rate": round(self._cache_hits / self._texts, 4) if self._texts else 0.0,
+                "cache_size": len(self._cache),
+                "batches": self._batches,
+                "encoded": self._encoded,
+                "mean_batch_size": round(self._encoded / self._batches, 2) if self._batches else 0.0,
+                "texts_per_second": round(self._encoded / self._encode_seconds, 1) if self._encode_seconds else 0.0,
+                "mean_queue_wait_ms": (round(self._wait_seconds / self._queued_requests * 1000, 3)
+                                       if self._queued_requests else 0.0),
+                "uptime_seconds": round(time.time() - self._started, 1),
+            }
+
+    def close(self):
+        """Stop the worker once the waiting requests are served"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+
+
+_embedding_service: Optional[EmbeddingService] = None
+
+
+def embedding_service() -> EmbeddingService:
+    """The process-wide embedding service, sharing the default encoder"""
+    global _embedding_service
+    with _default_encoder_lock:
+        if _embedding_service is None:
+            _embedding_service = EmbeddingService(_get_default_encoder())
+        return _embedding_service
+
+
+_crew_embedding_function = None
+
+
+def crew_embedder_config() -> Dict[str, Any]:
+    """
+    CrewAI embedder config that embeds crew memory with the embedding service
+
+    Returns:
+        A "custom" provider config, or the local huggingface config of the
+        same model if chromadb or the bundled weights aren't available
+    """
+    global _crew_embedding_function
+    fallback = {"provider": "huggingface", "model": MODEL_NAME}
+    try:
+        from chromadb.api.types import EmbeddingFunction
+    except ImportError:
+        return fallback
+    service = embedding_service()
+    try:
+        service.load()
+    except EmbeddingUnavailable as e:
+        logger.warning(f"Bundled embedding model unavailable for crew memory: {e}")
+        return fallback
+
+    with _default_encoder_lock:
+        if _crew_embedding_function is None:
+            class ServiceEmbeddingFunction(EmbeddingFunction):
+                def __call__(self, input):
+                    return service.embed(list(input)).tolist()
+
+            _crew_embedding_function = ServiceEmbeddingFunction()
+    return {"provider": "custom", "config": {"embedder": _crew_embedding_function}}
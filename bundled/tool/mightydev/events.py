@@ -0,0 +1,124 @@
+"""
+In-process publish/subscribe for server events.
+
+Producers such as the indexer publish (topic, data) events without knowing
+who listens. Each subscriber gets its own bounded queue; a subscriber that
+falls behind loses its oldest events instead of slowing the producer down,
+which suits progress-style events where only the latest state matters.
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# (topic, data) as delivered to subscribers
+Event = Tuple[str, Dict[str, Any]]
+
+
+class Subscription:
+    """Queue of events for one subscriber"""
+
+    def __init__(self, bus: 'EventBus', topics: Optional[Iterable[str]], max_pending: int):
+        """
+        Args:
+            bus: Bus the subscription belongs to
+            topics: Topics or topic prefixes ending in "." to receive (None for all)
+            max_pending: Events kept before the oldest are dropped
+        """
+        self.bus = bus
+        self.topics = tuple(topics) if topics else None
+        self.dropped = 0
+        self._events: Deque[Event] = collections.deque(maxlen=max_pending)
+        self._ready = threading.Condition()
+        self.closed = False
+
+    def matches(self, topic: str) -> bool:
+        if self.topics is None:
+            return True
+        return any(topic == t or (t.endswith('.') and topic.startswith(t)) for t in self.topics)
+
+    def push(self, event: Event):
+        with self._ready:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout: Optional[float] = None) -> List[Event]:
+        """
+        Wait for events and return all that are pending
+
+        Args:
+            timeout: Seconds to wait (None waits until an event arrives or the subscription closes)
+
+        Returns:
+            Pending events, empty on timeout or once closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while not self._events and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+
+class EventBus:
+    """Fans published events out to subscriptions"""
+
+    def __init__(self, max_pending: int = 256):
+        """
+        Args:
+            max_pending: Default number of events queued per subscriber
+        """
+        self.max_pending = max_pending
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, max_pending: Optional[int] = None) -> Subscription:
+        """
+        Start receiving events
+
+        Args:
+            topics: Topics to receive; an entry ending in "." matches every topic with
+                    that prefix (None receives everything)
+            max_pending: Events queued before the oldest are dropped
+
+        Returns:
+            Subscription to read events from; close it when done
+        """
+        subscription = Subscription(self, topics, max_pending or self.max_pending)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, topic: str, data: Dict[str, Any]):
+        """Deliver an event to every matching subscriber without blocking"""
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.matches(topic)]
+        for subscription in subscriptions:
+            subscription.push((topic, data))
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
@@ -0,0 +1,296 @@
+"""
+Import graph of the codebase index.
+
+ImportResolver maps the raw import strings stored by the parsers (Python
+module paths, relative JS/TS specifiers) to indexed files. DependencyGraph
+keeps the resolved file-to-file edges in memory in both directions and caches
+transitive closures, invalidating only the cached closures a change can affect.
+"""
+
+import logging
+import os
+import posixpath
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Extensions and index files tried for extensionless JS/TS specifiers
+_JS_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx')
+_JS_RESOLUTION_SUFFIXES = ('',) + _JS_EXTENSIONS + tuple(f'/index{ext}' for ext in _JS_EXTENSIONS)
+
+
+def _posix(path: str) -> str:
+    return path if os.sep == '/' else path.replace(os.sep, '/')
+
+
+class ImportResolver:
+    """
+    Resolves import strings to file ids against a snapshot of the indexed files.
+
+    Absolute Python imports are matched against every dotted suffix of every
+    module path, so packages below a source root (e.g. src/pkg/mod.py for
+    "pkg.mod") resolve without knowing sys.path. A suffix only counts if the
+    directory above its top-level package is not itself a package.
+    """
+
+    def __init__(self, files: Iterable[Tuple[int, str]]):
+        """
+        Args:
+            files: (file id, relative path) of every indexed file
+        """
+        self.by_path: Dict[str, int] = {}
+        python_modules = []
+        for file_id, path in files:
+            path = _posix(path)
+            self.by_path[path] = file_id
+            if path.endswith('.py'):
+                python_modules.append((file_id, path))
+
+        # Directories that are packages
+        self.packages: Set[str] = {
+            posixpath.dirname(path) for _, path in python_modules if path.endswith('/__init__.py')
+        }
+        if '__init__.py' in self.by_path:
+            self.packages.add('')
+
+        # Dotted module suffix -> [(file id, path)]
+        self.modules: Dict[str, List[Tuple[int, str]]] = {}
+        for file_id, path in python_modules:
+            parts = path[:-3].split('/')
+            if parts[-1] == '__init__':
+                parts.pop()
+            for i in range(len(parts)):
+                if '/'.join(parts[:i]) in self.packages:
+                    continue
+                self.modules.setdefault('.'.join(parts[i:]), []).append((file_id, path))
+
+    def resolve(self, source_path: str, target: str) -> Optional[int]:
+        """
+        Resolve an import of a file to the id of the imported file
+
+        Args:
+            source_path: Relative path of the importing file
+            target: Import string as stored by the parser
+
+        Returns:
+            File id, or None if the import is external or unknown
+        """
+        source_path = _posix(source_path)
+        if source_path.endswith('.py'):
+            if target.startswith('.'):
+                return self._resolve_python_relative(source_path, target)
+            return self._resolve_python(source_path, target)
+        if target.startswith(('./', '../')):
+            return self._resolve_js(source_path, target)
+        return None
+
+    def _resolve_python(self, source_path: str, target: str) -> Optional[int]:
+        # "from a.b import c" is stored as "a.b.c": c may be a module or a name in a.b
+        parts = target.split('.')
+        for end in (len(parts), len(parts) - 1):
+            if end <= 0:
+                break
+            candidates = self.modules.get('.'.join(parts[:end]))
+            if candidates:
+                return self._closest(source_path, candidates)
+        return None
+
+    def _resolve_python_relative(self, source_path: str, target: str) -> Optional[int]:
+        level = len(target) - len(target.lstrip('.'))
+        base = posixpath.dirname(source_path)
+        for _ in range(level - 1):
+            base = posixpath.dirname(base)
+        parts = [part for part in target[level:].split('.') if part]
+        # "from .a import b" is stored as ".a.b": b may be a module or a name in a
+        for end in (len(parts), len(parts) - 1):
+            if end < 0:
+                break
+            module = posixpath.join(base, *parts[:end]) if end else base
+            candidates = (f'{module}.py', f'{module}/__init__.py') if end else (f'{module}/__init__.py',)
+            for candidate in candidates:
+                file_id = self.by_path.get(candidate.lstrip('/'))
+                if file_id is not None:
+                    return file_id
+        return None
+
+    def _resolve_js(self, source_path: str, target: str) -> Optional[int]:
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source_path), target))
+        if path.startswith('../'):
+            return None
+        stems = [path]
+        root, ext = posixpath.splitext(path)
+        if ext in ('.js', '.jsx'):
+            # TypeScript sources are imported with the extension of their output
+            stems.append(root)
+        for stem in stems:
+            for suffix in _JS_RESOLUTION_SUFFIXES:
+                file_id = self.by_path.get(stem + suffix)
+                if file_id is not None:
+                    return file_id
+        return None
+
+    @staticmethod
+    def _closest(source_path: str, candidates: List[Tuple[int, str]]) -> int:
+        """Pick the candidate sharing the longest directory prefix with the importer"""
+        if len(candidates) == 1:
+            return candidates[0][0]
+        source_dirs = source_path.split('/')[:-1]
+
+        def shared(candidate: Tuple[int, str]) -> Tuple[int, int]:
+            dirs = candidate[1].split('/')[:-1]
+            common = 0
+            for a, b in zip(source_dirs, dirs):
+                if a != b:
+                    break
+                common += 1
+            return (common, -len(dirs))
+
+        return max(candidates, key=shared)[0]
+
+
+class DependencyGraph:
+    """
+    In-memory import graph between indexed files with cached transitive closures.
+
+    The index writer keeps it in sync after each commit. A cached closure is
+    dropped only if the changed file can reach it (dependencies) or it can
+    reach one of the changed edges (dependents), so unrelated queries stay
+    cached while files are being edited.
+    """
+
+    DEPENDENCIES = 'dependencies'
+    DEPENDENTS = 'dependents'
+
+    def __init__(self, max_cached: int = 1024):
+        """
+        Args:
+            max_cached: Maximum number of cached closures
+        """
+        self.max_cached = max_cached
+        self.forward: Dict[int, Set[int]] = {}
+        self.reverse: Dict[int, Set[int]] = {}
+        self.paths: Dict[int, str] = {}
+        self.loaded = False
+        self._closures: 'OrderedDict[Tuple[str, int], FrozenSet[int]]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    def load(self, conn):
+        """Load files and resolved edges from the index database"""
+        with self._lock:
+            self.clear()
+            self.paths = dict(conn.execute('SELECT id, path FROM files'))
+            for source, target in conn.execute('''
+            SELECT DISTINCT source_file_id, target_file_id FROM dependencies
+            WHERE target_file_id IS NOT NULL
+            '''):
+                self.forward.setdefault(source, set()).add(target)
+                self.reverse.setdefault(target, set()).add(source)
+            self.loaded = True
+            logger.info(f"Loaded import graph with {len(self.paths)} files and "
+                        f"{sum(len(targets) for targets in self.forward.values())} edges")
+
+    def clear(self):
+        """Forget everything; the next query reloads"""
+        with self._lock:
+            self.forward.clear()
+            self.reverse.clear()
+            self.paths.clear()
+            self._closures.clear()
+            self.loaded = False
+
+    def add_files(self, paths: Dict[int, str]):
+        """Register new or rewritten files by id"""
+        with self._lock:
+            if self.loaded:
+                self.paths.update(paths)
+
+    def remove_files(self, file_ids: Iterable[int]):
+        """Drop files along with their edges in both directions"""
+        with self._lock:
+            if not self.loaded:
+                return
+            for file_id in file_ids:
+                self._set_edges(file_id, set())
+                for source in list(self.reverse.get(file_id, ())):
+                    self._set_edges(source, self.forward.get(source, set()) - {file_id})
+                self.reverse.pop(file_id, None)
+                self.paths.pop(file_id, None)
+                for direction in (self.DEPENDENCIES, self.DEPENDENTS):
+                    self._closures.pop((direction, file_id), None)
+
+    def set_edges(self, edges: Dict[int, Set[int]]):
+        """Replace the outgoing edges of some files"""
+        with self._lock:
+            if not self.loaded:
+                return
+            for source, targets in edges.items():
+                self._set_edges(source, set(targets))
+
+    def _set_edges(self, source: int, targets: Set[int]):
+        old = self.forward.get(source, set())
+        if old == targets:
+            return
+        self._invalidate(source, targets - old)
+        for target in old - targets:
+            dependents = self.reverse.get(target)
+            if dependents:
+                dependents.discard(source)
+                if not dependents:
+                    del self.reverse[target]
+        for target in targets - old:
+            self.reverse.setdefault(target, set()).add(source)
+        if targets:
+            self.forward[source] = targets
+        else:
+            self.forward.pop(source, None)
+
+    def _invalidate(self, source: int, added: Set[int]):
+        """Drop cached closures that the edge change of source can affect"""
+        stale = []
+        for key, members in self._closures.items():
+            direction, root = key
+            if direction == self.DEPENDENCIES:
+                # Only closures that reach the changed file see its edges
+                if root == source or source in members:
+                    stale.append(key)
+            else:
+                # A closure gains members through a new edge into it, and loses
+                # them only if the changed file was part of it
+                if source in members or root in added or not members.isdisjoint(added):
+                    stale.append(key)
+        for key in stale:
+            del self._closures[key]
+
+    def closure(self, file_id: int, direction: str) -> FrozenSet[int]:
+        """
+        Files reachable from a file over import edges, excluding the file itself
+
+        Args:
+            file_id: Starting file
+            direction: DEPENDENCIES (what it imports) or DEPENDENTS (what imports it)
+        """
+        key = (direction, file_id)
+        with self._lock:
+            cached = self._closures.get(key)
+            if cached is not None:
+                self._closures.move_to_end(key)
+                return cached
+
+            adjacency = self.forward if direction == self.DEPENDENCIES else self.reverse
+            seen = {file_id}
+            pending = deque([file_id])
+            while pending:
+                for neighbour in adjacency.get(pending.popleft(), ()):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        pending.append(neighbour)
+            seen.discard(file_id)
+            result = frozenset(seen)
+
+            self._closures[key] = result
+            if len(self._closures) > self.max_cached:
+                self._closures.popitem(last=False)
+            return result
@@ -4,66 +4,880 @@ CodebaseIndexer for building and querying a searchable index of the codebase.
 
 import os
 import json
+import base64
 import time
 import re
+import heapq
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Set, Tuple, Union
+from typing import Dict, List, Any, Optional, Set, Tuple, Union, Iterable, Callable, Sequence
+from array import array
 from pathlib import Path
 import threading
+import queue
 import sqlite3
-from concurrent.futures import ThreadPoolExecutor
-import ast
-from dataclasses import dataclass, field, asdict
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import collections
+
+from . import storage
+from .blobs import BlobStore
+from .graph import DependencyGraph, ImportResolver
+from .intervals import IntervalCache, SymbolIntervals
+from .jobs import IndexJobRunner
+from .jsparser import parse_javascript
+from .metrics import IndexMetrics, Observations
+from .priority import EDITOR, GIT, HotFiles, PriorityWorkQueue, recent_git_files
+from .pyparser import parse_python
+from .scanner import IGNORE_FILES, WorkspaceScanner
+from .semantic import SemanticIndex
+from .snapshot import SnapshotReader, SnapshotWriter
+from .watcher import create_watcher
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-@dataclass
-class SymbolInfo:
-    """Information about a code symbol (function, class, etc.)"""
-    name: str
-    type: str  # "function", "class", "method", "variable", etc.
-    file_path: str
-    line_start: int
-    line_end: int
-    column_start: int = 0
-    column_end: int = 0
-    signature: str = ""
-    docstring: str = ""
-    parent: str = ""  # Parent class/module
-    references: List[str] = field(default_factory=list)  # List of places this symbol is referenced
-    imports: List[str] = field(default_factory=list)  # List of imports used by this symbol
-    code: str = ""  # The actual code
-    metadata: Dict[str, Any] = field(default_factory=dict)
-
-@dataclass
-class FileInfo:
-    """Information about a file in the codebase"""
-    path: str
-    language: str
-    size: int
-    modified_time: float
-    symbols: List[SymbolInfo] = field(default_factory=list)
-    imports: List[str] = field(default_factory=list)
-    dependencies: List[str] = field(default_factory=list)
-    metrics: Dict[str, Any] = field(default_factory=dict)
-    content_hash: str = ""
-
-class CodebaseIndexer:
+# Splits identifiers into words: getSymbolByLocation, HTTPServer, parse_v2
+_IDENTIFIER_WORD_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+# BM25 column weights for symbols_fts: name, terms, signature, docstring, parent
+_FTS_WEIGHTS = (10.0, 6.0, 3.0, 1.0, 2.0)
+
+def _split_identifier(name: str) -> List[str]:
+    """Split an identifier into its lowercase camelCase/snake_case words"""
+    return [word.lower() for word in _IDENTIFIER_WORD_RE.findall(name)]
+
+def _fts_match_expression(query: str) -> str:
+    """
+    Build an FTS5 MATCH expression from a free-text symbol query
+
+    Every word in the query must match as a prefix, either against a whole
+    identifier (getSym -> getSymbolByLocation) or against its split words
+    (get_sym / getSym -> get_symbol_by_location).
+    """
+    clauses = []
+    for word in query.replace('"', ' ').split():
+        alternatives = [f'"{word}"*']
+        words = _split_identifier(word)
+        if len(words) > 1:
+            alternatives.append(f'"{" ".join(words)}"*')
+        clauses.append('(' + ' OR '.join(alternatives) + ')' if len(alternatives) > 1 else alternatives[0])
+    return ' AND '.join(clauses)
+
+def _content_hash(data: bytes) -> str:
+    """Hash raw file contents for change detection"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _slice_code(data: bytes, byte_start: int, byte_end: int) -> str:
+    """Decode the source of a symbol from the content of its file"""
+    code = data[byte_start:byte_end].decode('utf-8', errors='replace')
+    if code.endswith('\n'):
+        code = code[:-1]
+    if code.endswith('\r'):
+        code = code[:-1]
+    return code
+
+
+def _fts_row(symbol_id: int, name: str, signature: str, docstring: str, parent: str) -> Tuple:
+    """Build the symbols_fts row for a symbol"""
+    return (symbol_id, name, ' '.join(_split_identifier(name)), signature, docstring, parent)
+
+
+# Columns a `fields` projection can select from symbol queries
+_SYMBOL_FIELDS = {
+    'id': 's.id', 'name': 's.name', 'type': 's.type', 'file_id': 's.file_id',
+    'line_start': 's.line_start', 'line_end': 's.line_end',
+    'column_start': 's.column_start', 'column_end': 's.column_end',
+    'signature': 's.signature', 'docstring': 's.docstring', 'parent': 's.parent',
+    'byte_start': 's.byte_start', 'byte_end': 's.byte_end', 'content_hash': 'f.content_hash',
+    'path': 'f.path', 'language': 'f.language',
+    # Sliced from the file after the query (see CodebaseIndexer._fill_code)
+    'code': 'NULL',
+    '_path': 'f.path', '_content_hash': 'f.content_hash',
+    '_byte_start': 's.byte_start', '_byte_end': 's.byte_end',
+}
+_SYMBOL_ROW_FIELDS = ['id', 'name', 'type', 'file_id', 'line_start', 'line_end', 'column_start',
+                      'column_end', 'signature', 'docstring', 'parent', 'code', 'byte_start', 'byte_end']
+_CODE_FIELDS = ['_path', '_content_hash', '_byte_start', '_byte_end']
+
+# Columns a `fields` projection can select from find_references
+_REFERENCE_FIELDS = {
+    'name': 'r.name', 'path': 'f.path', 'line': 'r.line', 'column': 'r.column',
+    'symbol_id': 'r.symbol_id', 'file_id': 'r.file_id',
+}
+
+
+class ResultPage(list):
+    """
+    One page of query results
+
+    A plain list of result dicts, plus next_cursor: an opaque keyset cursor
+    for the following page, or None on the last page. sort_keys holds the
+    ordering key of each result, for merging pages from several indexes.
+    """
+
+    def __init__(self, results: Iterable[Dict[str, Any]] = ()):
+        super().__init__(results)
+        self.next_cursor: Optional[str] = None
+        self.sort_keys: List[Tuple] = []
+
+
+def _projection(fields: Optional[Iterable[str]], available: Dict[str, str], default: List[str]) -> List[str]:
+    """Validate a `fields` projection against the columns a query can return"""
+    if not fields:
+        return list(default)
+    fields = list(dict.fromkeys(fields))
+    unknown = [name for name in fields if name not in available or name.startswith('_')]
+    if unknown:
+        public = [name for name in available if not name.startswith('_')]
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; available: {', '.join(public)}")
+    return fields
+
+
+def _encode_cursor(keys: Iterable[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(keys)).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str, key_count: int) -> List[Any]:
+    try:
+        keys = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(keys, list) or len(keys) != key_count:
+        raise ValueError("Invalid cursor")
+    return keys
+
+
+def _fetch_page(cursor: sqlite3.Cursor, select: str, params: List[Any], fields: List[str],
+                columns: Dict[str, str], keys: List[str], page_cursor: Optional[str],
+                limit: Optional[int]) -> ResultPage:
+    """
+    Run a query one keyset page at a time and build result dicts lazily
+
+    Args:
+        cursor: Database cursor
+        select: Query from FROM onwards (joins and filters, no ORDER BY/LIMIT)
+        params: Parameters of the query
+        fields: Projected field names
+        columns: SQL expression of every projectable field
+        keys: SQL expressions that order the results and identify a row uniquely
+        page_cursor: next_cursor of the previous page, if any
+        limit: Page size, or None for all rows
+
+    Returns:
+        The page of results
+    """
+    projection = ', '.join(f'{columns[name]} AS "{name}"' for name in fields)
+    key_names = [f'_k{i}' for i in range(len(keys))]
+    key_projection = ', '.join(f'{key} AS {name}' for key, name in zip(keys, key_names))
+    sql = f'SELECT * FROM (SELECT {projection}, {key_projection} {select})'
+    params = list(params)
+    if page_cursor:
+        sql += f' WHERE ({", ".join(key_names)}) > ({", ".join("?" * len(keys))})'
+        params.extend(_decode_cursor(page_cursor, len(keys)))
+    sql += f' ORDER BY {", ".join(key_names)}'
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        sql += ' LIMIT ?'
+        params.append(limit + 1)
+
+    page = ResultPage()
+    width = len(fields)
+    cursor.execute(sql, params)
+    for row in cursor:
+        if limit is not None and len(page) == limit:
+            page.next_cursor = _encode_cursor(page.sort_keys[-1])
+            break
+        page.append(dict(zip(fields, row[:width])))
+        page.sort_keys.append(row[width:])
+    return page
+
+class FuzzySymbolTable:
+    """
+    Compact in-memory symbol table for fuzzy "go to symbol" lookups.
+
+    Distinct symbol names live in parallel arrays indexed by slot, each slot
+    holding the ids of the symbols that share that name. Posting indexes map to
+    slots: trigrams of the lowercase alphanumeric name (for substring queries
+    like "symbolby"), bigrams of the name's word initials (for abbreviations
+    like "gSBL" -> get_symbol_by_location) and the name's first characters (for
+    very short queries), and the full initials map to slots so exact
+    abbreviations are always scored. A query scores the slots in every posting
+    list of its grams, intersecting lists until at most max_candidates remain.
+    Loading adds names shortest first, so when even the intersection is too
+    large (a query like "test") it is cut off after the names most likely to
+    rank highest.
+
+    Slots whose symbols are all removed are left dead; the table compacts
+    itself once dead slots make up a quarter of it.
+    """
+
+    def __init__(self, max_candidates: int = 2000):
+        """
+        Args:
+            max_candidates: Maximum number of names scored per query
+        """
+        self.max_candidates = max_candidates
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        """Drop all symbols"""
+        self.names: List[Optional[str]] = []
+        self._compact_names: List[str] = []
+        self._initials: List[str] = []
+        self._slot_symbols: List[List[int]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._by_file: Dict[int, List[Tuple[int, int]]] = {}
+        self._trigrams: Dict[str, array] = {}
+        self._initial_bigrams: Dict[str, array] = {}
+        self._prefixes: Dict[str, array] = {}
+        self._by_initials: Dict[str, array] = {}
+        self._symbol_count = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return self._symbol_count
+
+    def load(self, conn: sqlite3.Connection):
+        """
+        Replace the table contents with every symbol in the database
+
+        Args:
+            conn: Connection to read symbols from
+        """
+        rows = conn.execute('SELECT id, name, file_id FROM symbols ORDER BY length(name)').fetchall()
+        with self._lock:
+            self._reset()
+            for symbol_id, name, file_id in rows:
+                self._add(symbol_id, name, file_id)
+
+    def clear(self):
+        """Remove all symbols"""
+        with self._lock:
+            self._reset()
+
+    def replace_files(self, file_ids: Iterable[int], rows: List[Tuple[int, str, int]]):
+        """
+        Drop the symbols of the given files and add new symbols
+
+        Replacing a file is idempotent, so applying the same batch twice is safe.
+
+        Args:
+            file_ids: Files whose existing symbols are removed
+            rows: (symbol id, name, file id) of symbols to add
+        """
+        with self._lock:
+            for file_id in set(file_ids).union(row[2] for row in rows):
+                self._remove_file(file_id)
+            for symbol_id, name, file_id in rows:
+                self._add(symbol_id, name, file_id)
+            if self._dead > 10000 and self._dead * 4 > len(self.names):
+                self._compact()
+
+    def _add(self, symbol_id: int, name: str, file_id: int):
+        """Add a symbol, creating and indexing a slot for its name if needed"""
+        slot = self._slot_of.get(name)
+        if slot is None:
+            slot = self._new_slot(name)
+        elif not self._slot_symbols[slot]:
+            # Reviving a dead slot; it is still in every posting list
+            self._dead -= 1
+        self._slot_symbols[slot].append(symbol_id)
+        self._by_file.setdefault(file_id, []).append((slot, symbol_id))
+        self._symbol_count += 1
+
+    def _new_slot(self, name: str) -> int:
+        """Create a slot for a distinct name and post it to the indexes"""
+        slot = len(self.names)
+        compact = ''.join(ch for ch in name.lower() if ch.isalnum())
+        initials = ''.join(word[0] for word in _split_identifier(name))
+
+        self.names.append(name)
+        self._compact_names.append(compact)
+        self._initials.append(initials)
+        self._slot_symbols.append([])
+        self._slot_of[name] = slot
+
+        for gram in {compact[i:i + 3] for i in range(len(compact) - 2)}:
+            self._post(self._trigrams, gram, slot)
+        for gram in {initials[i:i + 2] for i in range(len(initials) - 1)}:
+            self._post(self._initial_bigrams, gram, slot)
+        for prefix in {compact[:1], compact[:2], initials[:1]}:
+            if prefix:
+                self._post(self._prefixes, prefix, slot)
+        if len(initials) > 1:
+            self._post(self._by_initials, initials, slot)
+        return slot
+
+    @staticmethod
+    def _post(postings: Dict[str, array], key: str, slot: int):
+        """Add a slot to a posting list"""
+        posting = postings.get(key)
+        if posting is None:
+            posting = postings[key] = array('i')
+        posting.append(slot)
+
+    def _remove_file(self, file_id: int):
+        """Remove every symbol of a file"""
+        for slot, symbol_id in self._by_file.pop(file_id, ()):
+            symbols = self._slot_symbols[slot]
+            symbols.remove(symbol_id)
+            self._symbol_count -= 1
+            if not symbols:
+                self._dead += 1
+
+    def _compact(self):
+        """Rebuild the table without dead slots"""
+        live = [(symbol_id, self.names[slot], file_id)
+                for file_id, entries in self._by_file.items()
+                for slot, symbol_id in entries]
+        live.sort(key=lambda row: len(row[1]))
+        self._reset()
+        for symbol_id, name, file_id in live:
+            self._add(symbol_id, name, file_id)
+
+    def _intersect(self, postings: List[array]) -> Sequence[int]:
+        """
+        Slots in every posting list, in the order of the shortest one
+
+        Lists are intersected only until at most max_candidates slots remain,
+        so the result may still hold slots missing from the longest lists.
+        """
+        postings = sorted(postings, key=len)
+        shortest = postings[0]
+        if len(shortest) <= self.max_candidates:
+            return shortest
+        keep = set(shortest)
+        for posting in postings[1:]:
+            keep.intersection_update(posting)
+            if len(keep) <= self.max_candidates:
+                break
+        return [slot for slot in shortest if slot in keep]
+
+    def _candidates(self, compact: str) -> Iterable[int]:
+        """Pick the slots every match must appear in, plus those whose initials are the query"""
+        if len(compact) < 3:
+            # Short queries: names or word initials starting with the query
+            lists = [self._prefixes.get(compact)]
+            if len(compact) == 2:
+                lists.append(self._initial_bigrams.get(compact))
+        else:
+            # A match is a substring (all trigrams present) or an abbreviation
+            # (all initial bigrams present); names rarely have more than 8 words
+            grams = [self._trigrams.get(compact[i:i + 3]) for i in range(len(compact) - 2)]
+            lists = [self._intersect(grams) if all(grams) else None]
+            if len(compact) <= 8:
+                grams = [self._initial_bigrams.get(compact[i:i + 2]) for i in range(len(compact) - 1)]
+                lists.append(self._intersect(grams) if all(grams) else None)
+        # Names whose initials are exactly the query rank near the top; never cut them off
+        exact_initials = self._by_initials.get(compact)
+        candidates = dict.fromkeys(exact_initials[:self.max_candidates] if exact_initials else ())
+        lists = [posting for posting in lists if posting]
+        if not lists:
+            return candidates
+        # Each list contributes its shortest names
+        share = self.max_candidates // len(lists)
+        for posting in lists:
+            candidates.update(dict.fromkeys(posting[:share]))
+        return candidates
+
+    @staticmethod
+    def _score_abbreviation(compact_query: str, compact: str, initials: str) -> float:
+        """Score a name that doesn't contain the query as a substring; 0 is no match"""
+        if initials == compact_query:
+            return 75.0
+        if initials.startswith(compact_query):
+            return 65.0
+        # Subsequence match, rewarded for hitting word initials
+        start = 0
+        for ch in compact_query:
+            start = compact.find(ch, start) + 1
+            if not start:
+                return 0.0
+        hits = sum(1 for ch in compact_query if ch in initials)
+        return 20.0 + 20.0 * hits / len(compact_query)
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[float, int, str]]:
+        """
+        Find the symbols that best match a fuzzy query
+
+        Matches rank as exact, then prefix, then abbreviation of the word
+        initials, then substring, then any other subsequence; names starting
+        with the query verbatim get a bonus and shorter names win ties.
+
+        Args:
+            query: Name, prefix, substring or camelCase abbreviation of a symbol
+            limit: Maximum number of results to return
+
+        Returns:
+            List of (score, symbol id, name), best match first
+        """
+        compact_query = ''.join(ch for ch in query.lower() if ch.isalnum())
+        if not compact_query:
+            return []
+        query_length = len(compact_query)
+
+        with self._lock:
+            names = self.names
+            compacts = self._compact_names
+            initials = self._initials
+            slot_symbols = self._slot_symbols
+            score_abbreviation = self._score_abbreviation
+            scored = []
+            # Scoring is inlined for the common substring cases; this loop is
+            # the whole cost of a query
+            for slot in self._candidates(compact_query):
+                if not slot_symbols[slot]:
+                    continue
+                compact = compacts[slot]
+                position = compact.find(compact_query)
+                if position == 0:
+                    score = 100.0 if len(compact) == query_length else 80.0
+                elif position > 0:
+                    initial = initials[slot]
+                    if initial.startswith(compact_query):
+                        score = 75.0 if initial == compact_query else 65.0
+                    else:
+                        score = 55.0 - (position if position < 10 else 10)
+                else:
+                    score = score_abbreviation(compact_query, compact, initials[slot])
+                    if not score:
+                        continue
+                name = names[slot]
+                if name.startswith(query):
+                    score += 10.0 if len(name) == len(query) else 5.0
+                scored.append((score - len(compact) * 0.1, slot))
+
+            results = []
+            for score, slot in heapq.nlargest(limit, scored):
+                for symbol_id in slot_symbols[slot]:
+                    results.append((score, symbol_id, names[slot]))
+                if len(results) >= limit:
+                    break
+        return results[:limit]
+
+class _IndexWriter:
+    """
+    Single writer stage for the indexing pipeline.
+
+    Parse workers hand finished (file row, [symbol rows], dependencies, references) records
+    (see _read_and_parse) to the writer through a bounded queue (a removed file
+    is queued as a bare path), so a slow disk applies back-pressure to the
+    workers instead of letting parsed records pile up in memory. The writer owns the
+    only write connection and applies records with executemany in large
+    transactions, flushing whenever the row or time budget of a batch is used up.
+    """
+
+    _STOP = object()
+
+    def __init__(self, indexer: 'CodebaseIndexer', known_files: Dict[str, Tuple[int, str]],
+                 max_rows: int = 20000, max_seconds: float = 1.0, max_pending: int = 256):
+        """
+        Args:
+            indexer: The indexer whose database and counters the writer updates
+            known_files: Mapping of relative path -> (file id, content hash) for files
+                         already in the database
+            max_rows: Flush a batch once it holds this many rows
+            max_seconds: Flush a batch once it has been open for this many seconds
+            max_pending: Maximum number of parsed records waiting for the writer
+        """
+        self.indexer = indexer
+        self.known_files = known_files
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.files_written = 0
+        self.batches_written = 0
+        self.files_removed = 0
+        self._next_symbol_id = 0
+        self._unresolved_files = set()  # Files written with imports still to resolve
+        self._files_added_or_removed = False
+        self._reference_files = set()  # Files whose uses of imported names need resolving
+        self._thread = threading.Thread(target=self._run, name="codebase-index-writer", daemon=True)
+
+    def start(self):
+        """Start the writer thread"""
+        self._thread.start()
+
+    def put(self, record: Tuple):
+        """
+        Queue a parsed file for writing, blocking while the writer is behind
+
+        Args:
+            record: (file row, symbol rows, dependencies, references) from _read_and_parse;
+                    all but the file row are None if the file is unchanged
+        """
+        self.queue.put(record)
+
+    def remove(self, rel_path: str):
+        """
+        Queue removal of a file that no longer exists from the index
+
+        Args:
+            rel_path: Path of the file relative to the workspace root
+        """
+        self.queue.put((rel_path, None, None, None))
+
+    def close(self):
+        """Flush all queued records and wait for the writer thread to finish"""
+        self.queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        """Writer loop: collect records into batches and apply them"""
+        conn = storage.connect(self.indexer.db_path)
+        batch = []
+        batch_rows = 0
+        batch_started = 0.0
+        try:
+            # This is the only writer, so it can hand out symbol ids itself and use
+            # them for the symbols_fts rows in the same batch
+            self._next_symbol_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM symbols').fetchone()[0] + 1
+            while True:
+                timeout = None
+                if batch:
+                    timeout = max(0.0, batch_started + self.max_seconds - time.time())
+                try:
+                    record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    record = None
+
+                if record is self._STOP:
+                    break
+
+                if record is not None:
+                    if not batch:
+                        batch_started = time.time()
+                    batch.append(record)
+                    batch_rows += 1 + len(record[1] or ()) + len(record[2] or ()) + len(record[3] or ())
+
+                if batch and (batch_rows >= self.max_rows or time.time() - batch_started >= self.max_seconds):
+                    self._flush(conn, batch)
+                    batch = []
+                    batch_rows = 0
+
+            if batch:
+                self._flush(conn, batch)
+            self._resolve_imports(conn)
+            self._resolve_references(conn)
+            if self.files_removed:
+                # Removals are where the counters can drift; count once at the end of the run
+                self.indexer._recount(conn)
+        finally:
+            conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, batch: List[Tuple]):
+        """Apply a batch of records in a single transaction"""
+        started = time.perf_counter()
+        now = time.time()
+        touched = []
+        stale_ids = []
+        new_files = 0
+        symbol_rows = []
+        dependency_rows = []
+        reference_rows = []
+        fingerprint_rows = []
+        written_files = {}
+        removed_paths = []
+        removed_set = set()
+        removed_ids = []
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN')
+
+            for file_row, symbols, dependencies, references in batch:
+                if isinstance(file_row, str):
+                    # Removal of a deleted or renamed file; a path may be queued more than once
+                    if file_row in removed_set:
+                        continue
+                    removed_set.add(file_row)
+                    removed_paths.append((file_row,))
+                    existing = self.known_files.get(file_row)
+                    if existing:
+                        removed_ids.append((existing[0],))
+                    continue
+
+                path, language, size, modified_time, content_hash, mtime_ns, inode = file_row
+                existing = self.known_files.get(path)
+                fingerprint_rows.append((path, size, mtime_ns, inode))
+
+                if symbols is None:
+                    # File exists and hasn't changed
+                    touched.append((now, existing[0]))
+                    continue
+
+                if existing:
+                    file_id = existing[0]
+                    cursor.execute('''
+                    UPDATE files SET
+                        language = ?,
+                        size = ?,
+                        modified_time = ?,
+                        content_hash = ?,
+                        indexed_time = ?
+                    WHERE id = ?
+                    ''', (language, size, modified_time, content_hash, now, file_id))
+                    stale_ids.append((file_id,))
+                else:
+                    cursor.execute('''
+                    INSERT INTO files
+                        (path, language, size, modified_time, content_hash, indexed_time)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (path, language, size, modified_time, content_hash, now))
+                    file_id = cursor.lastrowid
+                    new_files += 1
+
+                written_files[path] = (file_id, content_hash)
+
+                local_symbols = {}
+                for symbol in symbols:
+                    symbol_rows.append((self._next_symbol_id, symbol[0], symbol[1], file_id) + symbol[2:])
+                    local_symbols.setdefault(symbol[0], self._next_symbol_id)
+                    self._next_symbol_id += 1
+                dependency_rows.extend((file_id, dep, 'import') for dep in dependencies)
+                # Uses of names defined in the same file point at their symbol; the
+                # rest may resolve through the file's imports once they are resolved
+                reference_rows.extend((name, local_symbols.get(name), file_id, line, column)
+                                      for name, line, column in references)
+
+            if touched:
+                cursor.executemany('UPDATE files SET indexed_time = ? WHERE id = ?', touched)
+
+            cursor.executemany('''
+            INSERT OR REPLACE INTO file_fingerprints (path, size, mtime_ns, inode)
+            VALUES (?, ?, ?, ?)
+            ''', fingerprint_rows)
+
+            # Delete old symbols and dependencies of files being replaced or removed
+            deleted_symbols = 0
+            if stale_ids or removed_ids:
+                old_ids = stale_ids + removed_ids
+                # Uses in importing files point at symbol ids that are about to go
+                for (file_id,) in old_ids:
+                    self._reference_files.update(source_id for (source_id,) in cursor.execute(
+                        'SELECT source_file_id FROM dependencies WHERE target_file_id = ?', (file_id,)))
+                if self.indexer.fts_enabled:
+                    cursor.executemany('''
+                    DELETE FROM symbols_fts WHERE rowid IN (SELECT id FROM symbols WHERE file_id = ?)
+                    ''', old_ids)
+                cursor.executemany('DELETE FROM symbols WHERE file_id = ?', old_ids)
+                deleted_symbols = max(cursor.rowcount, 0)
+                cursor.executemany('DELETE FROM dependencies WHERE source_file_id = ?', old_ids)
+                cursor.executemany('DELETE FROM symbol_references WHERE file_id = ?', old_ids)
+
+            deleted_files = 0
+            if removed_paths:
+                # Imports of removed files become unresolved, and may resolve elsewhere
+                cursor.executemany('UPDATE dependencies SET target_file_id = NULL WHERE target_file_id = ?',
+                                   removed_ids)
+                cursor.executemany('DELETE FROM files WHERE id = ?', removed_ids)
+                deleted_files = max(cursor.rowcount, 0)
+                cursor.executemany('DELETE FROM file_fingerprints WHERE path = ?', removed_paths)
+
+            cursor.executemany('''
+            INSERT INTO symbols
+                (id, name, type, file_id, line_start, line_end, column_start, column_end,
+                 signature, docstring, parent, byte_start, byte_end)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', symbol_rows)
+
+            if self.indexer.fts_enabled:
+                cursor.executemany('''
+                INSERT INTO symbols_fts (rowid, name, terms, signature, docstring, parent)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', [_fts_row(row[0], row[1], row[8], row[9], row[10]) for row in symbol_rows])
+
+            cursor.executemany('''
+            INSERT INTO dependencies (source_file_id, target, type)
+            VALUES (?, ?, ?)
+            ''', dependency_rows)
+
+            cursor.executemany('''
+            INSERT OR IGNORE INTO symbol_references (name, symbol_id, file_id, line, column)
+            VALUES (?, ?, ?, ?, ?)
+            ''', reference_rows)
+
+            # Keep the stored counts exact so status queries never have to count rows
+            file_delta = new_files - deleted_files
+            symbol_delta = len(symbol_rows) - deleted_symbols
+            cursor.executemany('''
+            UPDATE metadata SET value = CAST(CAST(value AS INTEGER) + ? AS TEXT) WHERE key = ?
+            ''', [(file_delta, 'file_count'), (symbol_delta, 'symbol_count')])
+
+            conn.commit()
+
+            self.indexer.symbol_table.replace_files(
+                [file_id for (file_id,) in stale_ids + removed_ids],
+                [(row[0], row[1], row[3]) for row in symbol_rows]
+            )
+            self.known_files.update(written_files)
+            for (path,) in removed_paths:
+                self.known_files.pop(path, None)
+            self.indexer.dependency_graph.add_files({file_id: path for path, (file_id, _) in written_files.items()})
+            self.indexer.dependency_graph.remove_files(file_id for (file_id,) in removed_ids)
+            self.indexer.symbol_intervals.invalidate(list(written_files) + [path for (path,) in removed_paths])
+            self._unresolved_files.update(file_id for file_id, _ in written_files.values())
+            self._reference_files.update(file_id for file_id, _ in written_files.values())
+            if new_files or removed_ids:
+                self._files_added_or_removed = True
+            self.indexer.file_count += file_delta
+            self.indexer.symbol_count += symbol_delta
+            if written_files or removed_paths:
+                self.indexer.index_generation += 1
+            self.files_written += len(batch)
+            self.files_removed += len(removed_paths)
+            self.batches_written += 1
+
+            metrics = self.indexer.metrics
+            metrics.observe('writer_batch_seconds', time.perf_counter() - started)
+            metrics.record((
+                ('writer.batches', 1), ('writer.files', len(batch) - len(removed_paths)),
+                ('writer.files_removed', len(removed_paths)), ('writer.symbols', len(symbol_rows)),
+                ('writer.references', len(reference_rows)), ('writer.dependencies', len(dependency_rows)),
+            ))
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            # Ids handed out in the failed transaction were never used
+            self._next_symbol_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM symbols').fetchone()[0] + 1
+            logger.error(f"Error writing index batch of {len(batch)} files: {e}")
+
+    def _resolve_imports(self, conn: sqlite3.Connection):
+        """
+        Resolve the imports of written files to file ids once all batches are in
+
+        Runs after the last batch so imports of files written later in the same
+        run resolve. When files were added or removed, every unresolved import
+        in the index is retried as well.
+        """
+        if not self._unresolved_files and not self._files_added_or_removed:
+            return
+        try:
+            resolver = ImportResolver(conn.execute('SELECT id, path FROM files'))
+            if self._files_added_or_removed:
+                rows = conn.execute('''
+                SELECT d.id, d.source_file_id, d.target, f.path
+                FROM dependencies d
+                JOIN files f ON d.source_file_id = f.id
+                WHERE d.target_file_id IS NULL
+                ''').fetchall()
+            else:
+                rows = []
+                for file_id in self._unresolved_files:
+                    rows.extend(conn.execute('''
+                    SELECT d.id, d.source_file_id, d.target, f.path
+                    FROM dependencies d
+                    JOIN files f ON d.source_file_id = f.id
+                    WHERE d.source_file_id = ? AND d.target_file_id IS NULL
+                    ''', (file_id,)))
+
+            updates = []
+            changed_sources = set(self._unresolved_files)
+            for dependency_id, source_id, target, source_path in rows:
+                target_id = resolver.resolve(source_path, target)
+                if target_id is not None and target_id != source_id:
+                    updates.append((target_id, dependency_id))
+                    changed_sources.add(source_id)
+
+            conn.execute('BEGIN')
+            conn.executemany('UPDATE dependencies SET target_file_id = ? WHERE id = ?', updates)
+            conn.commit()
+            logger.info(f"Resolved {len(updates)} of {len(rows)} unresolved imports")
+
+            graph = self.indexer.dependency_graph
+            if graph.loaded:
+                edges = {}
+                for source_id in changed_sources:
+                    edges[source_id] = {target_id for (target_id,) in conn.execute('''
+                    SELECT target_file_id FROM dependencies
+                    WHERE source_file_id = ? AND target_file_id IS NOT NULL
+                    ''', (source_id,))}
+                graph.set_edges(edges)
+            self._reference_files.update(changed_sources)
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error resolving imports: {e}")
+        finally:
+            self._unresolved_files.clear()
+            self._files_added_or_removed = False
+
+    def _resolve_references(self, conn: sqlite3.Connection):
+        """
+        Point uses of imported names at their symbols once imports are resolved
+
+        A name that is not defined in its own file resolves to the top-level
+        symbol of that name in a file it imports. Runs for the files written in
+        this run, files whose imports changed and importers of rewritten or
+        removed files, whose previous symbol ids are gone.
+        """
+        if not self._reference_files:
+            return
+        started = time.perf_counter()
+        try:
+            updates = []
+            for file_id in self._reference_files:
+                imported = dict(conn.execute('''
+                SELECT s.name, MIN(s.id)
+                FROM dependencies d
+                JOIN symbols s ON s.file_id = d.target_file_id
+                WHERE d.source_file_id = ? AND s.parent = ''
+                GROUP BY s.name
+                ''', (file_id,)))
+                # Uses of local names already point at their symbol; the rest may be stale
+                rows = conn.execute('''
+                SELECT line, column, name, symbol_id FROM symbol_references
+                WHERE file_id = ? AND (symbol_id IS NULL OR symbol_id NOT IN (SELECT id FROM symbols WHERE file_id = ?))
+                ''', (file_id, file_id))
+                updates.extend((imported.get(name), file_id, line, column, name)
+                               for line, column, name, symbol_id in rows if imported.get(name) != symbol_id)
+
+            conn.execute('BEGIN')
+            conn.executemany('''
+            UPDATE symbol_references SET symbol_id = ?
+            WHERE file_id = ? AND line = ? AND column = ? AND name = ?
+            ''', updates)
+            conn.commit()
+            logger.info(f"Resolved {len(updates)} uses of imported names in {len(self._reference_files)} files "
+                        f"in {time.perf_counter() - started:.2f} seconds")
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Error resolving references: {e}")
+        finally:
+            self._reference_files.clear()
+
+
+class CodebaseIndexer(IndexJobRunner):
     """
     Builds and maintains a searchable index of code structures, dependencies, and relationships.
     Uses SQLite for storage and provides a query interface for efficient codebase exploration.
     """
     
-    def __init__(self, workspace_root: str, db_path: Optional[str] = None):
+    # Directories that are never indexed
+    IGNORED_DIRS = frozenset([
+        '.git', 'node_modules', 'venv', 'env', '__pycache__',
+        'dist', 'build', '.idea', '.vscode', '.pytest_cache',
+        'out', 'bin', 'obj', '.DS_Store'
+    ])
+    
+    def __init__(self, workspace_root: str, db_path: Optional[str] = None, parse_mode: str = 'thread',
+                 excluded_dirs: Iterable[str] = (), ignore_root: Optional[str] = None):
         """
         Initialize the indexer with the workspace root path
         
         Args:
             workspace_root: Root directory of the workspace to index
             db_path: Path to the SQLite database file (defaults to .tribe/codebase_index.db)
+            parse_mode: "thread" to parse on a thread pool, "process" to parse on a
+                        process pool that scales with cores for large workspaces
+            excluded_dirs: Directories relative to the workspace root that are left out
+                           of this index (e.g. packages that have an index of their own)
+            ignore_root: Ancestor directory whose ignore files apply to this index too
+                         (e.g. the monorepo root, for the index of one package)
         """
         self.workspace_root = workspace_root
+        self.excluded_dirs = frozenset(os.path.normpath(path) for path in excluded_dirs)
         
         # Default DB path in the .tribe directory
         if db_path is None:
@@ -73,12 +887,38 @@ class CodebaseIndexer:
             
         self.db_path = db_path
         self.conn = None
+        self.read_pool = None
         self.index_lock = threading.Lock()
         self.indexing_in_progress = False
         self.last_indexed = 0
         self.file_count = 0
         self.symbol_count = 0
-        self._thread_local = threading.local() # Thread-local storage for SQLite connections
+        self.fts_enabled = False
+        self.symbol_table = FuzzySymbolTable()
+        self.dependency_graph = DependencyGraph()
+        self.symbol_intervals = IntervalCache()
+        self.metrics = IndexMetrics()
+        # Indexed content of files, for slicing symbol code once a file has changed
+        self.blob_store = BlobStore(os.path.splitext(os.path.abspath(db_path))[0] + '_blobs')
+        self._source_cache = collections.OrderedDict()  # content hash -> file content
+        self._source_cache_bytes = 0
+        self._source_cache_limit = 32 * 1024 * 1024
+        self._source_cache_lock = threading.Lock()
+        self._symbol_table_loaded = threading.Event()
+        self.watcher = None
+        self.parse_mode = parse_mode
+        self.work_unit_files = 32           # Files per process pool work unit...
+        self.work_unit_bytes = 1024 * 1024  # ...or fewer once they add up to this much source
+        self.progress_rate = 4.0            # Progress callbacks per second at most during indexing
+        self._init_jobs()
+        self.hot_files = HotFiles()         # Files to index first: open in the editor or recently changed
+        self.prioritize_git_activity = True
+        self._work_queue: Optional[PriorityWorkQueue] = None  # Files still waiting in the current run
+        self._conn_lock = threading.RLock() # Serializes use of self.conn across client threads
+        self.index_generation = 0           # Bumped on every write, so derived indexes know they are stale
+        self.count_check_interval = 60.0    # Seconds between checks of the stored counts against the tables
+        self._counts_checked = 0.0
+        self.semantic: Optional[SemanticIndex] = None  # Created by the first semantic_search
         
         # Language parsers
         self.language_map = {
@@ -110,22 +950,24 @@ class CodebaseIndexer:
         }
         
         # Ignored directories
-        self.ignored_dirs = set([
-            '.git', 'node_modules', 'venv', 'env', '__pycache__', 
-            'dist', 'build', '.idea', '.vscode', '.pytest_cache',
-            'out', 'bin', 'obj', '.DS_Store'
-        ])
+        self.ignored_dirs = set(self.IGNORED_DIRS)
+        
+        # Single-pass scanner shared by estimate_files and index_workspace; it also
+        # honours .gitignore and .tribeignore files
+        self.scanner = WorkspaceScanner(workspace_root, self.language_map, self._should_watch_dir,
+                                        excluded_dirs=self.excluded_dirs, ignore_root=ignore_root)
         
         # Initialize database
         self._init_database()
         
+        # Load the fuzzy symbol table in the background so startup isn't delayed
+        threading.Thread(target=self._load_symbol_table, name="codebase-symbol-table", daemon=True).start()
+        
     def _init_database(self):
         """Initialize the SQLite database schema"""
         try:
-            # Create a new connection for the main thread
-            self.conn = sqlite3.connect(self.db_path)
-            # Store it in thread_local for the current thread
-            self._thread_local.conn = self.conn
+            # Schema and maintenance connection, shared by client threads under _conn_lock
+            self.conn = storage.connect(self.db_path, check_same_thread=False)
             cursor = self.conn.cursor()
             
             # Files table
@@ -156,16 +998,37 @@ class CodebaseIndexer:
                 docstring TEXT,
                 parent TEXT,
                 code TEXT,
+                byte_start INTEGER,
+                byte_end INTEGER,
                 FOREIGN KEY (file_id) REFERENCES files(id)
             )
             ''')
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(symbols)')]
+            if 'byte_start' not in columns:
+                # Code used to be stored inline (the column is kept but left empty);
+                # reparse every file to record offsets instead
+                cursor.execute('ALTER TABLE symbols ADD COLUMN byte_start INTEGER')
+                cursor.execute('ALTER TABLE symbols ADD COLUMN byte_end INTEGER')
+                cursor.execute('DELETE FROM file_fingerprints')
+                cursor.execute('UPDATE files SET content_hash = NULL')
             
             # Create indexes
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols (name)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols (type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols (file_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_path ON files (path)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_language ON files (language)')
             
+            # Stat fingerprints of indexed files, checked before a file is opened
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_fingerprints (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER
+            ) WITHOUT ROWID
+            ''')
+            
             # Dependencies table
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS dependencies (
@@ -173,22 +1036,53 @@ class CodebaseIndexer:
                 source_file_id INTEGER,
                 target TEXT,
                 type TEXT,
-                FOREIGN KEY (source_file_id) REFERENCES files(id)
+                target_file_id INTEGER,
+                FOREIGN KEY (source_file_id) REFERENCES files(id),
+                FOREIGN KEY (target_file_id) REFERENCES files(id)
             )
             ''')
-            
-            # References table
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(dependencies)')]
+            if 'target_file_id' not in columns:
+                # Imports used to be stored unresolved; reparse every file to resolve them
+                cursor.execute('ALTER TABLE dependencies ADD COLUMN target_file_id INTEGER')
+                cursor.execute('DELETE FROM file_fingerprints')
+                cursor.execute('UPDATE files SET content_hash = NULL')
+            # Forward and reverse adjacency, and lookup by import string
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_dependencies_source
+            ON dependencies (source_file_id, target_file_id)
+            ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_dependencies_target
+            ON dependencies (target_file_id, source_file_id)
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_dependencies_name ON dependencies (target)')
+            
+            # References table: one row per use of a name, clustered by file so a
+            # file's rows are replaced with a range delete. symbol_id is set when
+            # the name is defined in the same file or at the top level of a file
+            # it imports. Indexes created before
+            # references were extracted have an older, always empty table; its
+            # files are reparsed on the next run to fill the new one
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(symbol_references)')]
+            if columns and 'name' not in columns:
+                cursor.execute('DROP TABLE symbol_references')
+                cursor.execute('DELETE FROM file_fingerprints')
+                cursor.execute('UPDATE files SET content_hash = NULL')
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS symbol_references (
-                id INTEGER PRIMARY KEY,
-                symbol_id INTEGER,
                 file_id INTEGER,
                 line INTEGER,
                 column INTEGER,
+                name TEXT,
+                symbol_id INTEGER,
+                PRIMARY KEY (file_id, line, column, name),
                 FOREIGN KEY (symbol_id) REFERENCES symbols(id),
                 FOREIGN KEY (file_id) REFERENCES files(id)
-            )
+            ) WITHOUT ROWID
             ''')
+            # Covering index for find_references (the primary key columns are implied)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_references_name ON symbol_references(name, symbol_id)')
             
             # Metadata table
             cursor.execute('''
@@ -200,6 +1094,9 @@ class CodebaseIndexer:
             
             self.conn.commit()
             
+            # Full-text index over symbols, kept in sync by the index writer
+            self._init_fts(cursor)
+            
             # Initialize metadata
             try:
                 cursor.execute('INSERT OR IGNORE INTO metadata (key, value) VALUES (?, ?)', 
@@ -228,15 +1125,73 @@ class CodebaseIndexer:
                 if row:
                     self.symbol_count = int(row[0])
                 
+                # The writer keeps the stored counts exact; older indexes only updated
+                # them after full runs, so count once before relying on them
+                cursor.execute('SELECT value FROM metadata WHERE key = ?', ('counts_exact',))
+                if not cursor.fetchone():
+                    self.file_count = cursor.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+                    self.symbol_count = cursor.execute('SELECT COUNT(*) FROM symbols').fetchone()[0]
+                    cursor.executemany('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', [
+                        ('file_count', str(self.file_count)),
+                        ('symbol_count', str(self.symbol_count)),
+                        ('counts_exact', '1'),
+                    ])
+                    self.conn.commit()
+                
             except sqlite3.Error as e:
                 logger.error(f"Error initializing metadata: {e}")
             
+            # Read-only connections for queries, usable while indexing writes
+            self.read_pool = storage.ReadConnectionPool(self.db_path)
+            
         except sqlite3.Error as e:
             logger.error(f"Database initialization error: {e}")
             if self.conn:
                 self.conn.close()
             raise
     
+    def _init_fts(self, cursor: sqlite3.Cursor):
+        """Create the symbols_fts table, populating it if the index predates it"""
+        try:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'symbols_fts'")
+            exists = cursor.fetchone() is not None
+            
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+                name, terms, signature, docstring, parent,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            ''')
+            
+            if not exists:
+                cursor.execute('SELECT id, name, signature, docstring, parent FROM symbols')
+                rows = [_fts_row(*row) for row in cursor.fetchall()]
+                cursor.executemany('''
+                INSERT INTO symbols_fts (rowid, name, terms, signature, docstring, parent)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+                if rows:
+                    logger.info(f"Built full-text index for {len(rows)} existing symbols")
+            
+            self.conn.commit()
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5; search falls back to LIKE matching
+            self.conn.rollback()
+            logger.warning(f"Full-text symbol search unavailable: {e}")
+    
+    def _load_symbol_table(self):
+        """Load the fuzzy symbol table from the database"""
+        try:
+            start_time = time.time()
+            with self.read_pool.connection() as conn:
+                self.symbol_table.load(conn)
+            logger.info(f"Loaded {len(self.symbol_table)} symbols for fuzzy search in {time.time() - start_time:.2f} seconds")
+        except sqlite3.Error as e:
+            logger.error(f"Error loading fuzzy symbol table: {e}")
+        finally:
+            self._symbol_table_loaded.set()
+    
     def estimate_files(self, max_file_size: int = 1024 * 1024) -> int:
         """
         Estimate the number of files that would be indexed
@@ -247,37 +1202,16 @@ class CodebaseIndexer:
         Returns:
             int: Estimated number of files to index
         """
-        total_files = 0
-        
         try:
-            for root, dirs, files in os.walk(self.workspace_root):
-                # Skip ignored directories
-                dirs[:] = [d for d in dirs if d not in self.ignored_dirs and not d.startswith('.')]
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    
-                    # Skip files without recognized extensions
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext not in self.language_map:
-                        continue
-                    
-                    # Skip files that are too large
-                    try:
-                        size = os.path.getsize(file_path)
-                        if size > max_file_size:
-                            continue
-                    except OSError:
-                        continue
-                        
-                    total_files += 1
-            
-            return total_files
+            # The snapshot is kept for the index run that usually follows
+            return self.scanner.scan().count(max_file_size)
         except Exception as e:
             logger.error(f"Error estimating files: {e}")
             return 100  # Return a default value if estimation fails
     
-    def index_workspace(self, force: bool = False, max_file_size: int = 1024 * 1024, progress_callback=None):
+    def index_workspace(self, force: bool = False, max_file_size: int = 1024 * 1024, progress_callback=None,
+                        parse_mode: Optional[str] = None, cancel_event: Optional[threading.Event] = None,
+                        resume_since: Optional[float] = None, claimed: bool = False):
         """
         Index the entire workspace or update changed files
         
@@ -286,54 +1220,58 @@ class CodebaseIndexer:
             max_file_size: Maximum file size to index in bytes (default 1MB)
             progress_callback: Optional callback function to report progress
                               Function signature: (processed_files, total_files, current_file)
+            parse_mode: "thread" or "process" (defaults to the indexer's parse_mode)
+            cancel_event: Stop early once this is set; batches already written are kept
+            resume_since: With force, still skip unchanged files indexed at or after this
+                          time, i.e. by an earlier attempt of the same forced run
+            claimed: The caller already set indexing_in_progress under index_lock
         """
         with self.index_lock:
-            if self.indexing_in_progress:
+            if self.indexing_in_progress and not claimed:
                 logger.warning("Indexing already in progress, skipping")
                 return False
                 
-            # Reset counters at the start of indexing
-            if force:
-                self.file_count = 0
-                self.symbol_count = 0
-                
             self.indexing_in_progress = True
         
         try:
             start_time = time.time()
             logger.info(f"Starting codebase indexing of {self.workspace_root}")
             
-            # Get all files in the workspace
+            # Stat fingerprints of files as they were last indexed
+            if not force:
+                fingerprints = self._load_fingerprints()
+            elif resume_since is not None:
+                fingerprints = self._load_fingerprints(indexed_since=resume_since)
+            else:
+                fingerprints = {}
+            
+            # Get all files in the workspace, reusing the scan of a preceding estimate_files
+            scan_started = time.perf_counter()
+            snapshot = self.scanner.take_snapshot()
+            self.metrics.observe('scan_seconds', time.perf_counter() - scan_started)
             all_files = []
-            for root, dirs, files in os.walk(self.workspace_root):
-                # Skip ignored directories
-                dirs[:] = [d for d in dirs if d not in self.ignored_dirs and not d.startswith('.')]
+            seen_paths = set()
+            too_large = unchanged = total_bytes = 0
+            for file_path, rel_path, st, ext in snapshot.files:
+                seen_paths.add(rel_path)
                 
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, self.workspace_root)
-                    
-                    # Skip files without recognized extensions
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext not in self.language_map:
-                        continue
-                    
-                    # Skip files that are too large
-                    try:
-                        size = os.path.getsize(file_path)
-                        if size > max_file_size:
-                            logger.info(f"Skipping large file: {rel_path} ({size} bytes)")
-                            continue
-                    except OSError:
-                        continue
-                    
-                    # Check if file has been modified since last indexing
-                    modified_time = os.path.getmtime(file_path)
-                    if not force and modified_time < self.last_indexed:
-                        continue
-                    
-                    all_files.append((file_path, rel_path, modified_time, ext))
+                # Skip files that are too large
+                if st.st_size > max_file_size:
+                    logger.info(f"Skipping large file: {rel_path} ({st.st_size} bytes)")
+                    too_large += 1
+                    continue
+                
+                # Skip files whose size, mtime and inode are unchanged since last indexing
+                if fingerprints.get(rel_path) == (st.st_size, st.st_mtime_ns, st.st_ino):
+                    unchanged += 1
+                    continue
+                
+                all_files.append((file_path, rel_path, st, ext))
+                total_bytes += st.st_size
             
+            self.metrics.increment('files_scanned', len(snapshot.files))
+            self.metrics.increment('skipped.too_large', too_large)
+            self.metrics.increment('skipped.unchanged_fingerprint', unchanged)
             total_files = len(all_files)
             processed_files = 0
             
@@ -344,37 +1282,59 @@ class CodebaseIndexer:
             if progress_callback:
                 progress_callback(processed_files, total_files, "")
             
-            # Index files using thread pool
-            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-                # Submit all indexing tasks
-                futures = []
-                for file_path, rel_path, modified_time, ext in all_files:
-                    futures.append(executor.submit(
-                        self._index_file, file_path, rel_path, modified_time, ext
-                    ))
+            # Parse files on a thread pool and hand the results to a single writer
+            writer = _IndexWriter(self, self._load_known_files())
+            writer.start()
+            try:
+                # Prune files that were deleted or renamed since the last run
+                removed_paths = [path for path in writer.known_files if path not in seen_paths]
+                for rel_path in removed_paths:
+                    writer.remove(rel_path)
+                if removed_paths:
+                    logger.info(f"Removing {len(removed_paths)} deleted files from the index")
                 
-                # Process results as they complete
-                for i, future in enumerate(futures):
-                    future.result()
-                    processed_files += 1
-                    
-                    # Get current file being processed
-                    current_file = all_files[i][1] if i < len(all_files) else ""
-                    
-                    # Report progress more frequently for better UX
-                    if progress_callback:
-                        # Always report progress for proper UI updates
-                        # For small codebases report every file, for larger ones report regularly
-                        should_report = (total_files < 50 or 
-                                        processed_files % 3 == 0 or
-                                        processed_files == 1 or  # First file
-                                        processed_files == total_files or  # Last file
-                                        i == 0 or  # First file (different way to check)
-                                        i == len(futures) - 1)  # Last file
-                        
-                        if should_report:
-                            logger.info(f"Progress update: {processed_files}/{total_files} files - {current_file}")
-                            progress_callback(processed_files, total_files, current_file)
+                # Coalesce progress in time: however fast files complete, the callback
+                # runs at most progress_rate times a second, plus the first and last file
+                progress_interval = 1.0 / self.progress_rate if self.progress_rate else 0.0
+                last_report = 0.0
+                
+                def report_progress(completed: int, current_file: str):
+                    nonlocal processed_files, last_report
+                    processed_files += completed
+                    if not progress_callback:
+                        return
+                    now = time.monotonic()
+                    if (processed_files == completed or processed_files >= total_files or
+                            now - last_report >= progress_interval):
+                        last_report = now
+                        progress_callback(processed_files, total_files, current_file)
+                
+                # Hand out files hottest first; files marked hot during the run jump the queue
+                if self.prioritize_git_activity:
+                    self._mark_git_activity()
+                work = PriorityWorkQueue(((f[1], f) for f in all_files), self.hot_files.priority)
+                self._work_queue = work
+                
+                if (parse_mode or self.parse_mode) == 'process' and len(all_files) > self.work_unit_files:
+                    self._index_files_in_processes(work, writer, report_progress, cancel_event)
+                else:
+                    self._index_files_in_threads(work, writer, report_progress, cancel_event)
+            finally:
+                self._work_queue = None
+                # Flush everything the workers produced before updating metadata
+                writer.close()
+            
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"Indexing cancelled after {processed_files} of {total_files} files")
+                if progress_callback:
+                    progress_callback(processed_files, total_files, "Indexing cancelled")
+                return False
+            
+            # Drop stored contents that no indexed file refers to any more
+            if writer.files_written:
+                with self.read_pool.connection() as conn:
+                    live_hashes = [row[0] for row in conn.execute('SELECT content_hash FROM files')]
+                self.blob_store.gc(live_hashes)
             
             # Update metadata
             self._update_metadata(time.time())
@@ -384,6 +1344,12 @@ class CodebaseIndexer:
                 progress_callback(total_files, total_files, "Indexing completed successfully!")
             
             end_time = time.time()
+            self.metrics.finish_run(
+                'full', start_time, files=total_files, bytes=total_bytes, scanned=len(snapshot.files),
+                skipped_too_large=too_large, skipped_unchanged=unchanged, removed=len(removed_paths),
+                files_written=writer.files_written, batches=writer.batches_written,
+                parse_mode=parse_mode or self.parse_mode
+            )
             logger.info(f"Finished indexing codebase in {end_time - start_time:.2f} seconds")
             logger.info(f"Indexed {self.file_count} files with {self.symbol_count} symbols")
             
@@ -401,485 +1367,595 @@ class CodebaseIndexer:
         finally:
             self.indexing_in_progress = False
     
-    def _index_file(self, file_path: str, rel_path: str, modified_time: float, ext: str):
-        """Index a single file"""
-        try:
-            # Get file info
-            size = os.path.getsize(file_path)
-            language = self.language_map.get(ext, 'unknown')
-            
-            # Read file contents
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-            
-            # Hash content for change detection
-            import hashlib
-            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
-            
-            # Create thread-local connection if it doesn't exist
-            if not hasattr(self._thread_local, 'conn'):
-                self._thread_local.conn = sqlite3.connect(self.db_path)
-            
-            cursor = self._thread_local.conn.cursor()
-            
-            # Check if file exists in database
-            cursor.execute('SELECT id, content_hash FROM files WHERE path = ?', (rel_path,))
-            row = cursor.fetchone()
-            
-            if row and row[1] == content_hash:
-                # File exists and hasn't changed
-                file_id = row[0]
-                cursor.execute('UPDATE files SET indexed_time = ? WHERE id = ?', 
-                             (time.time(), file_id))
-                self.conn.commit()
-                return
-            
-            # Parse file based on language
-            symbols = []
-            imports = []
-            dependencies = []
-            
-            if language == 'python':
-                symbols, imports, dependencies = self._parse_python(content, rel_path)
-            elif language in ('javascript', 'typescript'):
-                symbols, imports, dependencies = self._parse_js_ts(content, rel_path)
-            # Add more language parsers as needed
-            
-            # Begin transaction
-            self._thread_local.conn.execute('BEGIN TRANSACTION')
+    def _load_known_files(self, paths: Optional[Iterable[str]] = None) -> Dict[str, Tuple[int, str]]:
+        """
+        Load the id and content hash of indexed files, keyed by relative path
+        
+        Args:
+            paths: Only load these paths and any files below them (default: all files)
+        """
+        with self.read_pool.connection() as conn:
+            if paths is None:
+                return {path: (file_id, content_hash) for file_id, path, content_hash
+                        in conn.execute('SELECT id, path, content_hash FROM files')}
+            
+            known = {}
+            for rel_path in paths:
+                cursor = conn.execute('''
+                SELECT id, path, content_hash FROM files
+                WHERE path = ? OR (path > ? AND path < ?)
+                ''', (rel_path, rel_path + os.sep, rel_path + chr(ord(os.sep) + 1)))
+                for file_id, path, content_hash in cursor:
+                    known[path] = (file_id, content_hash)
+            return known
+    
+    def reindex_paths(self, changed: Iterable[str], removed: Iterable[str] = (),
+                      max_file_size: int = 1024 * 1024) -> bool:
+        """
+        Incrementally update the index for specific files without walking the workspace
+        
+        Args:
+            changed: Relative paths of files that were created or modified
+            removed: Relative paths of files or directories that were deleted or renamed away
+            max_file_size: Maximum file size to index in bytes (default 1MB)
             
-            if row:
-                # Update existing file
-                file_id = row[0]
-                cursor.execute('''
-                UPDATE files SET 
-                    language = ?, 
-                    size = ?, 
-                    modified_time = ?,
-                    content_hash = ?,
-                    indexed_time = ?
-                WHERE id = ?
-                ''', (language, size, modified_time, content_hash, time.time(), file_id))
-                
-                # Delete old symbols and references
-                cursor.execute('DELETE FROM symbols WHERE file_id = ?', (file_id,))
-                cursor.execute('DELETE FROM dependencies WHERE source_file_id = ?', (file_id,))
-            else:
-                # Insert new file
-                cursor.execute('''
-                INSERT INTO files 
-                    (path, language, size, modified_time, content_hash, indexed_time) 
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (rel_path, language, size, modified_time, content_hash, time.time()))
-                file_id = cursor.lastrowid
-                
-                # Update file count
-                self.file_count += 1
-            
-            # Add symbols
-            for symbol in symbols:
-                cursor.execute('''
-                INSERT INTO symbols 
-                    (name, type, file_id, line_start, line_end, column_start, column_end, 
-                     signature, docstring, parent, code) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol.name, symbol.type, file_id, symbol.line_start, symbol.line_end,
-                    symbol.column_start, symbol.column_end, symbol.signature, 
-                    symbol.docstring, symbol.parent, symbol.code
-                ))
-                symbol_id = cursor.lastrowid
-                self.symbol_count += 1
+        Returns:
+            False if another indexing run holds the writer, or a full pass (for "." or a
+            changed ignore file) did not finish, and the caller should retry
+        """
+        changed = set(changed)
+        removed = set(removed) - changed
+        
+        if any(os.path.basename(path) in IGNORE_FILES for path in changed | removed):
+            # Ignore rules changed; a full pass adds newly included files and prunes excluded ones
+            changed.add('.')
+        
+        if '.' in changed:
+            # The watcher lost events; fall back to a full (fingerprint-checked) pass
+            with self.index_lock:
+                if self.indexing_in_progress:
+                    return False
+                self.indexing_in_progress = True
+            self.scanner.invalidate()
+            return self.index_workspace(max_file_size=max_file_size, claimed=True)
+        
+        with self.index_lock:
+            if self.indexing_in_progress:
+                return False
+            self.indexing_in_progress = True
+        
+        start_time = time.time()
+        try:
+            writer = _IndexWriter(self, self._load_known_files(changed | removed))
+            writer.start()
+            try:
+                # A removed directory takes every file below it along; the watcher may report
+                # both a directory and files inside it, so each file is removed once
+                to_remove = set()
+                for rel_path in removed:
+                    to_remove.update(path for path in writer.known_files
+                                     if path == rel_path or path.startswith(rel_path + os.sep))
+                for known_path in sorted(to_remove):
+                    writer.remove(known_path)
                 
-                # Add references (if available)
-                for ref in symbol.references:
-                    # Parse reference information
-                    pass  # Implement reference tracking
-            
-            # Add dependencies
-            for dep in dependencies:
-                cursor.execute('''
-                INSERT INTO dependencies (source_file_id, target, type)
-                VALUES (?, ?, ?)
-                ''', (file_id, dep, 'import'))
-            
-            # Commit transaction
-            self._thread_local.conn.commit()
+                for rel_path in sorted(changed):
+                    if not self._should_index_path(rel_path):
+                        continue
+                    file_path = os.path.join(self.workspace_root, rel_path)
+                    try:
+                        st = os.stat(file_path)
+                    except OSError:
+                        # Gone again before we got to it
+                        if rel_path in writer.known_files and rel_path not in to_remove:
+                            to_remove.add(rel_path)
+                            writer.remove(rel_path)
+                        continue
+                    if st.st_size > max_file_size:
+                        continue
+                    ext = os.path.splitext(rel_path)[1].lower()
+                    self._index_file(file_path, rel_path, st, ext, writer)
+            finally:
+                writer.close()
+            
+            self.metrics.finish_run('incremental', start_time, files=len(changed), removed=len(removed),
+                                    files_written=writer.files_written, batches=writer.batches_written)
+            if writer.files_written:
+                logger.info(f"Incrementally reindexed {writer.files_written} changed files")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error during incremental reindex: {e}")
+            return True
+        finally:
+            self.indexing_in_progress = False
+    
+    def _should_watch_dir(self, name: str) -> bool:
+        """Whether a directory with this name is part of the indexed workspace"""
+        return name not in self.ignored_dirs and not name.startswith('.')
+    
+    def _should_index_path(self, rel_path: str) -> bool:
+        """Whether a relative file path would be picked up by index_workspace"""
+        parts = rel_path.split(os.sep)
+        if not all(self._should_watch_dir(part) for part in parts[:-1]):
+            return False
+        if self.excluded_dirs and any(os.sep.join(parts[:i]) in self.excluded_dirs for i in range(1, len(parts))):
+            return False
+        if os.path.splitext(parts[-1])[1].lower() not in self.language_map:
+            return False
+        return not self.scanner.is_ignored(rel_path)
+    
+    def prioritize_files(self, paths: Iterable[str], reindex: bool = True) -> Dict[str, int]:
+        """
+        Index files the user is working on (e.g. opened or saved in the editor) first
+        
+        During an indexing run the files jump ahead of everything still waiting.
+        Outside of a run they are brought up to date right away, so the working
+        set is searchable even before the first full index exists.
+        
+        Args:
+            paths: Absolute paths or paths relative to the workspace root
+            reindex: Update files that are stale when no run is going
             
-        except Exception as e:
-            # Use thread-local connection for rollback
-            if hasattr(self._thread_local, 'conn'):
-                self._thread_local.conn.rollback()
-            logger.error(f"Error indexing file {rel_path}: {e}")
+        Returns:
+            Counts of files marked hot, promoted in the current run and reindexed
+        """
+        rel_paths = []
+        for path in paths:
+            if os.path.isabs(path):
+                path = os.path.relpath(path, self.workspace_root)
+            path = os.path.normpath(path)
+            if not path.startswith(os.pardir) and self._should_index_path(path):
+                rel_paths.append(path)
+        
+        raised = self.hot_files.mark(rel_paths, EDITOR)
+        work = self._work_queue
+        promoted = work.promote(raised) if work is not None else 0
+        reindexed = 0
+        if work is None and reindex and rel_paths and not self.indexing_in_progress:
+            existing = [path for path in rel_paths if os.path.isfile(os.path.join(self.workspace_root, path))]
+            if existing and self.reindex_paths(existing):
+                reindexed = len(existing)
+        return {"hot": len(rel_paths), "promoted": promoted, "reindexed": reindexed}
     
-    def _update_metadata(self, timestamp: float):
-        """Update indexing metadata"""
+    def _mark_git_activity(self):
+        """Mark files with uncommitted changes or in recent commits as hot, most recent first"""
+        started = time.perf_counter()
+        paths = recent_git_files(self.workspace_root)
+        now = time.time()
+        for i, path in enumerate(paths):
+            self.hot_files.mark([path], GIT, when=now - i)
+        self.metrics.observe('git_activity_seconds', time.perf_counter() - started)
+    
+    def _load_job_checkpoint(self) -> Optional[str]:
+        """The record of the job that was running when the process last stopped, if any"""
         try:
-            # Use thread-local connection for metadata updates to avoid thread issues
-            if not hasattr(self._thread_local, 'conn'):
-                self._thread_local.conn = sqlite3.connect(self.db_path)
-            
-            cursor = self._thread_local.conn.cursor()
-            cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', 
-                         (str(timestamp), 'last_indexed'))
-            cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', 
-                         (str(self.file_count), 'file_count'))
-            cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', 
-                         (str(self.symbol_count), 'symbol_count'))
-            self._thread_local.conn.commit()
-            self.last_indexed = timestamp
+            with self.read_pool.connection() as conn:
+                row = conn.execute('SELECT value FROM metadata WHERE key = ?', ('index_job',)).fetchone()
+            return row[0] if row else None
         except sqlite3.Error as e:
-            logger.error(f"Error updating metadata: {e}")
+            logger.error(f"Error reading indexing job checkpoint: {e}")
+            return None
     
-    def _parse_python(self, content: str, file_path: str) -> Tuple[List[SymbolInfo], List[str], List[str]]:
-        """Parse Python file to extract symbols, imports and dependencies"""
-        symbols = []
-        imports = []
-        dependencies = []
-        
+    def _set_job_checkpoint(self, value: Optional[str]):
+        """Store or clear the record of the running job in the metadata table"""
         try:
-            tree = ast.parse(content)
-            
-            # Extract imports
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        imports.append(name.name)
-                        dependencies.append(name.name)
-                elif isinstance(node, ast.ImportFrom):
-                    module = node.module or ""
-                    for name in node.names:
-                        imports.append(f"{module}.{name.name}")
-                        dependencies.append(f"{module}.{name.name}")
-            
-            # Extract classes and functions
-            for node in ast.iter_child_nodes(tree):
-                if isinstance(node, ast.ClassDef):
-                    # Extract class info
-                    class_name = node.name
-                    line_start = node.lineno
-                    line_end = self._find_end_line(content, node)
-                    
-                    # Get docstring
-                    docstring = ast.get_docstring(node) or ""
-                    
-                    # Get class code
-                    class_lines = content.splitlines()[line_start-1:line_end]
-                    class_code = "\n".join(class_lines)
-                    
-                    class_symbol = SymbolInfo(
-                        name=class_name,
-                        type="class",
-                        file_path=file_path,
-                        line_start=line_start,
-                        line_end=line_end,
-                        docstring=docstring,
-                        code=class_code
-                    )
-                    symbols.append(class_symbol)
-                    
-                    # Extract methods
-                    for method in [n for n in ast.iter_child_nodes(node) if isinstance(n, ast.FunctionDef)]:
-                        method_name = method.name
-                        method_line_start = method.lineno
-                        method_line_end = self._find_end_line(content, method)
-                        
-                        # Get method docstring
-                        method_docstring = ast.get_docstring(method) or ""
-                        
-                        # Get method signature
-                        args = [a.arg for a in method.args.args]
-                        signature = f"{method_name}({', '.join(args)})"
-                        
-                        # Get method code
-                        method_lines = content.splitlines()[method_line_start-1:method_line_end]
-                        method_code = "\n".join(method_lines)
-                        
-                        method_symbol = SymbolInfo(
-                            name=method_name,
-                            type="method",
-                            file_path=file_path,
-                            line_start=method_line_start,
-                            line_end=method_line_end,
-                            signature=signature,
-                            docstring=method_docstring,
-                            parent=class_name,
-                            code=method_code
-                        )
-                        symbols.append(method_symbol)
-                
-                elif isinstance(node, ast.FunctionDef):
-                    # Extract function info
-                    func_name = node.name
-                    line_start = node.lineno
-                    line_end = self._find_end_line(content, node)
-                    
-                    # Get docstring
-                    docstring = ast.get_docstring(node) or ""
-                    
-                    # Get function signature
-                    args = [a.arg for a in node.args.args]
-                    signature = f"{func_name}({', '.join(args)})"
-                    
-                    # Get function code
-                    func_lines = content.splitlines()[line_start-1:line_end]
-                    func_code = "\n".join(func_lines)
-                    
-                    func_symbol = SymbolInfo(
-                        name=func_name,
-                        type="function",
-                        file_path=file_path,
-                        line_start=line_start,
-                        line_end=line_end,
-                        signature=signature,
-                        docstring=docstring,
-                        code=func_code
-                    )
-                    symbols.append(func_symbol)
+            with self._conn_lock:
+                if value is None:
+                    self.conn.execute('DELETE FROM metadata WHERE key = ?', ('index_job',))
+                else:
+                    self.conn.execute('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)',
+                                      ('index_job', value))
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving indexing job checkpoint: {e}")
+    
+    def start_watching(self, debounce: float = 0.2) -> bool:
+        """
+        Keep the index fresh by reindexing files as they change on disk
+        
+        Uses inotify on Linux and stat polling elsewhere.
         
-        except SyntaxError as e:
-            logger.warning(f"Syntax error in Python file {file_path}: {e}")
+        Args:
+            debounce: Seconds of quiet before a batch of changes is reindexed
+            
+        Returns:
+            True if watching (including if already watching)
+        """
+        if self.watcher and self.watcher.running:
+            return True
+        try:
+            self.watcher = create_watcher(
+                self.workspace_root,
+                lambda changed, removed: self.reindex_paths(changed, removed),
+                self._should_watch_dir,
+                debounce=debounce
+            )
+            self.watcher.start()
+            return True
         except Exception as e:
-            logger.error(f"Error parsing Python file {file_path}: {e}")
+            logger.error(f"Error starting file watcher: {e}")
+            self.watcher = None
+            return False
+    
+    def stop_watching(self):
+        """Stop watching the workspace for changes"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def _load_fingerprints(self, indexed_since: Optional[float] = None) -> Dict[str, Tuple[int, int, int]]:
+        """
+        Load the (size, mtime_ns, inode) fingerprint of indexed files, keyed by relative path
         
-        return symbols, imports, dependencies
+        Args:
+            indexed_since: Only load files the writer committed at or after this time
+        """
+        with self.read_pool.connection() as conn:
+            if indexed_since is None:
+                rows = conn.execute('SELECT path, size, mtime_ns, inode FROM file_fingerprints')
+            else:
+                rows = conn.execute('''
+                SELECT fp.path, fp.size, fp.mtime_ns, fp.inode
+                FROM file_fingerprints fp JOIN files f ON f.path = fp.path
+                WHERE f.indexed_time >= ?
+                ''', (indexed_since,))
+            return {path: (size, mtime_ns, inode) for path, size, mtime_ns, inode in rows}
     
-    def _parse_js_ts(self, content: str, file_path: str) -> Tuple[List[SymbolInfo], List[str], List[str]]:
-        """Parse JavaScript/TypeScript file to extract symbols, imports and dependencies"""
-        symbols = []
-        imports = []
-        dependencies = []
+    def _index_file(self, file_path: str, rel_path: str, st: os.stat_result, ext: str,
+                    writer: _IndexWriter):
+        """
+        Parse a single file and hand the result to the writer
         
-        # Simple regex-based parsing (for a more robust solution, use a proper JS/TS parser)
-        try:
-            # Find imports
-            import_regex = r'import\s+(?:{[^}]*}|[^{}\n;]+)\s+from\s+[\'"]([^\'"]+)[\'"];?'
-            require_regex = r'(?:const|let|var)\s+(?:{[^}]*}|[^{}\n;]+)\s+=\s+require\s*\(\s*[\'"]([^\'"]+)[\'"]\s*\);?'
-            
-            for match in re.finditer(import_regex, content):
-                module = match.group(1)
-                imports.append(module)
-                dependencies.append(module)
-                
-            for match in re.finditer(require_regex, content):
-                module = match.group(1)
-                imports.append(module)
-                dependencies.append(module)
-            
-            # Find classes
-            class_regex = r'(?:export\s+)?class\s+(\w+)'
-            for match in re.finditer(class_regex, content):
-                class_name = match.group(1)
-                line_start = content[:match.start()].count('\n') + 1
-                
-                # Find class end (naive approach)
-                class_block = self._find_code_block(content, match.end())
-                line_end = line_start + class_block.count('\n')
-                
-                symbols.append(SymbolInfo(
-                    name=class_name,
-                    type="class",
-                    file_path=file_path,
-                    line_start=line_start,
-                    line_end=line_end,
-                    code=f"class {class_name} {class_block}"
-                ))
-            
-            # Find functions/methods
-            function_regex = r'(?:export\s+)?(?:async\s+)?function\s+(\w+)'
-            for match in re.finditer(function_regex, content):
-                func_name = match.group(1)
-                line_start = content[:match.start()].count('\n') + 1
-                
-                # Find function end and signature
-                signature_end = content.find(')', match.end()) + 1
-                signature = content[match.start():signature_end]
-                
-                func_block = self._find_code_block(content, signature_end)
-                line_end = line_start + func_block.count('\n')
-                
-                symbols.append(SymbolInfo(
-                    name=func_name,
-                    type="function",
-                    file_path=file_path,
-                    line_start=line_start,
-                    line_end=line_end,
-                    signature=signature,
-                    code=f"{signature} {func_block}"
-                ))
-            
-            # Find arrow functions with assignment
-            arrow_regex = r'(?:const|let|var)\s+(\w+)\s*=\s*(?:\([^)]*\)|[^=>\n]*)\s*=>'
-            for match in re.finditer(arrow_regex, content):
-                func_name = match.group(1)
-                line_start = content[:match.start()].count('\n') + 1
-                
-                # Find signature end
-                arrow_pos = content.find('=>', match.end())
-                signature = content[match.start():arrow_pos+2]
-                
-                func_block = self._find_code_block(content, arrow_pos+2)
-                line_end = line_start + func_block.count('\n')
-                
-                symbols.append(SymbolInfo(
-                    name=func_name,
-                    type="function",
-                    file_path=file_path,
-                    line_start=line_start,
-                    line_end=line_end,
-                    signature=signature,
-                    code=f"{signature} {func_block}"
-                ))
-                
-        except Exception as e:
-            logger.error(f"Error parsing JS/TS file {file_path}: {e}")
+        Args:
+            file_path: Absolute path of the file
+            rel_path: Path relative to the workspace root
+            st: Stat result of the file from the workspace walk
+            ext: Lowercase file extension
+            writer: Writer stage that stores the parsed file
+        """
+        existing = writer.known_files.get(rel_path)
+        observations = []
+        record = _read_and_parse(
+            file_path, rel_path, self.language_map.get(ext, 'unknown'),
+            st.st_mtime, st.st_mtime_ns, st.st_ino, existing[1] if existing else None,
+            self.blob_store.root, observations
+        )
+        self.metrics.record(observations)
+        if record:
+            writer.put(record)
+    
+    def _index_files_in_threads(self, work: PriorityWorkQueue, writer: _IndexWriter,
+                                on_progress: Callable[[int, str], None],
+                                cancel_event: Optional[threading.Event] = None):
+        """
+        Parse files on a thread pool, in priority order
+        
+        Only a couple of files per worker are submitted at a time, so a file
+        promoted while the run is going is picked up next.
         
-        return symbols, imports, dependencies
+        Args:
+            work: Files to index, as (file path, relative path, stat result, extension)
+            writer: Writer stage that stores the parsed files
+            on_progress: Called with (files completed, last file) as files finish, in completion order
+            cancel_event: Stop submitting work once this is set
+        """
+        max_workers = os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = {}
+            while True:
+                while len(in_flight) < max_workers * 2:
+                    item = work.pop()
+                    if item is None:
+                        break
+                    file_path, rel_path, st, ext = item[1]
+                    in_flight[executor.submit(self._index_file, file_path, rel_path, st, ext, writer)] = rel_path
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    on_progress(1, in_flight.pop(future))
+                if cancel_event is not None and cancel_event.is_set():
+                    break
     
-    def _find_end_line(self, content: str, node) -> int:
-        """Find the end line of a Python AST node"""
-        if hasattr(node, 'end_lineno'):
-            return node.end_lineno
+    def _index_files_in_processes(self, work: PriorityWorkQueue, writer: _IndexWriter,
+                                  on_progress: Callable[[int, str], None],
+                                  cancel_event: Optional[threading.Event] = None):
+        """
+        Parse files in a process pool, bypassing the GIL, and write them from this process
+        
+        Files are grouped into work units so each round trip to a worker carries
+        enough parsing to amortize the IPC, and workers send back compact tuples.
+        Units are cut from the priority queue as workers free up, so hot files
+        go out in the next unit.
+        
+        Args:
+            work: Files to index, as (file path, relative path, stat result, extension)
+            writer: Writer stage that stores the parsed files
+            on_progress: Called with (files completed, last file) as work units finish, in completion order
+            cancel_event: Stop submitting work once this is set
+        """
+        def next_unit() -> List[Tuple]:
+            unit = []
+            unit_bytes = 0
+            while len(unit) < self.work_unit_files and unit_bytes < self.work_unit_bytes:
+                item = work.pop()
+                if item is None:
+                    break
+                file_path, rel_path, st, ext = item[1]
+                existing = writer.known_files.get(rel_path)
+                unit.append((file_path, rel_path, self.language_map.get(ext, 'unknown'),
+                             st.st_mtime, st.st_mtime_ns, st.st_ino, existing[1] if existing else None,
+                             self.blob_store.root))
+                unit_bytes += st.st_size
+            return unit
         
-        # For older Python versions without end_lineno
+        # Forking this process while the writer, watcher and read threads hold
+        # locks can deadlock the children, so workers come from a fork server
+        # (or are spawned where there is none). The fork server imports the main
+        # module and this one once, and workers fork from it without re-importing.
+        max_workers = os.cpu_count() or 1
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['__main__', __name__])
+        else:
+            context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            in_flight = {}
+            while True:
+                while len(in_flight) < max_workers * 2:
+                    unit = next_unit()
+                    if not unit:
+                        break
+                    in_flight[executor.submit(_parse_work_unit, unit)] = unit
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = in_flight.pop(future)
+                    records, observations = future.result()
+                    self.metrics.record(observations)
+                    for record in records:
+                        writer.put(record)
+                    on_progress(len(unit), unit[-1][1])
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+    
+    def _update_metadata(self, timestamp: float):
+        """Update indexing metadata"""
         try:
-            # Get source segment
-            source_lines = content.splitlines()
-            line_start = node.lineno
-            last_line = len(source_lines)
-            
-            # Simple indentation-based detection
-            node_indent = len(source_lines[line_start-1]) - len(source_lines[line_start-1].lstrip())
-            
-            # Find the next line with same or less indentation
-            for i in range(line_start, last_line):
-                line = source_lines[i]
-                if line.strip() and len(line) - len(line.lstrip()) <= node_indent:
-                    return i
-            
-            return last_line
-        except:
-            # Fallback: assume node ends on the same line
-            return node.lineno
+            with self._conn_lock:
+                cursor = self.conn.cursor()
+                cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', 
+                             (str(timestamp), 'last_indexed'))
+                cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', 
+                             (str(self.file_count), 'file_count'))
+                cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', 
+                             (str(self.symbol_count), 'symbol_count'))
+                self.conn.commit()
+            self.last_indexed = timestamp
+        except sqlite3.Error as e:
+            logger.error(f"Error updating metadata: {e}")
     
-    def _find_code_block(self, content: str, start_pos: int) -> str:
-        """Find a complete code block starting at the given position"""
-        # Find opening brace
-        brace_pos = content.find('{', start_pos)
-        if brace_pos == -1:
-            # No block found, might be a one-line expression
-            semicolon_pos = content.find(';', start_pos)
-            if semicolon_pos == -1:
-                # Return rest of content
-                return content[start_pos:]
-            return content[start_pos:semicolon_pos+1]
+    @staticmethod
+    def _with_code_fields(fields: List[str]) -> List[str]:
+        """Add the internal fields _fill_code needs when code is projected"""
+        return fields + _CODE_FIELDS if 'code' in fields else fields
+    
+    def _fill_code(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Slice the code of symbol rows from their files and drop the internal fields
         
-        # Count braces to find matching closing brace
-        brace_count = 1
-        pos = brace_pos + 1
+        Rows must carry _path, _content_hash, _byte_start and _byte_end if they
+        need code; rows of one file share a single read.
+        """
+        for row in rows:
+            if '_path' not in row:
+                continue
+            path = row.pop('_path')
+            content_hash = row.pop('_content_hash')
+            byte_start = row.pop('_byte_start')
+            byte_end = row.pop('_byte_end')
+            if row.get('code') is None:
+                data = self._load_source(path, content_hash) if byte_start is not None else None
+                row['code'] = _slice_code(data, byte_start, byte_end) if data is not None else ""
+        return rows
+    
+    def _load_source(self, rel_path: str, content_hash: Optional[str]) -> Optional[bytes]:
+        """
+        Load the content of a file as it was indexed
         
-        while pos < len(content) and brace_count > 0:
-            if content[pos] == '{':
-                brace_count += 1
-            elif content[pos] == '}':
-                brace_count -= 1
-            pos += 1
+        Uses the file itself if it is unchanged since indexing, and the blob
+        store otherwise. Recently used contents are cached by hash.
+        """
+        if not content_hash:
+            return None
+        with self._source_cache_lock:
+            data = self._source_cache.get(content_hash)
+            if data is not None:
+                self._source_cache.move_to_end(content_hash)
+                return data
         
-        return content[brace_pos:pos]
+        data = None
+        try:
+            with open(os.path.join(self.workspace_root, rel_path), 'rb') as f:
+                data = f.read()
+            if _content_hash(data) != content_hash:
+                data = None
+        except OSError:
+            pass
+        if data is None:
+            data = self.blob_store.get(content_hash)
+            if data is None:
+                return None
+        
+        with self._source_cache_lock:
+            if content_hash not in self._source_cache:
+                self._source_cache[content_hash] = data
+                self._source_cache_bytes += len(data)
+                while self._source_cache_bytes > self._source_cache_limit and len(self._source_cache) > 1:
+                    _, evicted = self._source_cache.popitem(last=False)
+                    self._source_cache_bytes -= len(evicted)
+        return data
     
     def search_symbols(self, query: str, symbol_type: Optional[str] = None, 
-                      language: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+                      language: Optional[str] = None, limit: int = 100,
+                      path_glob: Optional[str] = None, fields: Optional[List[str]] = None,
+                      cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Search for symbols in the codebase
         
+        Words in the query are matched as prefixes of symbol names, their
+        camelCase/snake_case parts, signatures, docstrings and parents, and
+        results are ranked by BM25 relevance.
+        
         Args:
-            query: Search query (supports SQL LIKE patterns with % and _)
+            query: Search query (one or more words)
             symbol_type: Optional filter by symbol type (class, function, method, etc.)
             language: Optional filter by language
-            limit: Maximum number of results to return
+            limit: Maximum number of results to return (page size)
+            path_glob: Optional filter by file path glob (e.g. "src/**/*.py")
+            fields: Optional projection, e.g. ["name", "path", "line_start"] (default: all)
+            cursor: next_cursor of the previous page to continue from
             
         Returns:
-            List of matching symbols
+            ResultPage of matching symbols, best match first
         """
+        fields = _projection(fields, _SYMBOL_FIELDS, _SYMBOL_ROW_FIELDS + ['path', 'language'])
+        match = _fts_match_expression(query) if self.fts_enabled else ''
+        
         try:
-            # Ensure we're using the main thread connection for queries
-            cursor = self.conn.cursor()
-            
-            # Build query
-            sql = '''
-            SELECT s.*, f.path, f.language
-            FROM symbols s
-            JOIN files f ON s.file_id = f.id
-            WHERE s.name LIKE ?
-            '''
-            params = [f'%{query}%']
-            
-            if symbol_type:
-                sql += ' AND s.type = ?'
-                params.append(symbol_type)
+            with self.read_pool.connection() as conn:
+                # Build query
+                if match:
+                    select = '''
+                    FROM symbols_fts
+                    JOIN symbols s ON s.id = symbols_fts.rowid
+                    JOIN files f ON s.file_id = f.id
+                    WHERE symbols_fts MATCH ?
+                    '''
+                    params = [match]
+                else:
+                    select = '''
+                    FROM symbols s
+                    JOIN files f ON s.file_id = f.id
+                    WHERE s.name LIKE ?
+                    '''
+                    params = [f'%{query}%']
+            
+                if symbol_type:
+                    select += ' AND s.type = ?'
+                    params.append(symbol_type)
                 
-            if language:
-                sql += ' AND f.language = ?'
-                params.append(language)
+                if language:
+                    select += ' AND f.language = ?'
+                    params.append(language)
                 
-            sql += ' ORDER BY s.name LIMIT ?'
-            params.append(limit)
+                if path_glob:
+                    select += ' AND f.path GLOB ?'
+                    params.append(path_glob)
+                
+                if match:
+                    # Exact name matches first, then BM25 (lower is better)
+                    keys = ['s.name != ?', f'bm25(symbols_fts, {", ".join(map(str, _FTS_WEIGHTS))})', 's.id']
+                    params.insert(0, query)
+                else:
+                    keys = ['s.name', 's.id']
             
-            cursor.execute(sql, params)
+                page = _fetch_page(conn.cursor(), select, params, self._with_code_fields(fields),
+                                   _SYMBOL_FIELDS, keys, cursor, limit)
+            return self._fill_code(page)
             
-            # Convert to list of dictionaries
-            columns = [col[0] for col in cursor.description]
-            results = []
+        except sqlite3.Error as e:
+            logger.error(f"Error searching symbols: {e}")
+            return []
+    
+    def fuzzy_search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Fuzzy "go to symbol" search by prefix, substring or camelCase abbreviation
+        
+        Args:
+            query: Fuzzy query (e.g. "gSBL" for get_symbol_by_location)
+            limit: Maximum number of results to return
             
-            for row in cursor.fetchall():
-                result = dict(zip(columns, row))
-                results.append(result)
+        Returns:
+            List of matching symbols with a "score" field, best match first
+        """
+        # The table loads in the background at startup
+        self._symbol_table_loaded.wait(timeout=10)
+        matches = self.symbol_table.search(query, limit)
+        if not matches:
+            return []
+        
+        try:
+            with self.read_pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                SELECT s.id, s.name, s.type, s.signature, s.parent, s.line_start, s.line_end,
+                       f.path, f.language
+                FROM symbols s
+                JOIN files f ON s.file_id = f.id
+                WHERE s.id IN ({", ".join("?" * len(matches))})
+                ''', [symbol_id for _, symbol_id, _ in matches])
+                
+                columns = [col[0] for col in cursor.description]
+                rows = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
                 
+            results = []
+            for score, symbol_id, _ in matches:
+                result = rows.get(symbol_id)
+                if result:
+                    result["score"] = round(score, 2)
+                    results.append(result)
             return results
             
         except sqlite3.Error as e:
-            logger.error(f"Error searching symbols: {e}")
+            logger.error(f"Error in fuzzy symbol search: {e}")
             return []
     
-    def find_references(self, symbol_name: str, file_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    def find_references(self, symbol_name: str, file_path: Optional[str] = None,
+                        limit: int = 1000, fields: Optional[List[str]] = None,
+                        cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Find references to a symbol across the codebase
         
+        Returns the places where the name is used (Python names and attribute
+        reads, JS/TS identifiers), not the places where it is defined.
+        
         Args:
             symbol_name: Name of the symbol to find references to
             file_path: Optional filter by file path
+            limit: Maximum number of references to return (page size)
+            fields: Optional projection of name, path, line, column, symbol_id, file_id
+            cursor: next_cursor of the previous page to continue from
             
         Returns:
-            List of references
+            ResultPage of references with path, line and column (1-based line,
+            0-based column). symbol_id is set when the name is defined in the
+            same file, or at the top level of a file it imports; otherwise it is
+            None. Matching is by name, so references to other symbols of the same
+            name (e.g. methods of unrelated classes) are returned too
         """
+        fields = _projection(fields, _REFERENCE_FIELDS, ['name', 'path', 'line', 'column', 'symbol_id'])
+        
         try:
-            # Ensure we're using the main thread connection for queries
-            cursor = self.conn.cursor()
-            
-            # Build query
-            sql = '''
-            SELECT s.name, s.type, f.path, s.line_start, s.line_end
-            FROM symbols s
-            JOIN files f ON s.file_id = f.id
-            WHERE s.name = ?
-            '''
-            params = [symbol_name]
-            
-            if file_path:
-                sql += ' AND f.path = ?'
-                params.append(file_path)
+            with self.read_pool.connection() as conn:
+                # Build query; served from the covering idx_references_name index
+                select = '''
+                FROM symbol_references r
+                JOIN files f ON r.file_id = f.id
+                WHERE r.name = ?
+                '''
+                params = [symbol_name]
+            
+                if file_path:
+                    select += ' AND f.path = ?'
+                    params.append(file_path)
                 
-            cursor.execute(sql, params)
-            
-            # Convert to list of dictionaries
-            columns = [col[0] for col in cursor.description]
-            results = []
-            
-            for row in cursor.fetchall():
-                result = dict(zip(columns, row))
-                results.append(result)
-                
-            return results
+                return _fetch_page(conn.cursor(), select, params, fields, _REFERENCE_FIELDS,
+                                   ['f.path', 'r.line', 'r.column'], cursor, limit)
             
         except sqlite3.Error as e:
             logger.error(f"Error finding references: {e}")
@@ -896,17 +1972,17 @@ class CodebaseIndexer:
             List of dependencies
         """
         try:
-            # Ensure we're using the main thread connection for queries
-            cursor = self.conn.cursor()
+            with self.read_pool.connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute('''
-            SELECT d.target
-            FROM dependencies d
-            JOIN files f ON d.source_file_id = f.id
-            WHERE f.path = ?
-            ''', (file_path,))
+                cursor.execute('''
+                SELECT d.target
+                FROM dependencies d
+                JOIN files f ON d.source_file_id = f.id
+                WHERE f.path = ?
+                ''', (file_path,))
             
-            return [row[0] for row in cursor.fetchall()]
+                return [row[0] for row in cursor.fetchall()]
             
         except sqlite3.Error as e:
             logger.error(f"Error getting dependencies: {e}")
@@ -914,62 +1990,131 @@ class CodebaseIndexer:
     
     def get_dependents(self, module_name: str) -> List[str]:
         """
-        Get files that depend on a module
+        Get files that directly depend on a module
         
         Args:
-            module_name: Name of the module
+            module_name: File path (e.g. "pkg/mod.py") or dotted module name (e.g. "pkg.mod")
             
         Returns:
             List of dependent file paths
         """
         try:
-            # Ensure we're using the main thread connection for queries
-            cursor = self.conn.cursor()
-            
-            cursor.execute('''
-            SELECT f.path
-            FROM dependencies d
-            JOIN files f ON d.source_file_id = f.id
-            WHERE d.target LIKE ?
-            ''', (f'%{module_name}%',))
+            with self.read_pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Imports resolved to the module's file, over the reverse adjacency index
+                paths = set()
+                for file_id in self._lookup_module(conn, module_name):
+                    cursor.execute('''
+                    SELECT f.path
+                    FROM dependencies d
+                    JOIN files f ON d.source_file_id = f.id
+                    WHERE d.target_file_id = ?
+                    ''', (file_id,))
+                    paths.update(row[0] for row in cursor.fetchall())
+                
+                # Unresolved imports of the module itself or of names in it
+                cursor.execute('''
+                SELECT f.path
+                FROM dependencies d
+                JOIN files f ON d.source_file_id = f.id
+                WHERE d.target_file_id IS NULL
+                  AND (d.target = ? OR (d.target > ? AND d.target < ?))
+                ''', (module_name, module_name + '.', module_name + '/'))
+                paths.update(row[0] for row in cursor.fetchall())
             
-            return [row[0] for row in cursor.fetchall()]
+                return sorted(paths)
             
         except sqlite3.Error as e:
             logger.error(f"Error getting dependents: {e}")
             return []
     
-    def get_file_symbols(self, file_path: str) -> List[Dict[str, Any]]:
+    def _lookup_module(self, conn: sqlite3.Connection, module_name: str) -> List[int]:
+        """Resolve a file path or dotted module name to file ids"""
+        row = conn.execute('SELECT id FROM files WHERE path = ?', (module_name,)).fetchone()
+        if row:
+            return [row[0]]
+        like_path = module_name.replace('.', os.sep)
+        ids = []
+        for candidate in (like_path + '.py', os.path.join(like_path, '__init__.py')):
+            # The module may live below a source root, e.g. src/pkg/mod.py for pkg.mod
+            for (file_id,) in conn.execute(
+                'SELECT id FROM files WHERE path = ? OR path GLOB ?',
+                (candidate, '*' + os.sep + candidate.replace('[', '[[]').replace('*', '[*]').replace('?', '[?]'))
+            ):
+                ids.append(file_id)
+        return ids
+    
+    def transitive_dependencies(self, file_path: str) -> List[str]:
+        """
+        Get every file a file depends on, directly or through other files
+        
+        Args:
+            file_path: File path or dotted module name
+            
+        Returns:
+            Sorted list of file paths
+        """
+        return self._transitive(file_path, DependencyGraph.DEPENDENCIES)
+    
+    def transitive_dependents(self, file_path: str) -> List[str]:
+        """
+        Get every file that depends on a file, directly or through other files
+        
+        Useful for impact analysis: these are the files a change can break.
+        
+        Args:
+            file_path: File path or dotted module name
+            
+        Returns:
+            Sorted list of file paths
+        """
+        return self._transitive(file_path, DependencyGraph.DEPENDENTS)
+    
+    def _transitive(self, file_path: str, direction: str) -> List[str]:
+        """Answer a transitive query from the cached import graph"""
+        try:
+            with self.read_pool.connection() as conn:
+                if not self.dependency_graph.loaded:
+                    self.dependency_graph.load(conn)
+                file_ids = self._lookup_module(conn, file_path)
+        except sqlite3.Error as e:
+            logger.error(f"Error getting transitive {direction}: {e}")
+            return []
+        
+        reachable = set()
+        for file_id in file_ids:
+            reachable.update(self.dependency_graph.closure(file_id, direction))
+        reachable.difference_update(file_ids)
+        paths = self.dependency_graph.paths
+        return sorted(paths[file_id] for file_id in reachable if file_id in paths)
+    
+    def get_file_symbols(self, file_path: str, fields: Optional[List[str]] = None,
+                         limit: Optional[int] = None, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get all symbols defined in a file
         
         Args:
             file_path: Path of the file
+            fields: Optional projection, e.g. ["name", "type", "line_start"] (default: all)
+            limit: Optional page size (default: every symbol)
+            cursor: next_cursor of the previous page to continue from
             
         Returns:
-            List of symbols
+            ResultPage of symbols in line order
         """
+        fields = _projection(fields, _SYMBOL_FIELDS, _SYMBOL_ROW_FIELDS)
+        
         try:
-            # Ensure we're using the main thread connection for queries
-            cursor = self.conn.cursor()
-            
-            cursor.execute('''
-            SELECT s.*
-            FROM symbols s
-            JOIN files f ON s.file_id = f.id
-            WHERE f.path = ?
-            ORDER BY s.line_start
-            ''', (file_path,))
-            
-            # Convert to list of dictionaries
-            columns = [col[0] for col in cursor.description]
-            results = []
-            
-            for row in cursor.fetchall():
-                result = dict(zip(columns, row))
-                results.append(result)
-                
-            return results
+            with self.read_pool.connection() as conn:
+                select = '''
+                FROM symbols s
+                JOIN files f ON s.file_id = f.id
+                WHERE f.path = ?
+                '''
+                page = _fetch_page(conn.cursor(), select, [file_path], self._with_code_fields(fields),
+                                   _SYMBOL_FIELDS, ['s.line_start', 's.id'], cursor, limit)
+            return self._fill_code(page)
             
         except sqlite3.Error as e:
             logger.error(f"Error getting file symbols: {e}")
@@ -987,69 +2132,259 @@ class CodebaseIndexer:
             Symbol info or None if not found
         """
         try:
-            # Ensure we're using the main thread connection for queries
-            cursor = self.conn.cursor()
+            with self.read_pool.connection() as conn:
+                cursor = conn.cursor()
+            
+                # Innermost symbol from the file's cached interval index
+                intervals = self.symbol_intervals.get(file_path)
+                if intervals is None:
+                    generation = self.symbol_intervals.generation
+                    cursor.execute('''
+                    SELECT s.id, s.line_start, s.line_end
+                    FROM symbols s
+                    JOIN files f ON s.file_id = f.id
+                    WHERE f.path = ?
+                    ''', (file_path,))
+                    intervals = SymbolIntervals(cursor.fetchall())
+                    self.symbol_intervals.put(file_path, intervals, generation)
+                
+                symbol_id = intervals.find(line)
+                if symbol_id is None:
+                    return None
             
-            cursor.execute('''
-            SELECT s.*
-            FROM symbols s
-            JOIN files f ON s.file_id = f.id
-            WHERE f.path = ? AND s.line_start <= ? AND s.line_end >= ?
-            ORDER BY (s.line_end - s.line_start) ASC
-            LIMIT 1
-            ''', (file_path, line, line))
-            
-            row = cursor.fetchone()
-            if row:
-                columns = [col[0] for col in cursor.description]
-                return dict(zip(columns, row))
+                cursor.execute('''
+                SELECT s.*, f.path AS _path, f.content_hash AS _content_hash,
+                       s.byte_start AS _byte_start, s.byte_end AS _byte_end
+                FROM symbols s
+                JOIN files f ON s.file_id = f.id
+                WHERE s.id = ?
+                ''', (symbol_id,))
             
-            return None
+                row = cursor.fetchone()
+                if row:
+                    columns = [col[0] for col in cursor.description]
+                    return self._fill_code([dict(zip(columns, row))])[0]
+            
+                return None
             
         except sqlite3.Error as e:
             logger.error(f"Error getting symbol by location: {e}")
             return None
     
-    def get_index_status(self) -> Dict[str, Any]:
-        """Get the current status of the index"""
-        # Update file and symbol count from database to ensure accuracy
+    def semantic_search(self, query: str, limit: int = 20, symbol_type: Optional[str] = None,
+                        language: Optional[str] = None, wait: bool = False) -> List[Dict[str, Any]]:
+        """
+        Find symbols by meaning rather than by name, see semantic.py
+        
+        The first call starts embedding every symbol with the bundled model on a
+        background thread; vectors are cached by content, so later calls only
+        embed symbols that changed.
+        
+        Args:
+            query: Natural language description or code
+            limit: Maximum number of results
+            symbol_type: Filter by symbol type (class, function, etc.)
+            language: Filter by programming language
+            wait: Wait until every symbol is embedded instead of searching those embedded so far
+            
+        Returns:
+            Matching symbols with a "score" (cosine similarity), best first
+            
+        Raises:
+            EmbeddingUnavailable: If the model or numpy isn't installed
+        """
+        if self.semantic is None:
+            self.semantic = SemanticIndex(self)
+        return self.semantic.search(query, limit, symbol_type, language, wait=wait)
+    
+    def get_semantic_status(self) -> Dict[str, Any]:
+        """Progress of the semantic index: symbols embedded, pending and whether it is current"""
+        if self.semantic is None:
+            return {"ready": False, "refreshing": False, "vectors": 0, "symbols": 0, "pending": 0}
+        return self.semantic.status()
+    
+    def default_snapshot_path(self) -> str:
+        """Where snapshots are exported to and imported from unless a path is given"""
+        return os.path.join(self.workspace_root, '.tribe', 'codebase_index.snapshot')
+    
+    def export_snapshot(self, path: Optional[str] = None, compress: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Write a portable snapshot of the index, see snapshot.py
+        
+        Args:
+            path: Snapshot file (defaults to .tribe/codebase_index.snapshot)
+            compress: gzip the snapshot; an uncompressed one can be memory-mapped as is
+            
+        Returns:
+            The snapshot's path, format version, counts and size, or None on failure
+        """
+        path = path or self.default_snapshot_path()
+        start_time = time.time()
         try:
-            # Use thread-local connection
-            if not hasattr(self._thread_local, 'conn'):
-                self._thread_local.conn = sqlite3.connect(self.db_path)
-                
-            cursor = self._thread_local.conn.cursor()
+            writer = SnapshotWriter(path)
+            try:
+                with self.read_pool.connection() as conn:
+                    writer.add_index(conn)
+            except BaseException:
+                writer.abort()
+                raise
+            info = writer.close(compress)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Error exporting index snapshot: {e}")
+            return None
+        info["path"] = path
+        logger.info(f"Exported snapshot of {info['file_count']} files to {path} "
+                    f"({info['bytes']} bytes) in {time.time() - start_time:.2f} seconds")
+        return info
+    
+    def import_snapshot(self, path: Optional[str] = None, max_file_size: int = 1024 * 1024,
+                        snapshot: Optional[SnapshotReader] = None, prefix: str = '') -> Optional[Dict[str, Any]]:
+        """
+        Seed the index from a snapshot
+        
+        Each file of the workspace whose content hash matches its entry in the
+        snapshot is written from the snapshot without parsing, along with its
+        stat fingerprint. Files that differ or aren't in the snapshot are left
+        alone, so a following index_workspace parses only those.
+        
+        Args:
+            path: Snapshot file (defaults to .tribe/codebase_index.snapshot)
+            max_file_size: Maximum file size to index in bytes (default 1MB)
+            snapshot: An open snapshot to use instead of path
+            prefix: Directory of this index within the snapshot, for the shards of a sharded index
             
-            # Get file count
-            cursor.execute('SELECT COUNT(*) FROM files')
-            row = cursor.fetchone()
-            if row:
-                self.file_count = row[0]
-                
-            # Get symbol count
-            cursor.execute('SELECT COUNT(*) FROM symbols')
-            row = cursor.fetchone()
-            if row:
-                self.symbol_count = row[0]
-                
-            # Get last indexed timestamp
-            cursor.execute('SELECT value FROM metadata WHERE key = ?', ('last_indexed',))
-            row = cursor.fetchone()
-            if row:
-                try:
-                    self.last_indexed = float(row[0])
-                except (ValueError, TypeError):
-                    pass
-        except sqlite3.Error as e:
-            logger.error(f"Error getting index status: {e}")
+        Returns:
+            Counts of files imported, already up to date, stale (content differs) and
+            missing from the snapshot, or None if indexing is running
             
+        Raises:
+            ValueError: If the file is not a snapshot this version can read
+            OSError: If the snapshot can't be read
+        """
+        with self.index_lock:
+            if self.indexing_in_progress:
+                logger.warning("Indexing in progress, not importing snapshot")
+                return None
+            self.indexing_in_progress = True
+        
+        start_time = time.time()
+        reader = None
+        try:
+            reader = snapshot or SnapshotReader(path or self.default_snapshot_path(),
+                                                temp_dir=os.path.dirname(os.path.abspath(self.db_path)))
+            entries = {rel_path: entry[:2] for rel_path, *entry in reader.files(prefix)}
+            counts = {"imported": 0, "unchanged": 0, "stale": 0, "missing": 0}
+            total_bytes = 0
+            
+            writer = _IndexWriter(self, self._load_known_files())
+            writer.start()
+            try:
+                for file_path, rel_path, st, ext in self.scanner.take_snapshot().files:
+                    entry = entries.get(rel_path)
+                    if entry is None:
+                        counts["missing"] += 1
+                        continue
+                    if st.st_size > max_file_size:
+                        continue
+                    content_id, content_hash = entry
+                    try:
+                        with open(file_path, 'rb') as f:
+                            data = f.read()
+                    except OSError:
+                        continue
+                    total_bytes += len(data)
+                    if _content_hash(data) != content_hash:
+                        counts["stale"] += 1
+                        continue
+                    
+                    file_row = (rel_path, self.language_map.get(ext, 'unknown'), len(data), st.st_mtime,
+                                content_hash, st.st_mtime_ns, st.st_ino)
+                    existing = writer.known_files.get(rel_path)
+                    if existing and existing[1] == content_hash:
+                        writer.put((file_row, None, None, None))
+                        counts["unchanged"] += 1
+                        continue
+                    symbols, dependencies, references = reader.record(content_id)
+                    if symbols:
+                        self.blob_store.put(content_hash, data)
+                    writer.put((file_row, symbols, dependencies, references))
+                    counts["imported"] += 1
+            finally:
+                writer.close()
+            
+            for name, count in counts.items():
+                self.metrics.increment(f'snapshot.{name}', count)
+            self.metrics.finish_run('snapshot_import', start_time,
+                                    files=counts["imported"] + counts["unchanged"] + counts["stale"],
+                                    bytes=total_bytes, **counts)
+            logger.info(f"Imported {counts['imported']} files from snapshot in {time.time() - start_time:.2f} "
+                        f"seconds ({counts['stale']} stale, {counts['missing']} not in the snapshot)")
+            return counts
+        finally:
+            if reader is not None and snapshot is None:
+                reader.close()
+            self.indexing_in_progress = False
+    
+    def _recount(self, conn: sqlite3.Connection) -> bool:
+        """
+        Replace the file and symbol counters with counts of the tables
+        
+        Returns:
+            True if the counters were off
+        """
+        file_count = conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+        symbol_count = conn.execute('SELECT COUNT(*) FROM symbols').fetchone()[0]
+        drifted = (file_count, symbol_count) != (self.file_count, self.symbol_count)
+        if drifted:
+            logger.warning(f"Index counters drifted to {self.file_count} files and {self.symbol_count} symbols; "
+                           f"recounted {file_count} and {symbol_count}")
+            if not conn.in_transaction and not conn.execute('PRAGMA query_only').fetchone()[0]:
+                conn.executemany('UPDATE metadata SET value = ? WHERE key = ?',
+                                 [(str(file_count), 'file_count'), (str(symbol_count), 'symbol_count')])
+                conn.commit()
+        self.file_count, self.symbol_count = file_count, symbol_count
+        self._counts_checked = time.time()
+        return drifted
+    
+    def get_index_status(self) -> Dict[str, Any]:
+        """
+        Get the current status of the index
+        
+        Counts come from counters the index writer keeps up to date. While no
+        run is writing, they are checked against the tables at most every
+        count_check_interval seconds and corrected if they drifted.
+        """
+        if (not self.indexing_in_progress and self.read_pool is not None
+                and time.time() - self._counts_checked >= self.count_check_interval):
+            try:
+                with self.read_pool.connection() as conn:
+                    if self._recount(conn):
+                        self._update_metadata(self.last_indexed)
+            except sqlite3.Error as e:
+                logger.error(f"Error checking index counts: {e}")
         return {
             "last_indexed": self.last_indexed,
             "file_count": self.file_count,
             "symbol_count": self.symbol_count,
             "indexing_in_progress": self.indexing_in_progress,
+            "watching": bool(self.watcher and self.watcher.running),
+            "hot_files": len(self.hot_files),
         }
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get indexing metrics: per-phase counters and latency histograms
+        
+        Returns:
+            Counters (files scanned, parsed per language, skipped per reason, rows
+            written), histograms in seconds (scan, read, hash, parse per language,
+            writer batch) and a summary of the last indexing run with its
+            files/sec and bytes/sec
+        """
+        metrics = self.metrics.snapshot()
+        metrics["index_status"] = self.get_index_status()
+        return metrics
+    
     def clear_index(self) -> bool:
         """Clear the entire index"""
         try:
@@ -1058,20 +2393,28 @@ class CodebaseIndexer:
                     logger.warning("Cannot clear index while indexing is in progress")
                     return False
                 
-                # Ensure we're using the main thread connection for clearing
-                cursor = self.conn.cursor()
-                cursor.execute('DELETE FROM symbol_references')
-                cursor.execute('DELETE FROM dependencies')
-                cursor.execute('DELETE FROM symbols')
-                cursor.execute('DELETE FROM files')
-                cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', ('0', 'last_indexed'))
-                cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', ('0', 'file_count'))
-                cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', ('0', 'symbol_count'))
-                self.conn.commit()
+                with self._conn_lock:
+                    cursor = self.conn.cursor()
+                    cursor.execute('DELETE FROM symbol_references')
+                    if self.fts_enabled:
+                        cursor.execute('DELETE FROM symbols_fts')
+                    cursor.execute('DELETE FROM dependencies')
+                    cursor.execute('DELETE FROM symbols')
+                    cursor.execute('DELETE FROM files')
+                    cursor.execute('DELETE FROM file_fingerprints')
+                    cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', ('0', 'last_indexed'))
+                    cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', ('0', 'file_count'))
+                    cursor.execute('UPDATE metadata SET value = ? WHERE key = ?', ('0', 'symbol_count'))
+                    self.conn.commit()
                 
+                self.symbol_table.clear()
+                self.dependency_graph.clear()
+                self.symbol_intervals.clear()
+                self.blob_store.clear()
                 self.last_indexed = 0
                 self.file_count = 0
                 self.symbol_count = 0
+                self.index_generation += 1
                 
                 logger.info("Codebase index cleared")
                 return True
@@ -1081,13 +2424,132 @@ class CodebaseIndexer:
             return False
     
     def close(self):
-        """Close the database connection"""
+        """Stop watching and any indexing job, and close the database connections"""
+        self.stop_watching()
+        if self.semantic:
+            self.semantic.close()
+        
+        # A job stopped here is interrupted rather than cancelled, so it resumes on the next start
+        job = self.active_job
+        if job and not job.done:
+            job.interrupted = True
+            job.cancel_event.set()
+            job.thread.join()
+        
+        # Close pooled read connections
+        if self.read_pool:
+            self.read_pool.close()
+            self.read_pool = None
+            
         # Close main connection
         if self.conn:
             self.conn.close()
             self.conn = None
-            
-        # Close any thread-local connections
-        if hasattr(self._thread_local, 'conn'):
-            self._thread_local.conn.close()
-            delattr(self._thread_local, 'conn')
\ No newline at end of file
+
+
+def _read_and_parse(file_path: str, rel_path: str, language: str, modified_time: float,
+                    mtime_ns: int, inode: int, known_hash: Optional[str],
+                    blob_root: Optional[str] = None,
+                    observations: Optional[Observations] = None) -> Optional[Tuple]:
+    """
+    Read, hash and parse one file into a compact writer record
+
+    Module level (and free of indexer state) so process pool workers can run it.
+
+    Args:
+        file_path: Absolute path of the file
+        rel_path: Path relative to the workspace root
+        language: Language of the file
+        modified_time: Modification time from the workspace walk
+        mtime_ns: Modification time in nanoseconds from the workspace walk
+        inode: Inode number from the workspace walk
+        known_hash: Content hash stored in the index, if the file is indexed
+        blob_root: Blob store directory to keep the content of files with symbols in
+        observations: List to append (metric name, value) pairs for IndexMetrics to
+
+    Returns:
+        (file row, symbol rows, dependencies, references) where the file row is
+        (path, language, size, modified_time, content_hash, mtime_ns, inode),
+        each symbol row is (name, type, line_start, line_end, column_start,
+        column_end, signature, docstring, parent, byte_start, byte_end) and each
+        reference is
+        (name, line, column); all but the file row are None if the content is
+        unchanged. None if the file could not be read.
+    """
+    if observations is None:
+        observations = []
+    started = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        logger.error(f"Error indexing file {rel_path}: {e}")
+        observations.append(('skipped.unreadable', 1))
+        return None
+    read = time.perf_counter()
+
+    content_hash = _content_hash(data)
+    hashed = time.perf_counter()
+    observations.extend((('read_seconds', read - started), ('hash_seconds', hashed - read),
+                         ('bytes_read', len(data))))
+    file_row = (rel_path, language, len(data), modified_time, content_hash, mtime_ns, inode)
+    if content_hash == known_hash:
+        # Touched but not modified; only the fingerprint needs refreshing
+        observations.append(('skipped.unchanged_content', 1))
+        return (file_row, None, None, None)
+
+    # Parsers hand back plain tuples in symbol row order, which go into the record as they are
+    symbols, dependencies, references = [], [], []
+    try:
+        content = data.decode('utf-8', errors='replace')
+        if language == 'python':
+            symbols, dependencies, references = parse_python(content)
+        elif language in ('javascript', 'typescript'):
+            found, dependencies, references = parse_javascript(content)
+            symbols = [(s.name, s.type, s.line_start, s.line_end, 0, 0, s.signature, '', s.parent) for s in found]
+    except SyntaxError as e:
+        logger.warning(f"Syntax error in Python file {rel_path}: {e}")
+        observations.append((f'syntax_errors.{language}', 1))
+    except Exception as e:
+        logger.error(f"Error indexing file {rel_path}: {e}")
+        observations.append(('skipped.parse_error', 1))
+        return None
+    observations.extend(((f'parse_seconds.{language}', time.perf_counter() - hashed),
+                         (f'files_parsed.{language}', 1)))
+
+    symbol_rows = []
+    if symbols:
+        # Symbols cover whole lines; their code is sliced from these offsets on demand
+        line_starts = [0]
+        line_starts.extend(match.end() for match in re.finditer(b'\n', data))
+        line_count = len(line_starts)
+        for symbol in symbols:
+            line_start, line_end = symbol[2], symbol[3]
+            byte_start = line_starts[min(max(line_start, 1), line_count) - 1]
+            byte_end = line_starts[line_end] if 0 < line_end < line_count else len(data)
+            symbol_rows.append(tuple(symbol) + (byte_start, byte_end))
+        if blob_root:
+            stored = time.perf_counter()
+            BlobStore(blob_root).put(content_hash, data)
+            observations.append(('blob_seconds', time.perf_counter() - stored))
+    return (file_row, symbol_rows, dependencies, references)
+
+
+def _parse_work_unit(items: List[Tuple]) -> Tuple[List[Tuple], Observations]:
+    """
+    Parse a chunk of files in a process pool worker
+
+    Args:
+        items: Argument tuples for _read_and_parse
+
+    Returns:
+        Writer records for the files that could be read, and the metric
+        observations made while parsing them
+    """
+    records = []
+    observations = []
+    for item in items:
+        record = _read_and_parse(*item, observations=observations)
+        if record:
+            records.append(record)
+    return records, observations
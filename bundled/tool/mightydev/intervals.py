@@ -0,0 +1,118 @@
+"""
+Per-file interval index for location lookups in the codebase index.
+
+Symbol line ranges of a file are flattened once into sorted, non-overlapping
+segments, each labelled with the innermost symbol covering it, so finding the
+symbol at a line is a single bisect. Flattened files are kept in a small LRU
+cache that the index writer invalidates for every file it rewrites.
+"""
+
+import bisect
+import heapq
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class SymbolIntervals:
+    """
+    Innermost-symbol lookup for one file.
+
+    Where ranges overlap, the symbol with the shortest span wins, and among
+    equal spans the one defined last (a nested symbol comes after its parent).
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, int, int]]):
+        """
+        Args:
+            rows: (symbol id, first line, last line) of the file's symbols
+        """
+        symbols = sorted((start, end, symbol_id) for symbol_id, start, end in rows if end >= start)
+        boundaries = sorted({start for start, _, _ in symbols} | {end + 1 for _, end, _ in symbols})
+
+        self.starts = array('q')
+        self.symbol_ids = array('q')  # 0 where no symbol covers the segment
+        active = []  # heap of (span, -symbol id, last line)
+        next_symbol = 0
+        for line in boundaries:
+            while next_symbol < len(symbols) and symbols[next_symbol][0] <= line:
+                start, end, symbol_id = symbols[next_symbol]
+                heapq.heappush(active, (end - start, -symbol_id, end))
+                next_symbol += 1
+            while active and active[0][2] < line:
+                heapq.heappop(active)
+            symbol_id = -active[0][1] if active else 0
+            if not self.symbol_ids or self.symbol_ids[-1] != symbol_id:
+                self.starts.append(line)
+                self.symbol_ids.append(symbol_id)
+
+    def find(self, line: int) -> Optional[int]:
+        """Id of the innermost symbol covering a line, or None"""
+        i = bisect.bisect_right(self.starts, line) - 1
+        if i < 0:
+            return None
+        return self.symbol_ids[i] or None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class IntervalCache:
+    """
+    LRU cache of SymbolIntervals by file path.
+
+    Readers build entries outside the lock, so an entry is only stored if no
+    invalidation happened since the reader started loading it; otherwise it
+    could describe symbols the writer has already replaced.
+    """
+
+    def __init__(self, max_files: int = 256):
+        """
+        Args:
+            max_files: Maximum number of files kept
+        """
+        self.max_files = max_files
+        self.generation = 0
+        self._files: 'OrderedDict[str, SymbolIntervals]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[SymbolIntervals]:
+        with self._lock:
+            intervals = self._files.get(path)
+            if intervals is not None:
+                self._files.move_to_end(path)
+            return intervals
+
+    def put(self, path: str, intervals: SymbolIntervals, generation: int):
+        """
+        Store intervals loaded while the cache was at the given generation
+
+        Args:
+            path: File path
+            intervals: Intervals of the file
+            generation: Value of self.generation read before loading the symbols
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._files[path] = intervals
+            self._files.move_to_end(path)
+            if len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+
+    def invalidate(self, paths: Iterable[str]):
+        """Drop the entries of rewritten or removed files"""
+        with self._lock:
+            self.generation += 1
+            for path in paths:
+                self._files.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._files.clear()
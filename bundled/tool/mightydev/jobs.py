@@ -0,0 +1,279 @@
+"""
+Background indexing jobs for the codebase index.
+
+A job runs an indexer's index_workspace on its own thread so the request
+that started it returns immediately with a job id. While it runs, the job
+is recorded in the index (the metadata table of a CodebaseIndexer). The
+index writer commits each file's fingerprint in the same transaction as its
+symbols, so those fingerprints are the job's checkpoint: if the process
+dies, the next start finds the record and reruns the job, and every file
+committed in an earlier batch is skipped.
+"""
+
+import abc
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+INTERRUPTED = 'interrupted'  # Stopped by shutdown; resumes on the next start
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED, INTERRUPTED)
+
+
+class IndexJob:
+    """State of one background indexing run"""
+
+    def __init__(self, options: Dict[str, Any], job_id: Optional[str] = None,
+                 created: Optional[float] = None, resumed: bool = False):
+        """
+        Args:
+            options: index_workspace arguments: force, max_file_size and parse_mode
+            job_id: Id of the job (a new one is generated if omitted)
+            created: When the job was first started, kept across resumes
+            resumed: True if the job continues an interrupted run
+        """
+        self.id = job_id or uuid.uuid4().hex
+        self.options = options
+        self.created = created or time.time()
+        self.resumed = resumed
+        self.state = QUEUED
+        self.processed_files = 0
+        self.total_files = 0
+        self.current_file = ''
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.interrupted = False
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def progress(self, processed_files: int, total_files: int, current_file: Optional[str] = None):
+        self.processed_files = processed_files
+        self.total_files = total_files
+        self.current_file = current_file or ''
+
+    def checkpoint(self) -> str:
+        """Serialized record stored in the metadata table while the job runs"""
+        return json.dumps({"id": self.id, "options": self.options, "created": self.created})
+
+    @classmethod
+    def from_checkpoint(cls, value: str) -> 'IndexJob':
+        record = json.loads(value)
+        return cls(record.get("options") or {}, job_id=record.get("id"),
+                   created=record.get("created"), resumed=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started:
+            elapsed = round((self.finished or time.time()) - self.started, 3)
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "processed_files": self.processed_files,
+            "total_files": self.total_files,
+            "current_file": self.current_file,
+            "resumed": self.resumed,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed": elapsed,
+            "error": self.error,
+            "options": dict(self.options),
+        }
+
+
+ProgressCallback = Callable[[int, int, Optional[str]], None]
+
+
+class IndexJobRunner(abc.ABC):
+    """
+    Background job control for an indexer.
+
+    The indexer provides index_workspace, index_lock, indexing_in_progress and
+    storage for one checkpoint record (_load_job_checkpoint and
+    _set_job_checkpoint), and calls _init_jobs from its constructor.
+    """
+
+    def _init_jobs(self, max_finished_jobs: int = 20):
+        """
+        Args:
+            max_finished_jobs: Finished jobs kept for job_status
+        """
+        self.jobs: 'OrderedDict[str, IndexJob]' = OrderedDict()
+        self.max_finished_jobs = max_finished_jobs
+        self.active_job: Optional[IndexJob] = None
+
+    @abc.abstractmethod
+    def _load_job_checkpoint(self) -> Optional[str]:
+        """The stored checkpoint record, if a job didn't finish"""
+
+    @abc.abstractmethod
+    def _set_job_checkpoint(self, value: Optional[str]):
+        """Store a checkpoint record, or clear it with None"""
+
+    def _claim_indexing(self, cancel_event: threading.Event) -> bool:
+        """
+        Wait for any other indexing run to finish and mark this one as running
+
+        The check and the claim happen under index_lock, so a run that starts
+        meanwhile (e.g. a watcher-triggered pass) can't slip in between them.
+
+        Returns:
+            True once claimed, False if cancel_event was set first
+        """
+        while True:
+            with self.index_lock:
+                if not self.indexing_in_progress:
+                    self.indexing_in_progress = True
+                    return True
+            if cancel_event.wait(0.1):
+                return False
+
+    def start_index_job(self, force: bool = False, max_file_size: int = 1024 * 1024,
+                        parse_mode: Optional[str] = None,
+                        progress_callback: Optional[ProgressCallback] = None,
+                        job: Optional[IndexJob] = None) -> Tuple[IndexJob, bool]:
+        """
+        Index the workspace on a background thread
+
+        The job is checkpointed until it finishes, so if the process stops
+        mid-run, resume_index_job continues it from the last batch the writer
+        committed.
+
+        Args:
+            force: If True, reindex everything even if it hasn't changed
+            max_file_size: Maximum file size to index in bytes (default 1MB)
+            parse_mode: "thread" or "process" (defaults to the indexer's parse_mode)
+            progress_callback: Called with (processed_files, total_files, current_file)
+            job: Job to run, when resuming one (a new job is created if omitted)
+
+        Returns:
+            (job, started): the new job, or the job that is already running and False
+        """
+        with self.index_lock:
+            if self.active_job and not self.active_job.done:
+                return self.active_job, False
+            if job is None:
+                job = IndexJob({"force": force, "max_file_size": max_file_size, "parse_mode": parse_mode})
+            self.active_job = job
+            self.jobs[job.id] = job
+            finished = [job_id for job_id, other in self.jobs.items() if other.done]
+            for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+                del self.jobs[job_id]
+
+        self._set_job_checkpoint(job.checkpoint())
+        job.thread = threading.Thread(target=self._run_index_job, args=(job, progress_callback),
+                                      name=f"codebase-index-job-{job.id[:8]}", daemon=True)
+        job.thread.start()
+        logger.info(f"Started {'resumed ' if job.resumed else ''}indexing job {job.id}")
+        return job, True
+
+    def _run_index_job(self, job: IndexJob, progress_callback: Optional[ProgressCallback]):
+        """Body of a job thread"""
+        def on_progress(processed_files: int, total_files: int, current_file: Optional[str] = None):
+            job.progress(processed_files, total_files, current_file)
+            if progress_callback:
+                progress_callback(processed_files, total_files, current_file)
+
+        options = job.options
+        job.state = RUNNING
+        job.started = time.time()
+        state = FAILED
+        try:
+            # Another run (e.g. a watcher-triggered pass) may still be finishing
+            claimed = self._claim_indexing(job.cancel_event)
+            success = claimed and self.index_workspace(
+                force=options.get("force", False),
+                max_file_size=options.get("max_file_size", 1024 * 1024),
+                progress_callback=on_progress,
+                parse_mode=options.get("parse_mode"),
+                cancel_event=job.cancel_event,
+                resume_since=job.created if job.resumed else None,
+                claimed=True
+            )
+            if job.interrupted:
+                state = INTERRUPTED
+            elif job.cancel_event.is_set():
+                state = CANCELLED
+            elif success:
+                state = COMPLETED
+            else:
+                job.error = "Indexing failed, see the server log"
+        except Exception as e:
+            logger.error(f"Error in indexing job {job.id}: {e}")
+            job.error = str(e)
+        finally:
+            # An interrupted job keeps its checkpoint and resumes on the next start.
+            # The state changes last, so a job that starts next never loses its checkpoint
+            if state != INTERRUPTED:
+                self._set_job_checkpoint(None)
+            job.finished = time.time()
+            job.state = state
+            logger.info(f"Indexing job {job.id} {state}")
+
+    def get_index_job(self, job_id: Optional[str] = None) -> Optional[IndexJob]:
+        """
+        Look up an indexing job
+
+        Args:
+            job_id: Id returned by start_index_job (default: the most recent job)
+        """
+        with self.index_lock:
+            if job_id is None:
+                return self.active_job
+            return self.jobs.get(job_id)
+
+    def cancel_index_job(self, job_id: Optional[str] = None) -> Optional[IndexJob]:
+        """
+        Ask a running indexing job to stop after the files in flight
+
+        Files already written stay indexed, and the job is not resumed on restart.
+
+        Args:
+            job_id: Id of the job (default: the most recent job)
+
+        Returns:
+            The job, or None if there is no such job
+        """
+        job = self.get_index_job(job_id)
+        if job and not job.done:
+            job.cancel_event.set()
+        return job
+
+    def resume_index_job(self, progress_callback: Optional[ProgressCallback] = None) -> Optional[IndexJob]:
+        """
+        Restart the job that was running when the process last stopped, if any
+
+        Args:
+            progress_callback: Called with (processed_files, total_files, current_file)
+
+        Returns:
+            The resumed job, or None if no job was interrupted
+        """
+        checkpoint = self._load_job_checkpoint()
+        if not checkpoint:
+            return None
+        try:
+            job = IndexJob.from_checkpoint(checkpoint)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable indexing job checkpoint: {e}")
+            self._set_job_checkpoint(None)
+            return None
+        job, _ = self.start_index_job(progress_callback=progress_callback, job=job)
+        return job
@@ -0,0 +1,621 @@
+"""
+Single-pass JavaScript/TypeScript symbol extractor for the codebase index.
+
+The source is tokenized once with a single regular expression. Comments are
+dropped; string, template and regular expression literals become opaque
+tokens, so braces inside them never confuse block matching. Matching brackets
+are paired during tokenization, which lets the extractor jump from an opening
+brace straight to the end of its block. Line numbers come from a table of
+line offsets built once and searched with bisect, so the whole pass is linear
+in the size of the file.
+
+The extractor is heuristic rather than a full parser: it recognises imports,
+require() calls, classes and their methods, function declarations, functions
+and arrow functions assigned to variables or class properties, and TypeScript
+interfaces and enums.
+"""
+
+import bisect
+import logging
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Token kinds
+_IDENT = 'i'
+_NUMBER = 'n'
+_STRING = 's'
+_REGEX = 'r'
+_OPEN = 'o'
+_CLOSE = 'c'
+_PUNCT = 'p'
+
+# Marks an open "${" of a template literal on the bracket stack
+_TEMPLATE = -1
+
+# Leading whitespace is consumed by the match itself, which is much faster
+# than letting the scanner search for the next token position by position
+_TOKEN_RE = re.compile(r"""
+  \s*(?:
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<ident>[^\W\d][\w$]*|\$[\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<string>'(?:\\.|[^'\\\n])*'?|"(?:\\.|[^"\\\n])*"?)
+  | (?P<open>[{(\[])
+  | (?P<close>[})\]])
+  | (?P<tick>`)
+  | (?P<slash>/=?)
+  | (?P<punct>=>|\.\.\.|\?\?=?|\?\.|\+\+|--|\*\*=?|&&=?|\|\|=?|<<=?|>>>?=?|[=!]=?=?|[<>&|^%*+-]=?|[;,.:?~@\#])
+  )
+""", re.DOTALL | re.VERBOSE)
+
+# Text of a template literal up to its closing backtick or next "${"
+_TEMPLATE_RE = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*', re.DOTALL)
+
+# Body and flags of a regular expression literal, after its opening slash
+_REGEX_RE = re.compile(r'(?:[^\\/\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[\w$]*')
+
+_NEWLINE_RE = re.compile('\n')
+
+# Keywords after which a slash starts a regular expression rather than a division
+_REGEX_PREFIX_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+    'case', 'do', 'else', 'yield', 'await',
+])
+
+KEYWORDS = frozenset("""
+    abstract any as async await boolean break case catch class const constructor continue
+    debugger declare default delete do else enum export extends false finally for from
+    function get if implements import in instanceof interface let new null number of
+    private protected public readonly return set static string super switch this throw
+    true try type typeof undefined var void while with yield
+""".split())
+
+# Keywords whose next identifier is the name being declared, not a use
+_DECLARATION_KEYWORDS = frozenset(['function', 'class', 'const', 'let', 'var', 'interface', 'type', 'enum'])
+
+# Words that may precede a declaration and belong to its first line
+_DECLARATION_PREFIXES = frozenset(['export', 'default', 'declare', 'async', 'abstract'])
+
+# Words that may precede a class member name
+_MEMBER_MODIFIERS = frozenset([
+    'static', 'async', 'get', 'set', 'public', 'private', 'protected', 'readonly',
+    'override', 'abstract', 'declare', 'accessor',
+])
+
+# Tokens after which a "{" in a type annotation opens an object type, not a body
+_TYPE_CONTINUATIONS = frozenset([':', '|', '&', '<', ',', '=>', '?', 'extends', 'keyof', 'typeof'])
+
+# Keywords that start a new statement and so end an arrow function's expression body
+_STATEMENT_KEYWORDS = frozenset([
+    'const', 'let', 'var', 'export', 'import', 'return', 'if', 'for', 'while', 'switch',
+    'throw', 'try', 'interface', 'enum',
+])
+
+# Padding tokens at the end of the stream
+_SENTINELS = 4
+
+# How far ahead to look for the parts of a declaration (names, bodies, module specifiers)
+_LOOKAHEAD = 256
+
+
+class JsSymbol(NamedTuple):
+    """A symbol found by parse_javascript"""
+    name: str
+    type: str
+    line_start: int
+    line_end: int
+    signature: str
+    parent: str
+
+
+class _Tokens:
+    """Parallel token arrays plus the index of each bracket's partner"""
+
+    def __init__(self):
+        self.kinds: List[str] = []
+        self.values: List[Optional[str]] = []
+        self.starts: List[int] = []
+        self.partner: Dict[int, int] = {}
+
+
+def _string_value(text: str) -> str:
+    if len(text) >= 2 and text[-1] == text[0]:
+        return text[1:-1]
+    return text[1:]
+
+
+def _regex_allowed(tokens: _Tokens) -> bool:
+    """Whether a slash at the current position starts a regular expression literal"""
+    if not tokens.kinds:
+        return True
+    kind = tokens.kinds[-1]
+    if kind == _PUNCT:
+        return tokens.values[-1] not in ('++', '--')
+    if kind == _OPEN:
+        return True
+    if kind == _IDENT:
+        return tokens.values[-1] in _REGEX_PREFIX_KEYWORDS
+    return False
+
+
+def _tokenize(content: str) -> _Tokens:
+    tokens = _Tokens()
+    kinds = tokens.kinds
+    values = tokens.values
+    starts = tokens.starts
+    partner = tokens.partner
+    opens: List[int] = []
+    length = len(content)
+    pos = 0
+
+    def template(pos: int) -> int:
+        """Consume template text from pos; returns where tokenizing resumes"""
+        end = _TEMPLATE_RE.match(content, pos).end()
+        if end >= length:
+            return length
+        if content[end] == '`':
+            return end + 1
+        # "${": tokenize the expression until its closing brace
+        opens.append(_TEMPLATE)
+        return end + 2
+
+    while pos < length:
+        resume = length
+        for match in _TOKEN_RE.finditer(content, pos):
+            kind = match.lastgroup
+            if kind == 'comment':
+                continue
+            group = match.lastindex
+            start = match.start(group)
+            if kind == 'ident':
+                kinds.append(_IDENT)
+                values.append(match.group(group))
+            elif kind == 'punct':
+                kinds.append(_PUNCT)
+                values.append(match.group(group))
+            elif kind == 'open':
+                opens.append(len(kinds))
+                kinds.append(_OPEN)
+                values.append(match.group(group))
+            elif kind == 'close':
+                text = match.group(group)
+                if opens and opens[-1] == _TEMPLATE and text == '}':
+                    # End of a substitution: the template text continues
+                    opens.pop()
+                    kinds.append(_STRING)
+                    values.append(None)
+                    starts.append(start)
+                    resume = template(match.end())
+                    break
+                index = len(kinds)
+                if opens and opens[-1] != _TEMPLATE:
+                    other = opens.pop()
+                    partner[other] = index
+                    partner[index] = other
+                kinds.append(_CLOSE)
+                values.append(text)
+            elif kind == 'string':
+                kinds.append(_STRING)
+                values.append(_string_value(match.group(group)))
+            elif kind == 'number':
+                kinds.append(_NUMBER)
+                values.append(match.group(group))
+            elif kind == 'tick':
+                end = template(match.end())
+                kinds.append(_STRING)
+                # Only a template without substitutions has a static value
+                values.append(content[match.end():end - 1] if content[end - 1:end] == '`' else None)
+                starts.append(start)
+                resume = end
+                break
+            else:  # slash
+                if _regex_allowed(tokens):
+                    regex = _REGEX_RE.match(content, start + 1)
+                    if regex:
+                        kinds.append(_REGEX)
+                        values.append(None)
+                        starts.append(start)
+                        resume = regex.end()
+                        break
+                kinds.append(_PUNCT)
+                values.append(match.group(group))
+            starts.append(start)
+        pos = resume
+
+    # Sentinels so lookahead never runs off the end
+    kinds.extend([''] * _SENTINELS)
+    values.extend([None] * _SENTINELS)
+    starts.extend([length] * _SENTINELS)
+    return tokens
+
+
+class _Extractor:
+    """Walks the token stream once, collecting symbols, imports and references"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.tokens = _tokenize(content)
+        self.count = len(self.tokens.kinds) - _SENTINELS
+        self.line_starts = [0]
+        self.line_starts.extend(match.end() for match in _NEWLINE_RE.finditer(content))
+        self.symbols: List[JsSymbol] = []
+        self.imports: List[str] = []
+        self.references: List[Tuple[str, int, int]] = []
+        self.declared = set()  # indices of identifier tokens that name a declaration
+        self.class_bodies: Dict[int, str] = {}  # index of a class body "{" -> class name
+
+    def line(self, index: int) -> int:
+        return bisect.bisect_right(self.line_starts, self.tokens.starts[index])
+
+    def end_of(self, index: int) -> int:
+        """Character offset just past a token"""
+        start = self.tokens.starts[index]
+        value = self.tokens.values[index]
+        if self.tokens.kinds[index] in (_IDENT, _PUNCT, _OPEN, _CLOSE, _NUMBER):
+            return start + len(value)
+        return self.tokens.starts[index + 1]
+
+    def extend_start(self, index: int, words: frozenset) -> int:
+        """Move a declaration's first token back over prefixes like export and async"""
+        values = self.tokens.values
+        while index > 0 and values[index - 1] in words and self.tokens.kinds[index - 1] == _IDENT:
+            index -= 1
+        return index
+
+    def add_symbol(self, name: str, type: str, first: int, last: int, signature: str = '', parent: str = ''):
+        self.symbols.append(JsSymbol(name, type, self.line(first), self.line(last), signature, parent))
+
+    def add_import(self, index: int):
+        value = self.tokens.values[index]
+        if self.tokens.kinds[index] == _STRING and value:
+            self.imports.append(value)
+
+    def find(self, index: int, value: str) -> Optional[int]:
+        """Index of the next token with a value before any block, statement end or closer"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        limit = min(self.count, index + _LOOKAHEAD)
+        while index < limit:
+            if values[index] == value:
+                return index
+            if kinds[index] == _OPEN and values[index] != '[':
+                return None
+            if kinds[index] == _CLOSE or values[index] == ';':
+                return None
+            index += 1
+        return None
+
+    def skip_group(self, index: int) -> Optional[int]:
+        """Index just past the bracket group opened at index"""
+        other = self.tokens.partner.get(index)
+        return None if other is None else other + 1
+
+    def module_after_from(self, index: int):
+        """Record the module of an "import ... from 'x'" or "export ... from 'x'" clause"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        limit = min(self.count, index + _LOOKAHEAD)
+        while index < limit:
+            kind = kinds[index]
+            if kind == _OPEN:
+                index = self.skip_group(index)
+                if index is None:
+                    return
+                continue
+            if kind == _CLOSE or values[index] == ';':
+                return
+            if kind == _IDENT and values[index] == 'from' and kinds[index + 1] == _STRING:
+                self.add_import(index + 1)
+                return
+            index += 1
+
+    def body_start(self, index: int) -> Optional[int]:
+        """Index of the "{" of a function body after its parameter list, skipping a return type"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        if values[index] != ':':
+            return index if values[index] == '{' else None
+        limit = min(self.count, index + _LOOKAHEAD)
+        index += 1
+        while index < limit:
+            kind = kinds[index]
+            if kind == _OPEN:
+                if values[index] == '{' and values[index - 1] not in _TYPE_CONTINUATIONS:
+                    return index
+                index = self.skip_group(index)
+                if index is None:
+                    return None
+                continue
+            if kind == _CLOSE or values[index] in (';', '='):
+                return None
+            index += 1
+        return None
+
+    def arrow_end(self, index: int) -> int:
+        """Index of the last token of an arrow function body starting at index"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        if values[index] == '{':
+            return self.tokens.partner.get(index, index)
+        start = index
+        last = index - 1
+        while index < self.count:
+            kind = kinds[index]
+            value = values[index]
+            if kind == _OPEN:
+                other = self.tokens.partner.get(index)
+                if other is None:
+                    break
+                last = other
+                index = other + 1
+                continue
+            if kind == _CLOSE or value in (';', ','):
+                break
+            if kind == _IDENT and value in _STATEMENT_KEYWORDS and index > start:
+                break
+            last = index
+            index += 1
+        return max(last, 0)
+
+    def parameters(self, index: int) -> Optional[int]:
+        """Index of the ")" closing the parameter list that starts at or after index"""
+        paren = self.find(index, '(')
+        if paren is None:
+            return None
+        return self.tokens.partner.get(paren)
+
+    def function_value(self, index: int) -> Optional[Tuple[int, int]]:
+        """
+        Check whether the expression at index is a function or arrow function
+
+        Returns:
+            (last token of the signature, last token of the body) or None
+        """
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        if values[index] == 'async' and kinds[index + 1] != _PUNCT:
+            index += 1
+        if values[index] == 'function':
+            close = self.parameters(index + 1)
+            if close is None:
+                return None
+            body = self.body_start(close + 1)
+            return close, (self.tokens.partner.get(body, close) if body is not None else close)
+
+        if values[index] == '<':
+            # Generic arrow function: <T>(x: T) => ...
+            index = self.find(index, '(')
+            if index is None:
+                return None
+        if values[index] == '(':
+            close = self.tokens.partner.get(index)
+            if close is None:
+                return None
+            arrow = close + 1
+            if values[arrow] == ':':
+                # Return type annotation
+                limit = min(self.count, arrow + _LOOKAHEAD)
+                while arrow < limit and values[arrow] != '=>':
+                    if kinds[arrow] == _OPEN:
+                        arrow = self.skip_group(arrow)
+                        if arrow is None:
+                            return None
+                        continue
+                    if kinds[arrow] == _CLOSE or values[arrow] in (';', '=', ','):
+                        return None
+                    arrow += 1
+        elif kinds[index] == _IDENT:
+            arrow = index + 1
+        else:
+            return None
+        if values[arrow] != '=>':
+            return None
+        return arrow, self.arrow_end(arrow + 1)
+
+    def initializer(self, index: int) -> Optional[int]:
+        """Index just past the "=" of a declaration whose name precedes index, skipping a type annotation"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        if values[index] in ('?', '!'):
+            index += 1
+        if values[index] == ':':
+            limit = min(self.count, index + _LOOKAHEAD)
+            while index < limit and values[index] != '=':
+                if kinds[index] == _OPEN:
+                    index = self.skip_group(index)
+                    if index is None:
+                        return None
+                    continue
+                if kinds[index] == _CLOSE or values[index] in (';', ','):
+                    return None
+                index += 1
+        return index + 1 if values[index] == '=' else None
+
+    def assigned_function(self, first: int, name_index: int, type: str, parent: str = '') -> bool:
+        """Record "name = <function>" (a variable or class property) as a symbol"""
+        value = self.initializer(name_index + 1)
+        if value is None:
+            return False
+        found = self.function_value(value)
+        if found is None:
+            return False
+        signature_end, body_end = found
+        signature = self.content[self.tokens.starts[first]:self.end_of(signature_end)]
+        self.add_symbol(self.tokens.values[name_index], type, first, body_end, signature, parent)
+        return True
+
+    def member(self, index: int, class_name: str):
+        """Record a class member that is a method or a function-valued property"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        value = values[index]
+        following = values[index + 1]
+        if value in _MEMBER_MODIFIERS and (kinds[index + 1] == _IDENT or following in ('*', '[', '#')):
+            return
+        previous = values[index - 1]
+        if not (kinds[index - 1] in (_OPEN, _CLOSE) or previous in (';', '*', '#')
+                or previous in _MEMBER_MODIFIERS or self.line(index - 1) < self.line(index)):
+            return
+
+        first = self.extend_start(index, _MEMBER_MODIFIERS)
+        if following in ('(', '<'):
+            close = self.parameters(index + 1)
+            if close is None:
+                return
+            body = self.body_start(close + 1)
+            if body is None:
+                # Overload signature or abstract method
+                return
+            self.declared.add(index)
+            signature = self.content[self.tokens.starts[index]:self.end_of(close)]
+            self.add_symbol(value, 'method', first, self.tokens.partner.get(body, body), signature, class_name)
+        elif self.assigned_function(first, index, 'method', class_name):
+            self.declared.add(index)
+
+    def parse(self):
+        tokens = self.tokens
+        kinds = tokens.kinds
+        values = tokens.values
+        partner = tokens.partner
+        groups: List[int] = []  # indices of the brackets enclosing the current token
+
+        for index in range(self.count):
+            kind = kinds[index]
+            if kind == _OPEN:
+                groups.append(index)
+                continue
+            if kind == _CLOSE:
+                if groups:
+                    groups.pop()
+                continue
+            if kind != _IDENT:
+                continue
+
+            value = values[index]
+            previous = values[index - 1] if index else None
+            if previous in ('.', '?.'):
+                # Property access; keywords are plain names here
+                self.references.append(self.reference(index))
+                continue
+
+            if groups and groups[-1] in self.class_bodies:
+                self.member(index, self.class_bodies[groups[-1]])
+
+            if value == 'require':
+                if values[index + 1] == '(' and kinds[index + 2] == _STRING and values[index + 3] == ')':
+                    self.add_import(index + 2)
+            if value in KEYWORDS:
+                self.keyword(index)
+            elif index not in self.declared and previous not in _DECLARATION_KEYWORDS:
+                self.references.append(self.reference(index))
+
+        return self.symbols, self.imports, self.references
+
+    def reference(self, index: int) -> Tuple[str, int, int]:
+        line = self.line(index)
+        return (self.tokens.values[index], line, self.tokens.starts[index] - self.line_starts[line - 1])
+
+    def keyword(self, index: int):
+        """Handle declarations and imports introduced by a keyword"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        value = values[index]
+        following = values[index + 1]
+
+        if value == 'import':
+            if following == '(' and kinds[index + 2] == _STRING:
+                self.add_import(index + 2)
+            elif kinds[index + 1] == _STRING:
+                self.add_import(index + 1)
+            else:
+                self.module_after_from(index + 1)
+
+        elif value == 'export':
+            if following in ('*', '{'):
+                self.module_after_from(index + 1)
+
+        elif value == 'class':
+            if kinds[index + 1] == _IDENT and following not in ('extends', 'implements'):
+                name_index = index + 1
+                self.declared.add(name_index)
+            elif index >= 2 and values[index - 1] == '=' and kinds[index - 2] == _IDENT:
+                # const Name = class ...
+                name_index = index - 2
+            else:
+                return
+            body = self.find_block(index + 1)
+            if body is None:
+                return
+            name = values[name_index]
+            self.class_bodies[body] = name
+            first = self.extend_start(index, _DECLARATION_PREFIXES)
+            self.add_symbol(name, 'class', first, self.tokens.partner.get(body, body))
+
+        elif value == 'function':
+            name_index = index + 1
+            if following == '*':
+                name_index += 1
+            if kinds[name_index] != _IDENT:
+                # Anonymous function expressions are named by their assignment
+                return
+            self.declared.add(name_index)
+            first = self.extend_start(index, _DECLARATION_PREFIXES)
+            if first and (kinds[first - 1] == _PUNCT and values[first - 1] != ';'
+                          or values[first - 1] in ('(', '[')):
+                # A named function expression, e.g. the value of an assignment
+                return
+            close = self.parameters(name_index + 1)
+            if close is None:
+                return
+            body = self.body_start(close + 1)
+            signature = self.content[self.tokens.starts[first]:self.end_of(close)]
+            last = self.tokens.partner.get(body, close) if body is not None else close
+            self.add_symbol(values[name_index], 'function', first, last, signature)
+
+        elif value in ('const', 'let', 'var'):
+            if kinds[index + 1] == _IDENT:
+                self.declared.add(index + 1)
+                first = self.extend_start(index, _DECLARATION_PREFIXES)
+                self.assigned_function(first, index + 1, 'function')
+
+        elif value in ('interface', 'enum'):
+            if kinds[index + 1] == _IDENT:
+                body = self.find_block(index + 2)
+                if body is not None:
+                    self.declared.add(index + 1)
+                    first = self.extend_start(index, _DECLARATION_PREFIXES | {'const'})
+                    self.add_symbol(following, value, first, self.tokens.partner.get(body, body))
+
+    def find_block(self, index: int) -> Optional[int]:
+        """Index of the next "{" that opens a block, skipping heritage clauses like extends Base<T>()"""
+        kinds = self.tokens.kinds
+        values = self.tokens.values
+        limit = min(self.count, index + _LOOKAHEAD)
+        while index < limit:
+            if kinds[index] == _OPEN:
+                if values[index] == '{':
+                    return index
+                index = self.skip_group(index)
+                if index is None:
+                    return None
+                continue
+            if kinds[index] == _CLOSE or values[index] == ';':
+                return None
+            index += 1
+        return None
+
+
+def parse_javascript(content: str) -> Tuple[List[JsSymbol], List[str], List[Tuple[str, int, int]]]:
+    """
+    Extract symbols, imported modules and identifier references from JavaScript/TypeScript
+
+    Args:
+        content: Source text
+
+    Returns:
+        (symbols, module specifiers in import order, (name, line, column) references)
+    """
+    return _Extractor(content).parse()
@@ -0,0 +1,138 @@
+"""
+Indexing metrics for the codebase index.
+
+IndexMetrics keeps monotonically increasing counters and latency histograms
+for each phase of the indexing pipeline (scanning, reading, hashing, parsing
+per language, writing) plus a summary of the most recent indexing run.
+Parse workers, including process pool workers, collect (name, value)
+observations in a plain list that is merged into the metrics afterwards, so
+nothing has to be shared across processes.
+
+Names whose first dotted part ends in "_seconds" (e.g. "parse_seconds.python")
+are histograms; everything else is a counter.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# (metric name, value) pairs recorded by parse workers
+Observations = List[Tuple[str, float]]
+
+# Upper bounds of the histogram buckets in seconds: 10us doubling up to ~84s
+_BUCKET_BOUNDS = tuple(1e-5 * 2 ** i for i in range(24))
+
+
+class Histogram:
+    """Latency histogram with exponential buckets"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(_BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(_BUCKET_BOUNDS[i], self.max) if i < len(_BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "mean": round(self.total / self.count, 6),
+            "min": round(self.min, 6),
+            "p50": round(self.percentile(0.5), 6),
+            "p90": round(self.percentile(0.9), 6),
+            "p99": round(self.percentile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class IndexMetrics:
+    """Thread-safe counters and histograms of the indexing pipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.started = time.time()
+
+    def increment(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            self._observe(name, seconds)
+
+    def _observe(self, name: str, seconds: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def record(self, observations: Iterable[Tuple[str, float]]):
+        """Merge observations collected by a parse worker"""
+        with self._lock:
+            for name, value in observations:
+                if name.partition('.')[0].endswith('_seconds'):
+                    self._observe(name, value)
+                else:
+                    self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish_run(self, kind: str, started: float, **details: Any):
+        """
+        Record the summary of an indexing run
+
+        Args:
+            kind: "full" or "incremental"
+            started: time.time() when the run started
+            details: Extra fields of the summary, e.g. files and bytes processed
+        """
+        duration = time.time() - started
+        summary: Dict[str, Any] = {"kind": kind, "started": started, "duration": round(duration, 3)}
+        summary.update(details)
+        if duration > 0:
+            for key in ("files", "bytes"):
+                if key in details:
+                    summary[f"{key}_per_second"] = round(details[key] / duration, 1)
+        with self._lock:
+            self.last_run = summary
+            self._observe(f"run_seconds.{kind}", duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data"""
+        with self._lock:
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "last_run": dict(self.last_run) if self.last_run else None,
+            }
@@ -0,0 +1,195 @@
+"""
+Priority ordering of files for the indexing pipeline.
+
+HotFiles remembers which files the user is working on: files opened or
+saved in the editor, and files with recent git activity. PriorityWorkQueue
+hands out the files of an indexing run hottest first, and files marked hot
+while the run is going jump ahead of everything still waiting, so the
+working set is searchable long before a cold full index finishes.
+"""
+
+import heapq
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Priority ranks, lowest first
+EDITOR = 0  # Opened or saved in the editor
+GIT = 1     # Uncommitted changes or touched by recent commits
+COLD = 2    # Everything else, in walk order
+
+Priority = Tuple[int, float]
+
+
+class HotFiles:
+    """Bounded record of files the user is working on, by relative path"""
+
+    def __init__(self, max_files: int = 2000):
+        """
+        Args:
+            max_files: Number of hot files remembered; the least recently marked are forgotten
+        """
+        self.max_files = max_files
+        self._files: 'OrderedDict[str, Priority]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, paths: Iterable[str], rank: int = EDITOR, when: Optional[float] = None) -> List[str]:
+        """
+        Mark files as hot
+
+        A file keeps its best rank: recent git activity doesn't demote a file that
+        is open in the editor.
+
+        Args:
+            paths: Relative paths
+            rank: EDITOR or GIT
+            when: Time of the activity (default: now); more recent files come first
+
+        Returns:
+            The paths whose priority went up
+        """
+        when = time.time() if when is None else when
+        raised = []
+        with self._lock:
+            for path in paths:
+                current = self._files.get(path)
+                if current is not None and (current[0], -current[1]) <= (rank, -when):
+                    continue
+                self._files[path] = (rank, when)
+                self._files.move_to_end(path)
+                raised.append(path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        return raised
+
+    def priority(self, path: str) -> Priority:
+        """Sort key of a file: (rank, -time of its activity)"""
+        with self._lock:
+            rank, when = self._files.get(path, (COLD, 0.0))
+        return rank, -when
+
+    def snapshot(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Hottest files first"""
+        with self._lock:
+            files = sorted(self._files.items(), key=lambda item: (item[1][0], -item[1][1]))
+        return [{"path": path, "rank": rank, "time": when} for path, (rank, when) in files[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+class PriorityWorkQueue:
+    """
+    Work items of one indexing run, popped in priority order.
+
+    Items are keyed by relative path. Promoting a key pushes a fresh heap entry
+    and leaves the old one behind; entries whose key was already handed out
+    are skipped when popped.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Any]], priority: Callable[[str], Priority]):
+        """
+        Args:
+            items: (relative path, work item) pairs in walk order
+            priority: Sort key of a path, e.g. HotFiles.priority
+        """
+        self._priority = priority
+        self._items: Dict[str, Any] = {}
+        self._heap = []
+        for seq, (key, item) in enumerate(items):
+            self._items[key] = item
+            self._heap.append((priority(key), seq, key))
+        heapq.heapify(self._heap)
+        self._seq = len(self._heap)
+        self._lock = threading.Lock()
+
+    def promote(self, keys: Iterable[str]) -> int:
+        """
+        Move pending items ahead according to their current priority
+
+        Returns:
+            Number of keys that were still pending
+        """
+        promoted = 0
+        with self._lock:
+            for key in keys:
+                if key in self._items:
+                    heapq.heappush(self._heap, (self._priority(key), self._seq, key))
+                    self._seq += 1
+                    promoted += 1
+        return promoted
+
+    def pop(self) -> Optional[Tuple[str, Any]]:
+        """The highest-priority pending (key, item), or None when empty"""
+        with self._lock:
+            while self._heap:
+                _, _, key = heapq.heappop(self._heap)
+                if key in self._items:
+                    return key, self._items.pop(key)
+            return None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def recent_git_files(root: str, commits: int = 20, timeout: float = 2.0) -> List[str]:
+    """
+    Files with recent git activity, most recent first
+
+    Uncommitted changes come first, then files touched by the last commits.
+    Paths are relative to root (which may be below the repository's top level).
+
+    Args:
+        root: Workspace root
+        commits: Number of recent commits to look at
+        timeout: Seconds to wait for each git command
+
+    Returns:
+        Relative paths, or an empty list if root isn't in a git repository or git is missing
+    """
+    def git(*args: str) -> Optional[str]:
+        try:
+            result = subprocess.run(['git', '-C', root] + list(args), capture_output=True,
+                                    timeout=timeout, text=True)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"git {args[0]} failed: {e}")
+            return None
+        return result.stdout if result.returncode == 0 else None
+
+    prefix = git('rev-parse', '--show-prefix')
+    if prefix is None:
+        return []
+    prefix = prefix.strip()
+
+    paths: Dict[str, None] = {}
+    status = git('status', '--porcelain', '-z', '--untracked-files=all', '.')
+    if status:
+        entries = status.split('\0')
+        i = 0
+        while i < len(entries):
+            entry = entries[i]
+            i += 1
+            if len(entry) < 4:
+                continue
+            # A rename is followed by its original path, which no longer exists
+            if entry[0] in 'RC':
+                i += 1
+            # Porcelain paths are relative to the top of the repository
+            path = entry[3:]
+            if entry[0] != 'D' and entry[1] != 'D' and path.startswith(prefix):
+                paths.setdefault(path[len(prefix):])
+    # With --relative, log paths are relative to root already
+    log = git('log', f'-{commits}', '--name-only', '--pretty=format:', '--relative', '--', '.')
+    if log:
+        for line in log.splitlines():
+            if line:
+                paths.setdefault(line)
+
+    return [path.replace('/', os.sep) for path in paths]
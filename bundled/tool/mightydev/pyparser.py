@@ -0,0 +1,186 @@
+"""
+Single-pass Python symbol extractor for the codebase index.
+
+One ast.NodeVisitor walk over the module collects classes, functions and
+methods (sync and async, at any nesting depth), module-level assignments,
+imports and name references. Symbols carry the qualified name of their
+enclosing scope as their parent, so "Outer.Inner.method" is stored as method
+"method" with parent "Outer.Inner".
+"""
+
+import ast
+import builtins
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Names that are used everywhere and never resolve to a symbol in the index
+IGNORED_REFERENCES = frozenset(dir(builtins)) | {'self', 'cls'}
+
+# ast.unparse is only available from Python 3.9
+_unparse = getattr(ast, 'unparse', None)
+
+
+class PySymbol(NamedTuple):
+    """A symbol found by parse_python, in the column order of the index's symbol rows"""
+    name: str
+    type: str
+    line_start: int
+    line_end: int
+    column_start: int
+    column_end: int
+    signature: str
+    docstring: str
+    parent: str
+
+
+def _signature(node, prefix: str = '') -> str:
+    """Render "name(a, b=..., *args, c, **kwargs)" from a function definition"""
+    args = node.args
+    params = [a.arg for a in args.posonlyargs]
+    if args.posonlyargs:
+        params.append('/')
+    params.extend(a.arg for a in args.args)
+    if args.vararg:
+        params.append(f'*{args.vararg.arg}')
+    elif args.kwonlyargs:
+        params.append('*')
+    params.extend(a.arg for a in args.kwonlyargs)
+    if args.kwarg:
+        params.append(f'**{args.kwarg.arg}')
+    return f"{prefix}{node.name}({', '.join(params)})"
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    """Collects symbols, imports and references in one walk"""
+
+    # Node class -> unbound visit method, so dispatch skips building method names per node
+    _dispatch: Dict[type, Callable] = {}
+
+    def __init__(self, content: str):
+        self.content = content
+        self.symbols: List[PySymbol] = []
+        self.imports: List[str] = []
+        self.references: List[Tuple[str, int, int]] = []
+        self.scopes: List[Tuple[str, str]] = []  # (qualified name, "class" or "function")
+        self._lines: Optional[List[str]] = None
+
+    def visit(self, node):
+        cls = node.__class__
+        method = self._dispatch.get(cls)
+        if method is None:
+            method = getattr(type(self), 'visit_' + cls.__name__, type(self).generic_visit)
+            self._dispatch[cls] = method
+        return method(self, node)
+
+    def generic_visit(self, node):
+        visit = self.visit
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        visit(item)
+            elif isinstance(value, ast.AST):
+                visit(value)
+
+    def end_line(self, node) -> int:
+        if getattr(node, 'end_lineno', None) is not None:
+            return node.end_lineno
+        # Interpreters without end positions: the next line indented no deeper ends the node
+        if self._lines is None:
+            self._lines = self.content.splitlines()
+        lines = self._lines
+        first = lines[node.lineno - 1]
+        indent = len(first) - len(first.lstrip())
+        for i in range(node.lineno, len(lines)):
+            line = lines[i]
+            if line.strip() and len(line) - len(line.lstrip()) <= indent:
+                return i
+        return len(lines)
+
+    def add(self, node, name: str, type: str, signature: str = '', docstring: str = ''):
+        parent = self.scopes[-1][0] if self.scopes else ''
+        self.symbols.append(PySymbol(
+            name, type, node.lineno, self.end_line(node), node.col_offset,
+            getattr(node, 'end_col_offset', None) or 0, signature, docstring, parent
+        ))
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.add(node, node.name, 'class', docstring=ast.get_docstring(node) or '')
+        self.scoped(node, 'class')
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self.scopes) and self.scopes[-1][1] == 'class'
+        prefix = 'async ' if isinstance(node, ast.AsyncFunctionDef) else ''
+        self.add(node, node.name, 'method' if in_class else 'function',
+                 signature=_signature(node, prefix), docstring=ast.get_docstring(node) or '')
+        self.scoped(node, 'function')
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def scoped(self, node, kind: str):
+        qualified = f"{self.scopes[-1][0]}.{node.name}" if self.scopes else node.name
+        self.scopes.append((qualified, kind))
+        self.generic_visit(node)
+        self.scopes.pop()
+
+    def visit_Assign(self, node: ast.Assign):
+        if not self.scopes:
+            for target in node.targets:
+                self.assigned(node, target, '')
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if not self.scopes:
+            self.assigned(node, node.target, _unparse(node.annotation) if _unparse else '')
+        self.generic_visit(node)
+
+    def assigned(self, node, target, annotation: str):
+        """Record the names bound by a module-level assignment target"""
+        if isinstance(target, ast.Name):
+            signature = f"{target.id}: {annotation}" if annotation else target.id
+            self.add(node, target.id, 'variable', signature=signature)
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            for element in target.elts:
+                self.assigned(node, element.value if isinstance(element, ast.Starred) else element, '')
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.imports.append(alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        # Relative imports keep their leading dots (".pkg.name", "..name")
+        module = "." * (node.level or 0) + (node.module or "")
+        for alias in node.names:
+            self.imports.append(f"{module}{alias.name}" if module.endswith(".") else f"{module}.{alias.name}")
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load) and node.id not in IGNORED_REFERENCES:
+            self.references.append((node.id, node.lineno, node.col_offset))
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if isinstance(node.ctx, ast.Load) and node.end_lineno is not None:
+            # The node spans the whole "a.b" expression; the attribute is at its end
+            self.references.append((node.attr, node.end_lineno, node.end_col_offset - len(node.attr)))
+        self.generic_visit(node)
+
+
+def parse_python(content: str) -> Tuple[List[PySymbol], List[str], List[Tuple[str, int, int]]]:
+    """
+    Extract symbols, imports and name references from Python source
+
+    Args:
+        content: Source text
+
+    Returns:
+        (symbols, imported modules, (name, line, column) references)
+
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    visitor = _SymbolVisitor(content)
+    visitor.visit(ast.parse(content))
+    return visitor.symbols, visitor.imports, visitor.references
@@ -0,0 +1,406 @@
+"""
+Workspace scanner for the codebase index.
+
+A single os.scandir pass over the workspace collects every indexable file
+together with its stat result, pruning ignored directories as it goes. Besides
+the indexer's built-in directory rules, the scan honours .gitignore and
+.tribeignore files at any level of the tree; their patterns are compiled to
+regular expressions once per file. The latest scan is kept as a snapshot so
+that estimating the workspace and indexing it right afterwards walk the tree
+only once.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Files whose patterns exclude paths from the index
+IGNORE_FILES = ('.gitignore', '.tribeignore')
+
+# (absolute path, relative path, stat result, lowercase extension)
+ScannedFile = Tuple[str, str, os.stat_result, str]
+
+
+def _translate(pattern: str) -> str:
+    """Translate the body of a gitignore pattern into a regular expression"""
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        at_segment_start = i == 0 or pattern[i - 1] == '/'
+        if c == '*' and pattern.startswith('**', i) and at_segment_start and (i + 2 == n or pattern[i + 2] == '/'):
+            if i + 2 == n:
+                # Trailing "/**": everything inside
+                out.append('.*')
+                i += 2
+            else:
+                # "**/": zero or more directories
+                out.append('(?:.*/)?')
+                i += 3
+        elif c == '*':
+            out.append('[^/]*')
+            i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith(('[!', '[]'), i) else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            negate = body.startswith('!')
+            if negate:
+                body = body[1:]
+            body = body.replace('\\', '\\\\')
+            out.append(f"[{'^' if negate else ''}{body}]")
+            i = end + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """
+    Compiled patterns of one ignore file, matched against paths relative to its directory.
+
+    Follows gitignore semantics: the last matching pattern wins, "!" re-includes
+    a path, a trailing "/" only matches directories, and a pattern containing a
+    "/" is anchored to the directory of the ignore file.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        """
+        Args:
+            lines: Lines of the ignore file
+        """
+        self.rules: List[Tuple[Pattern, bool, bool]] = []  # (regex, negated, directories only)
+        for line in lines:
+            line = line.rstrip('\r\n')
+            # Trailing spaces are ignored unless escaped
+            stripped = line.rstrip(' ')
+            if stripped.endswith('\\') and len(stripped) < len(line):
+                stripped += ' '
+            line = stripped
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith(('\\!', '\\#')):
+                line = line[1:]
+
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            line = line.lstrip('/')
+
+            prefix = '' if anchored else '(?:.*/)?'
+            try:
+                regex = re.compile(prefix + _translate(line), re.DOTALL)
+            except re.error as e:
+                logger.warning(f"Skipping invalid ignore pattern {line!r}: {e}")
+                continue
+            self.rules.append((regex, negated, dir_only))
+
+        # Without negations the patterns collapse into one alternation per kind
+        self._combined = None
+        if self.rules and not any(negated for _, negated, _ in self.rules):
+            file_patterns = [regex.pattern for regex, _, dir_only in self.rules if not dir_only]
+            all_patterns = [regex.pattern for regex, _, _ in self.rules]
+            self._combined = (
+                re.compile('|'.join(f'(?:{p})' for p in file_patterns), re.DOTALL) if file_patterns else None,
+                re.compile('|'.join(f'(?:{p})' for p in all_patterns), re.DOTALL),
+            )
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a "/"-separated path relative to the ignore file's directory
+
+        Returns:
+            True if ignored, False if explicitly re-included, None if no pattern matches
+        """
+        if self._combined is not None:
+            files, everything = self._combined
+            regex = everything if is_dir else files
+            return True if regex is not None and regex.fullmatch(rel_path) else None
+
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                return not negated
+        return None
+
+
+# Ignore rules in effect for a directory: (directory relative to the root, rules), outermost first.
+# Rules of ignore files above the root come first, with an empty directory.
+_RuleStack = Tuple[Tuple[str, IgnoreRules], ...]
+
+
+def _is_ignored(stack: _RuleStack, rel_path: str, is_dir: bool) -> bool:
+    """Check a "/"-separated path against a rule stack; deeper ignore files take precedence"""
+    for base, rules in reversed(stack):
+        result = rules.match(rel_path[len(base) + 1:] if base else rel_path, is_dir)
+        if result is not None:
+            return result
+    return False
+
+
+class _AncestorRules:
+    """Rules of an ignore file above the scanned root, matched against paths relative to the root"""
+
+    def __init__(self, rules: IgnoreRules, prefix: str):
+        """
+        Args:
+            rules: Rules of the ignore file
+            prefix: "/"-separated path of the scanned root relative to the ignore file's directory
+        """
+        self.rules = rules
+        self.prefix = prefix
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        return self.rules.match(f"{self.prefix}/{rel_path}" if rel_path else self.prefix, is_dir)
+
+
+class ScanSnapshot:
+    """Indexable files found by one scan of the workspace"""
+
+    def __init__(self, files: List[ScannedFile], directories: int, duration: float):
+        self.files = files
+        self.directories = directories
+        self.duration = duration
+        self.created = time.monotonic()
+
+    def count(self, max_file_size: int) -> int:
+        """Number of files no larger than max_file_size"""
+        return sum(1 for _, _, st, _ in self.files if st.st_size <= max_file_size)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created
+
+
+class WorkspaceScanner:
+    """
+    Single-pass os.scandir scanner that prunes ignored directories and files.
+
+    A directory is skipped when should_scan_dir rejects its name or an ignore
+    file excludes it; a file is kept when its extension is indexable and no
+    ignore file excludes it.
+    """
+
+    def __init__(self, workspace_root: str, extensions: Iterable[str],
+                 should_scan_dir: Callable[[str], bool], ignore_files: Iterable[str] = IGNORE_FILES,
+                 excluded_dirs: Iterable[str] = (), ignore_root: Optional[str] = None):
+        """
+        Args:
+            workspace_root: Root directory of the workspace
+            extensions: Lowercase file extensions to collect (e.g. ".py")
+            should_scan_dir: Returns False for directory names to skip (e.g. node_modules)
+            ignore_files: Names of ignore files to honour
+            excluded_dirs: Relative paths of directories to skip
+            ignore_root: Ancestor of workspace_root whose ignore files, and those of the
+                         directories in between, apply too (e.g. the root of a monorepo)
+        """
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.ignore_root = os.path.abspath(ignore_root) if ignore_root else None
+        self.extensions = frozenset(extensions)
+        self.should_scan_dir = should_scan_dir
+        self.excluded_dirs = frozenset(path.replace(os.sep, '/') for path in excluded_dirs)
+        self.ignore_files = tuple(ignore_files)
+        self._rules: Dict[str, Optional[IgnoreRules]] = {}  # relative directory -> rules
+        self._snapshot: Optional[ScanSnapshot] = None
+        self._ancestors: Optional[Tuple[_RuleStack, bool]] = None
+        self._lock = threading.Lock()
+
+    def _load_rules(self, rel_dir: str, names: Iterable[str], root: Optional[str] = None) -> Optional[IgnoreRules]:
+        """Load and merge the ignore files present in a directory (relative to root, default the workspace)"""
+        lines = []
+        root = root or self.workspace_root
+        directory = os.path.join(root, rel_dir) if rel_dir else root
+        for name in self.ignore_files:
+            if name in names:
+                try:
+                    with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                        lines.extend(f)
+                except OSError:
+                    continue
+        rules = IgnoreRules(lines) if lines else None
+        return rules if rules and rules.rules else None
+
+    def _ancestor_rules(self) -> Tuple[_RuleStack, bool]:
+        """
+        Ignore rules of the directories from ignore_root down to the workspace root's parent
+
+        Returns:
+            (rule stack matching paths relative to the workspace root, whether a
+            directory on the way down, or the workspace root itself, is ignored)
+        """
+        with self._lock:
+            if self._ancestors is not None:
+                return self._ancestors
+        outer: _RuleStack = ()  # Bases relative to ignore_root
+        root_ignored = False
+        if self.ignore_root and self.workspace_root != self.ignore_root:
+            parts = os.path.relpath(self.workspace_root, self.ignore_root).replace(os.sep, '/').split('/')
+            rel_dir = ''
+            for part in parts:
+                directory = os.path.join(self.ignore_root, rel_dir) if rel_dir else self.ignore_root
+                names = [name for name in self.ignore_files if os.path.isfile(os.path.join(directory, name))]
+                dir_rules = self._load_rules(rel_dir, names, self.ignore_root) if names else None
+                if dir_rules:
+                    outer = outer + ((rel_dir, dir_rules),)
+                rel_dir = f"{rel_dir}/{part}" if rel_dir else part
+                if outer and _is_ignored(outer, rel_dir, True):
+                    root_ignored = True
+                    break
+            prefix = rel_dir
+            stack = tuple(('', _AncestorRules(rules, prefix[len(base) + 1:] if base else prefix))
+                          for base, rules in outer)
+        else:
+            stack = ()
+        with self._lock:
+            self._ancestors = (stack, root_ignored)
+        return self._ancestors
+
+    def scan(self, keep: bool = True) -> ScanSnapshot:
+        """
+        Walk the workspace once and keep the result as the latest snapshot
+
+        Args:
+            keep: Keep the result for the next take_snapshot
+
+        Returns:
+            The new snapshot
+        """
+        start = time.time()
+        files: List[ScannedFile] = []
+        rules: Dict[str, Optional[IgnoreRules]] = {}
+        directories = 0
+        extensions = self.extensions
+        sep = os.sep
+
+        ancestors, root_ignored = self._ancestor_rules()
+        # (absolute directory, "/"-separated relative directory, rule stack)
+        stack: List[Tuple[str, str, _RuleStack]] = [] if root_ignored else [(self.workspace_root, '', ancestors)]
+        while stack:
+            directory, rel_dir, rule_stack = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            directories += 1
+            rules[rel_dir] = None
+
+            # Ignore files apply to their siblings, so load them before anything else
+            names = {entry.name for entry in entries if entry.name in self.ignore_files}
+            if names:
+                dir_rules = self._load_rules(rel_dir, names)
+                rules[rel_dir] = dir_rules
+                if dir_rules:
+                    rule_stack = rule_stack + ((rel_dir, dir_rules),)
+
+            for entry in entries:
+                name = entry.name
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                try:
+                    if entry.is_dir():
+                        # Like os.walk, don't descend into symlinked directories
+                        if (not entry.is_symlink() and self.should_scan_dir(name)
+                                and rel_path not in self.excluded_dirs
+                                and not (rule_stack and _is_ignored(rule_stack, rel_path, True))):
+                            stack.append((entry.path, rel_path, rule_stack))
+                        continue
+
+                    ext = os.path.splitext(name)[1].lower()
+                    if ext not in extensions:
+                        continue
+                    if rule_stack and _is_ignored(rule_stack, rel_path, False):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, rel_path if sep == '/' else rel_path.replace('/', sep), st, ext))
+
+        snapshot = ScanSnapshot(files, directories, time.time() - start)
+        with self._lock:
+            self._rules = rules
+            if keep:
+                self._snapshot = snapshot
+        logger.info(f"Scanned {directories} directories, found {len(files)} indexable files "
+                    f"in {snapshot.duration:.2f} seconds")
+        return snapshot
+
+    def take_snapshot(self, max_age: float = 30.0) -> ScanSnapshot:
+        """
+        Hand out the latest snapshot if it is recent enough, otherwise scan
+
+        The snapshot is consumed, so the next call scans again.
+
+        Args:
+            max_age: Maximum age in seconds of a snapshot to reuse
+        """
+        with self._lock:
+            snapshot, self._snapshot = self._snapshot, None
+        if snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+        return self.scan(keep=False)
+
+    def invalidate(self):
+        """Drop the cached snapshot and ignore rules, e.g. after an ignore file changed"""
+        with self._lock:
+            self._snapshot = None
+            self._rules = {}
+            self._ancestors = None
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """
+        Whether the ignore files exclude a path or one of its parent directories
+
+        Args:
+            rel_path: Path relative to the workspace root
+            is_dir: Whether the path is a directory
+        """
+        rule_stack, root_ignored = self._ancestor_rules()
+        if root_ignored:
+            return True
+        parts = rel_path.replace(os.sep, '/').split('/')
+        rel_dir = ''
+        for i, part in enumerate(parts):
+            dir_rules = self._rules_for(rel_dir)
+            if dir_rules:
+                rule_stack = rule_stack + ((rel_dir, dir_rules),)
+            rel_dir = f"{rel_dir}/{part}" if rel_dir else part
+            last = i == len(parts) - 1
+            if rule_stack and _is_ignored(rule_stack, rel_dir, is_dir or not last):
+                return True
+        return False
+
+    def _rules_for(self, rel_dir: str) -> Optional[IgnoreRules]:
+        """Ignore rules of a directory, loading them if the last scan didn't visit it"""
+        with self._lock:
+            if rel_dir in self._rules:
+                return self._rules[rel_dir]
+        directory = os.path.join(self.workspace_root, rel_dir) if rel_dir else self.workspace_root
+        names = [name for name in self.ignore_files if os.path.isfile(os.path.join(directory, name))]
+        dir_rules = self._load_rules(rel_dir, names) if names else None
+        with self._lock:
+            self._rules[rel_dir] = dir_rules
+        return dir_rules
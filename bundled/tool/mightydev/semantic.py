@@ -0,0 +1,412 @@
+"""
+Semantic search over the symbols of the codebase index.
+
+Each symbol is embedded from its type, qualified name, signature, docstring
+and the start of its code. Vectors are cached by a hash of that text, so a
+refresh only embeds symbols whose text changed; identical symbols share one
+vector. The cache is one matrix, stored as float16 or as int8 with a scale
+per vector (quantized and scored like the vector store's segments), and kept
+next to the index database between runs.
+
+Refreshes run on a background thread. Vectors are published in chunks as
+they are embedded, so searches are answered from whatever has been embedded
+so far while a large workspace is still being processed.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .embeddings import (MODEL_NAME, EmbeddingUnavailable, TextEncoder,
+                         default_encoder, embedding_service, text_key)
+from .vectorstore import _score, quantize
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPES = ('float16', 'int8')
+
+
+class _SemanticState(NamedTuple):
+    """Vectors and the symbols they cover, replaced as a whole when published"""
+    generation: int
+    keys: Dict[bytes, int]      # Text hash -> vector row
+    vectors: Any                # (n, dimension) float16 or int8
+    scales: Any                 # (n,) float32 for int8 vectors, else None
+    symbol_ids: Any             # Symbols with a vector
+    symbol_rows: Any            # Vector row of each symbol
+    symbol_types: Any
+    languages: Any
+
+
+def _symbol_text(name: str, symbol_type: str, signature: str, docstring: str, parent: str, code: str) -> str:
+    qualified = f"{parent}.{name}" if parent else name
+    if signature and signature.startswith(name):
+        # Python signatures start with the name: qualify it in place
+        declaration = f"{symbol_type} {parent + '.' if parent else ''}{signature}"
+    elif signature:
+        # JavaScript signatures are the declaration itself, e.g. "export function f(x)"
+        declaration = f"{qualified}: {signature}" if parent else signature
+    else:
+        declaration = f"{symbol_type} {qualified}"
+    parts = [declaration]
+    if docstring:
+        parts.append(docstring)
+    if code:
+        parts.append(code)
+    return '\n'.join(parts)
+
+
+class SemanticIndex:
+    """Embedding index over the symbols of a CodebaseIndexer"""
+
+    def __init__(self, indexer, encoder: Optional[TextEncoder] = None, cache_dir: Optional[str] = None,
+                 dtype: str = 'int8', chunk_size: int = 512, code_chars: int = 400,
+                 retry_interval: float = 60.0):
+        """
+        Args:
+            indexer: The CodebaseIndexer whose symbols are embedded
+            encoder: Embeds texts (defaults to the process-wide encoder of the bundled model)
+            cache_dir: Where vectors are kept between runs (defaults to <index db>_semantic)
+            dtype: "int8" (with a float32 scale per vector) or "float16"; int8 takes
+                   half the memory and scores several times faster
+            chunk_size: Symbols embedded before the new vectors are published
+            code_chars: Characters of a symbol's code included in its text
+            retry_interval: Seconds before loading a model that was unavailable is tried again
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"dtype must be one of {', '.join(VECTOR_DTYPES)}")
+        self.indexer = indexer
+        self.encoder = encoder
+        self.cache_dir = cache_dir or os.path.splitext(os.path.abspath(indexer.db_path))[0] + '_semantic'
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.code_chars = code_chars
+        self.pending = 0
+        self.error: Optional[str] = None
+        self.retry_interval = retry_interval
+        self.unavailable = False
+        self._unavailable_at = 0.0
+        self.last_refresh: Optional[Dict[str, Any]] = None
+        self._state: Optional[_SemanticState] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _get_encoder(self) -> TextEncoder:
+        if self.encoder is None:
+            self.encoder = default_encoder()
+        return self.encoder
+
+    # Quantization
+
+    def _quantize(self, vectors: 'np.ndarray'):
+        """float32 vectors -> (stored vectors, scales or None)"""
+        if self.dtype == 'float16':
+            return vectors.astype(np.float16), None
+        return quantize(vectors)
+
+    def _empty_state(self) -> _SemanticState:
+        dimension = self._get_encoder().dimension
+        empty_ids = np.zeros(0, dtype=np.int64)
+        return _SemanticState(
+            generation=-1, keys={},
+            vectors=np.zeros((0, dimension), dtype=np.float16 if self.dtype == 'float16' else np.int8),
+            scales=np.zeros(0, dtype=np.float32) if self.dtype == 'int8' else None,
+            symbol_ids=empty_ids, symbol_rows=np.zeros(0, dtype=np.int32),
+            symbol_types=np.zeros(0, dtype=object), languages=np.zeros(0, dtype=object),
+        )
+
+    # Persistence
+
+    def _load_cache(self) -> _SemanticState:
+        """Vectors saved by an earlier run, if they match this model and dtype"""
+        state = self._empty_state()
+        try:
+            with open(os.path.join(self.cache_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get('model'), meta.get('dtype'), meta.get('dimension')) != (
+                    MODEL_NAME, self.dtype, state.vectors.shape[1]):
+                return state
+            keys = np.load(os.path.join(self.cache_dir, 'keys.npy'))
+            vectors = np.load(os.path.join(self.cache_dir, 'vectors.npy'))
+            scales = np.load(os.path.join(self.cache_dir, 'scales.npy')) if self.dtype == 'int8' else None
+        except FileNotFoundError:
+            return state
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable semantic vector cache: {e}")
+            return state
+        if len(keys) != len(vectors):
+            return state
+        logger.info(f"Loaded {len(keys)} cached symbol vectors")
+        return state._replace(keys={key.tobytes(): row for row, key in enumerate(keys)},
+                              vectors=vectors, scales=scales)
+
+    def _save_cache(self, state: _SemanticState):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = np.zeros(len(state.keys), dtype='V16')
+        for key, row in state.keys.items():
+            keys[row] = np.frombuffer(key, dtype='V16')[0]
+        arrays = {'keys.npy': keys, 'vectors.npy': np.asarray(state.vectors)}
+        if state.scales is not None:
+            arrays['scales.npy'] = state.scales
+        try:
+            # Each file is replaced atomically; meta.json goes last, as readers check it first
+            for name, array in arrays.items():
+                tmp_path = os.path.join(self.cache_dir, f'.{name}.tmp')
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+                os.replace(tmp_path, os.path.join(self.cache_dir, name))
+            meta = {'model': MODEL_NAME, 'dtype': self.dtype, 'dimension': int(state.vectors.shape[1])}
+            with open(os.path.join(self.cache_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+        except OSError as e:
+            logger.error(f"Error saving semantic vector cache: {e}")
+
+    # Refresh
+
+    def _load_symbols(self) -> List[tuple]:
+        """(symbol id, type, language, text) of every symbol in the index"""
+        with self.indexer.read_pool.connection() as conn:
+            rows = conn.execute('''
+            SELECT s.id, s.name, s.type, s.signature, s.docstring, s.parent, s.byte_start, s.byte_end,
+                   f.path, f.content_hash, f.language
+            FROM symbols s JOIN files f ON s.file_id = f.id
+            ORDER BY s.file_id, s.id
+            ''').fetchall()
+
+        symbols = []
+        data, data_path = None, None
+        for (symbol_id, name, symbol_type, signature, docstring, parent, byte_start, byte_end,
+             path, content_hash, language) in rows:
+            code = ''
+            if self.code_chars and byte_start is not None:
+                if path != data_path:
+                    data, data_path = self.indexer._load_source(path, content_hash), path
+                if data is not None:
+                    code = data[byte_start:min(byte_end, byte_start + self.code_chars * 4)].decode(
+                        'utf-8', errors='replace')[:self.code_chars]
+            text = _symbol_text(name, symbol_type, signature, docstring, parent, code)
+            symbols.append((symbol_id, symbol_type, language, text))
+        return symbols
+
+    def _publish(self, generation: int, keys: Dict[bytes, int], vectors, scales, symbols: List[tuple],
+                 symbol_keys: List[bytes]):
+        covered = [i for i, key in enumerate(symbol_keys) if key in keys]
+        self._state = _SemanticState(
+            generation=generation, keys=keys, vectors=vectors, scales=scales,
+            symbol_ids=np.array([symbols[i][0] for i in covered], dtype=np.int64),
+            symbol_rows=np.array([keys[symbol_keys[i]] for i in covered], dtype=np.int32),
+            symbol_types=np.array([symbols[i][1] for i in covered], dtype=object),
+            languages=np.array([symbols[i][2] for i in covered], dtype=object),
+        )
+
+    def _refresh(self):
+        """Background refresh: embed the symbols whose text isn't cached yet"""
+        try:
+            encoder = self._get_encoder()
+            while not self._stop.is_set():
+                generation = self.indexer.index_generation
+                state = self._state if self._state is not None else self._load_cache()
+                if state.generation == generation:
+                    break
+                started = time.time()
+                symbols = self._load_symbols()
+                symbol_keys = [text_key(text) for _, _, _, text in symbols]
+
+                # Vectors of symbols that no longer exist are dropped
+                live = dict.fromkeys(symbol_keys)
+                kept = [key for key in live if key in state.keys]
+                texts = {}
+                for key, (_, _, _, text) in zip(symbol_keys, symbols):
+                    if key not in state.keys:
+                        texts.setdefault(key, text)
+                missing = list(texts.items())
+
+                # Filled in place; published views never overlap the rows still being written
+                vectors = np.empty((len(kept) + len(missing), state.vectors.shape[1]), dtype=state.vectors.dtype)
+                rows = np.array([state.keys[key] for key in kept], dtype=np.int64)
+                vectors[:len(kept)] = np.asarray(state.vectors)[rows]
+                scales = None
+                if state.scales is not None:
+                    scales = np.empty(len(vectors), dtype=np.float32)
+                    scales[:len(kept)] = state.scales[rows]
+                keys = {key: row for row, key in enumerate(kept)}
+                filled = len(kept)
+                self.pending = len(missing)
+                self._publish(generation if not missing else state.generation, dict(keys), vectors[:filled],
+                              scales[:filled] if scales is not None else None, symbols, symbol_keys)
+
+                for start in range(0, len(missing), self.chunk_size):
+                    if self._stop.is_set():
+                        return
+                    chunk = missing[start:start + self.chunk_size]
+                    encoded, encoded_scales = self._quantize(encoder.encode([text for _, text in chunk]))
+                    vectors[filled:filled + len(chunk)] = encoded
+                    if scales is not None:
+                        scales[filled:filled + len(chunk)] = encoded_scales
+                    for key, _ in chunk:
+                        keys[key] = filled
+                        filled += 1
+                    self.pending = len(missing) - start - len(chunk)
+                    self._publish(generation if not self.pending else state.generation, dict(keys),
+                                  vectors[:filled], scales[:filled] if scales is not None else None,
+                                  symbols, symbol_keys)
+
+                self._save_cache(self._state)
+                self.last_refresh = {
+                    "symbols": len(symbols), "embedded": len(missing), "cached": len(kept),
+                    "seconds": round(time.time() - started, 3),
+                }
+                logger.info(f"Semantic index refreshed: {len(missing)} of {len(symbols)} symbols embedded "
+                            f"in {time.time() - started:.2f} seconds")
+            self.error = None
+        except EmbeddingUnavailable as e:
+            self._set_unavailable(str(e))
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error refreshing semantic index: {e}")
+        finally:
+            self.pending = 0
+
+    def _set_unavailable(self, error: str):
+        """Record that the model can't be loaded; refresh tries again after retry_interval"""
+        if not self.unavailable:
+            logger.warning(f"Semantic search unavailable: {error}")
+        self.error = error
+        self.unavailable = True
+        self._unavailable_at = time.time()
+
+    def refresh(self, wait: bool = False) -> bool:
+        """
+        Bring the vectors up to date with the index, on a background thread
+
+        Args:
+            wait: Block until the refresh is done
+
+        Returns:
+            True if the vectors cover the current index
+        """
+        if np is None:
+            self._set_unavailable("numpy is not installed")
+            return False
+        if self.unavailable:
+            # The model may have been installed since; try it again now and then
+            if time.time() - self._unavailable_at < self.retry_interval:
+                return False
+            self.unavailable = False
+        with self._lock:
+            state = self._state
+            current = state is not None and state.generation == self.indexer.index_generation
+            if state is None and self._thread is None:
+                # Load the model here, so a missing one fails the call that needs it
+                try:
+                    self._get_encoder().encode([])
+                except EmbeddingUnavailable as e:
+                    self._set_unavailable(str(e))
+                    return False
+            if not current and not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._refresh, name="semantic-index", daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if wait and not current and thread:
+            thread.join()
+            state = self._state
+            current = state is not None and state.generation == self.indexer.index_generation
+        return current
+
+    # Queries
+
+    def search(self, query: str, limit: int = 20, symbol_type: Optional[str] = None,
+               language: Optional[str] = None, wait: bool = False) -> List[Dict[str, Any]]:
+        """
+        Find the symbols closest in meaning to a query
+
+        Starts a refresh if the index changed; until it is done, results come
+        from the symbols embedded so far.
+
+        Args:
+            query: Natural language or code
+            limit: Maximum number of results
+            symbol_type: Only symbols of this type
+            language: Only symbols in files of this language
+            wait: Wait for a pending refresh instead of searching what is embedded so far
+
+        Returns:
+            Symbols with their cosine similarity to the query as "score", best first
+
+        Raises:
+            EmbeddingUnavailable: If the model can't be loaded
+        """
+        self.refresh(wait=wait)
+        if self.unavailable:
+            raise EmbeddingUnavailable(self.error)
+        state = self._state
+        if state is None or not len(state.symbol_ids) or limit <= 0:
+            return []
+
+        encoder = self._get_encoder()
+        if encoder is default_encoder():
+            # Queries share the batching and cache of the process-wide service
+            encoder = embedding_service()
+        q = encoder.encode([query])[0].astype(np.float32)
+        scores = _score(state.vectors, state.scales, q)[state.symbol_rows]
+
+        candidates = np.arange(len(scores))
+        if symbol_type:
+            candidates = candidates[state.symbol_types[candidates] == symbol_type]
+        if language:
+            candidates = candidates[state.languages[candidates] == language]
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        ranked = [(int(state.symbol_ids[i]), float(scores[i])) for i in candidates]
+        with self.indexer.read_pool.connection() as conn:
+            placeholders = ', '.join('?' * len(ranked))
+            rows = conn.execute(f'''
+            SELECT s.id, s.name, s.type, f.path, f.language, s.line_start, s.line_end, s.signature, s.parent
+            FROM symbols s JOIN files f ON s.file_id = f.id
+            WHERE s.id IN ({placeholders})
+            ''', [symbol_id for symbol_id, _ in ranked]).fetchall()
+        columns = ('id', 'name', 'type', 'path', 'language', 'line_start', 'line_end', 'signature', 'parent')
+        found = {row[0]: dict(zip(columns, row)) for row in rows}
+        results = []
+        # Symbols removed since the vectors were published are skipped
+        for symbol_id, score in ranked:
+            if symbol_id in found:
+                result = found[symbol_id]
+                result["score"] = round(score, 4)
+                results.append(result)
+        return results
+
+    def status(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "ready": state is not None and state.generation == self.indexer.index_generation,
+            "refreshing": bool(self._thread and self._thread.is_alive()),
+            "vectors": len(state.keys) if state else 0,
+            "symbols": len(state.symbol_ids) if state else 0,
+            "pending": self.pending,
+            "dtype": self.dtype,
+            "backend": self.encoder.backend if self.encoder else None,
+            "error": self.error,
+            "last_refresh": self.last_refresh,
+        }
+
+    def close(self):
+        """Stop a running refresh"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
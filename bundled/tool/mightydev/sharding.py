@@ -0,0 +1,710 @@
+"""
+Sharded codebase index for monorepos.
+
+ShardedIndexer keeps one CodebaseIndexer, with its own SQLite database, per
+top-level package of the workspace, plus a root shard for everything outside
+the packages. Packages are discovered from the directory layout: each
+subdirectory of a conventional container directory (packages/, apps/,
+libs/, ...) and each top-level directory with a package manifest is a shard.
+
+Shards index in parallel, each with its own writer, so no single database
+becomes the write hotspot. Queries are routed: file-scoped ones go to the
+shard owning the file, while search_symbols, find_references, fuzzy_search
+and get_dependents fan out to every shard concurrently and the ranked
+results are merged. Paths in and out are relative to the workspace root.
+
+Import graphs are per shard: transitive queries don't follow imports across
+packages. Ignore files apply as in a single index: those of the workspace
+root and of the directories above a package apply inside it too.
+"""
+
+import base64
+import fnmatch
+import heapq
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional,
+                    Tuple)
+
+from .embeddings import EmbeddingUnavailable
+from .indexer import CodebaseIndexer, ResultPage, _encode_cursor
+from .jobs import IndexJobRunner
+from .scanner import IGNORE_FILES
+from .snapshot import SnapshotReader, SnapshotWriter
+from .watcher import create_watcher
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Files that make a top-level directory a package of its own
+PACKAGE_MARKERS = (
+    'package.json', 'pyproject.toml', 'setup.py', 'setup.cfg', 'Cargo.toml', 'go.mod',
+    'pom.xml', 'build.gradle', 'build.gradle.kts', '__init__.py',
+)
+
+# Top-level directories whose subdirectories are packages
+PACKAGE_CONTAINERS = ('packages', 'apps', 'libs', 'services', 'modules', 'plugins', 'crates')
+
+ROOT_SHARD = '_root'
+
+# Literal head of a path glob, up to its first wildcard
+_GLOB_HEAD = re.compile(r'[^*?\[]*')
+
+
+class Shard(NamedTuple):
+    """One package of the workspace and its index"""
+    name: str
+    prefix: str  # Directory relative to the workspace root, '' for the root shard
+    indexer: CodebaseIndexer
+
+
+def discover_packages(workspace_root: str, should_scan_dir: Callable[[str], bool]) -> List[str]:
+    """
+    Find the top-level packages of a monorepo
+
+    Args:
+        workspace_root: Root directory of the workspace
+        should_scan_dir: Returns False for directory names to skip (e.g. node_modules)
+
+    Returns:
+        Sorted package directories relative to the workspace root
+    """
+    def subdirectories(path: str) -> List[os.DirEntry]:
+        try:
+            with os.scandir(path) as it:
+                return [entry for entry in it
+                        if entry.is_dir() and not entry.is_symlink() and should_scan_dir(entry.name)]
+        except OSError:
+            return []
+
+    packages = []
+    for entry in subdirectories(workspace_root):
+        if entry.name in PACKAGE_CONTAINERS:
+            packages.extend(os.path.join(entry.name, sub.name) for sub in subdirectories(entry.path))
+        elif any(os.path.exists(os.path.join(entry.path, marker)) for marker in PACKAGE_MARKERS):
+            packages.append(entry.name)
+    return sorted(packages)
+
+
+def _should_scan_dir(name: str) -> bool:
+    """Whether a directory name can hold part of the workspace, as CodebaseIndexer sees it"""
+    return name not in CodebaseIndexer.IGNORED_DIRS and not name.startswith('.')
+
+
+def _encode_shard_cursor(cursors: Dict[str, Optional[str]]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(cursors, sort_keys=True).encode('utf-8')).decode('ascii')
+
+
+def _decode_shard_cursor(cursor: str) -> Dict[str, Optional[str]]:
+    try:
+        cursors = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from None
+    if not isinstance(cursors, dict):
+        raise ValueError("Invalid cursor")
+    return cursors
+
+
+class ShardedIndexer(IndexJobRunner):
+    """
+    Index of a monorepo split into one CodebaseIndexer per package
+
+    Offers the query, indexing, job and watching interface of CodebaseIndexer.
+    """
+
+    def __init__(self, workspace_root: str, db_dir: Optional[str] = None, parse_mode: str = 'thread',
+                 packages: Optional[Iterable[str]] = None, max_workers: Optional[int] = None):
+        """
+        Args:
+            workspace_root: Root directory of the workspace
+            db_dir: Directory of the shard databases (defaults to .tribe/shards)
+            parse_mode: "thread" or "process", see CodebaseIndexer
+            packages: Package directories relative to the root (discovered if omitted)
+            max_workers: Shards queried or indexed at the same time (default: one per shard
+                         for queries, one per core for indexing)
+        """
+        self.workspace_root = workspace_root
+        if db_dir is None:
+            db_dir = os.path.join(workspace_root, '.tribe', 'shards')
+        os.makedirs(db_dir, exist_ok=True)
+        self.db_dir = db_dir
+        self.index_lock = threading.Lock()
+        self.indexing_in_progress = False
+        self.progress_rate = 4.0  # Progress callbacks per second at most during indexing
+        self.watcher = None
+
+        if packages is None:
+            packages = discover_packages(workspace_root, _should_scan_dir)
+        packages = [os.path.normpath(package) for package in packages]
+        # The root shard keeps only what is outside the packages
+        root = CodebaseIndexer(workspace_root, db_path=self._db_path(ROOT_SHARD), parse_mode=parse_mode,
+                               excluded_dirs=packages)
+
+        self.shards: List[Shard] = [Shard(ROOT_SHARD, '', root)]
+        for package in packages:
+            name = re.sub(r'[^A-Za-z0-9_.-]', '_', package)
+            # Ignore files of the workspace root and of the directories above the package apply
+            indexer = CodebaseIndexer(os.path.join(workspace_root, package), db_path=self._db_path(name),
+                                      parse_mode=parse_mode, ignore_root=workspace_root)
+            self.shards.append(Shard(name, package, indexer))
+        # Longest prefix first, so nested packages win over their containers
+        self._by_prefix = sorted(self.shards[1:], key=lambda shard: len(shard.prefix), reverse=True)
+
+        self.index_workers = max_workers or max(1, min(len(self.shards), os.cpu_count() or 1))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.shards),
+                                            thread_name_prefix='codebase-shard')
+        self._init_jobs()
+        logger.info(f"Sharded index of {workspace_root}: {len(self.shards)} shards")
+
+    def _db_path(self, name: str) -> str:
+        return os.path.join(self.db_dir, f'{name}.db')
+
+    # Routing
+
+    def _route(self, path: str) -> Tuple[Shard, str]:
+        """
+        Find the shard owning a path
+
+        Args:
+            path: Absolute path or path relative to the workspace root
+
+        Returns:
+            (shard, path relative to the shard's root)
+        """
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.workspace_root)
+        path = os.path.normpath(path)
+        for shard in self._by_prefix:
+            if path.startswith(shard.prefix + os.sep):
+                return shard, path[len(shard.prefix) + 1:]
+        return self.shards[0], path
+
+    @staticmethod
+    def _to_workspace(shard: Shard, path: str) -> str:
+        """Path relative to the shard's root -> path relative to the workspace root"""
+        return os.path.join(shard.prefix, path) if shard.prefix else path
+
+    def _prefix_paths(self, shard: Shard, rows: List[Dict[str, Any]], field: str = 'path'):
+        if shard.prefix:
+            for row in rows:
+                if row.get(field) is not None:
+                    row[field] = os.path.join(shard.prefix, row[field])
+
+    def _shard_glob(self, shard: Shard, path_glob: Optional[str]) -> Tuple[bool, Optional[str], bool]:
+        """
+        Translate a workspace path glob for a shard
+
+        A glob whose literal head covers the shard's prefix is rewritten relative
+        to the shard. One that only diverges from the prefix inside a wildcard
+        (packages/**, */a/*, p*/b/*) can't be rewritten: the shard is searched
+        unfiltered and its workspace paths are matched against the glob instead.
+
+        Returns:
+            (whether the shard can match, the glob relative to the shard,
+            whether to match workspace paths against path_glob instead)
+        """
+        if not path_glob or not shard.prefix:
+            return True, path_glob, False
+        prefix = shard.prefix + os.sep
+        head = _GLOB_HEAD.match(path_glob).group()
+        if head.startswith(prefix):
+            return True, path_glob[len(prefix):], False
+        if prefix.startswith(head):
+            return True, None, True
+        return False, None, False
+
+    def _filter_page(self, shard: Shard, fetch: Callable[[Optional[List[str]], Optional[str]], ResultPage],
+                     path_glob: str, fields: Optional[List[str]], cursor: Optional[str],
+                     limit: Optional[int]) -> ResultPage:
+        """
+        Page of a shard query filtered by a workspace path glob
+
+        The shard is queried a page at a time and rows whose workspace path
+        matches the glob (with SQLite GLOB semantics, case-sensitive and '*'
+        crossing directories) are kept until a page is full.
+
+        Args:
+            shard: Shard to query
+            fetch: Runs the unfiltered query with a projection and a cursor
+            path_glob: Glob relative to the workspace root
+            fields: Projection requested by the caller
+            cursor: Shard cursor to start from
+            limit: Page size, or None for everything
+        """
+        extra_path = bool(fields) and 'path' not in fields
+        page_fields = list(fields) + ['path'] if extra_path else fields
+        result = ResultPage()
+        while True:
+            page = fetch(page_fields, cursor)
+            self._prefix_paths(shard, page)
+            for row, keys in zip(page, page.sort_keys):
+                if not fnmatch.fnmatchcase(row['path'], path_glob):
+                    continue
+                if extra_path:
+                    del row['path']
+                result.append(row)
+                result.sort_keys.append(keys)
+                if limit is not None and len(result) == limit:
+                    result.next_cursor = _encode_cursor(keys)
+                    return result
+            cursor = page.next_cursor
+            if not cursor:
+                return result
+
+    def _fan_out(self, call: Callable[[Shard], Any], shards: Optional[List[Shard]] = None) -> List[Tuple[Shard, Any]]:
+        """Run a query on shards concurrently; a failing shard contributes nothing"""
+        shards = self.shards if shards is None else shards
+        futures = [(shard, self._executor.submit(call, shard)) for shard in shards]
+        results = []
+        for shard, future in futures:
+            try:
+                results.append((shard, future.result()))
+            except (ValueError, EmbeddingUnavailable):
+                raise
+            except Exception as e:
+                logger.error(f"Error querying shard {shard.name}: {e}")
+        return results
+
+    def _merge_pages(self, pages: List[Tuple[Shard, ResultPage]], cursors: Dict[str, Optional[str]],
+                     limit: Optional[int], sort_key: Callable[[Shard, Tuple], Tuple]) -> ResultPage:
+        """
+        Merge ranked pages from several shards into one page
+
+        Each shard's next cursor in the merged cursor is the position of the last
+        row taken from it, so rows that didn't make the page come back next time.
+
+        Args:
+            pages: (shard, page) for every shard queried
+            cursors: Cursor each shard was queried with
+            limit: Page size, or None for everything
+            sort_key: Global ordering key of a row from its shard and its sort_keys entry
+        """
+        streams = []
+        for order, (shard, page) in enumerate(pages):
+            streams.append([(sort_key(shard, keys), order, i) for i, keys in enumerate(page.sort_keys)])
+
+        merged = ResultPage()
+        taken = [0] * len(pages)
+        for _, order, i in heapq.merge(*streams):
+            if limit is not None and len(merged) == limit:
+                break
+            shard, page = pages[order]
+            merged.append(page[i])
+            merged.sort_keys.append(page.sort_keys[i])
+            taken[order] = i + 1
+
+        next_cursors = {}
+        for order, (shard, page) in enumerate(pages):
+            if taken[order] < len(page):
+                # Rows were left over: continue after the last one taken
+                next_cursors[shard.name] = (_encode_cursor(page.sort_keys[taken[order] - 1])
+                                            if taken[order] else cursors.get(shard.name))
+            elif page.next_cursor:
+                next_cursors[shard.name] = page.next_cursor
+        if next_cursors:
+            merged.next_cursor = _encode_shard_cursor(next_cursors)
+        return merged
+
+    def _start_cursors(self, cursor: Optional[str]) -> Dict[str, Optional[str]]:
+        """Per-shard cursors of a query; shards missing from a cursor are exhausted"""
+        if cursor:
+            return _decode_shard_cursor(cursor)
+        return {shard.name: None for shard in self.shards}
+
+    # Queries
+
+    def search_symbols(self, query: str, symbol_type: Optional[str] = None,
+                       language: Optional[str] = None, limit: int = 100,
+                       path_glob: Optional[str] = None, fields: Optional[List[str]] = None,
+                       cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Search for symbols in every shard, see CodebaseIndexer.search_symbols
+
+        Results are merged by each shard's ranking key (exact name match, then
+        BM25 relevance); BM25 scores come from each shard's own statistics.
+        """
+        cursors = self._start_cursors(cursor)
+
+        def search(shard: Shard) -> ResultPage:
+            matches, glob, filtered = self._shard_glob(shard, path_glob)
+            if not matches:
+                return ResultPage()
+            if filtered:
+                return self._filter_page(
+                    shard,
+                    lambda page_fields, page_cursor: shard.indexer.search_symbols(
+                        query, symbol_type, language, limit, None, page_fields, page_cursor),
+                    path_glob, fields, cursors[shard.name], limit)
+            page = shard.indexer.search_symbols(query, symbol_type, language, limit, glob, fields,
+                                                cursors[shard.name])
+            self._prefix_paths(shard, page)
+            return page
+
+        shards = [shard for shard in self.shards if shard.name in cursors]
+        pages = self._fan_out(search, shards)
+        # The last key is the shard-local symbol id; ties go to the earlier shard
+        return self._merge_pages(pages, cursors, limit, lambda shard, keys: tuple(keys[:-1]))
+
+    def find_references(self, symbol_name: str, file_path: Optional[str] = None,
+                        limit: int = 1000, fields: Optional[List[str]] = None,
+                        cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Find references in every shard (or the file's shard), see CodebaseIndexer.find_references"""
+        if file_path:
+            shard, rel_path = self._route(file_path)
+            page = shard.indexer.find_references(symbol_name, rel_path, limit, fields, cursor)
+            self._prefix_paths(shard, page)
+            return page
+
+        cursors = self._start_cursors(cursor)
+
+        def find(shard: Shard) -> ResultPage:
+            page = shard.indexer.find_references(symbol_name, None, limit, fields, cursors[shard.name])
+            self._prefix_paths(shard, page)
+            return page
+
+        shards = [shard for shard in self.shards if shard.name in cursors]
+        pages = self._fan_out(find, shards)
+        # Shards order by their own relative path; the workspace path orders them globally
+        return self._merge_pages(pages, cursors, limit,
+                                 lambda shard, keys: (self._to_workspace(shard, keys[0]),) + tuple(keys[1:]))
+
+    def fuzzy_search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Fuzzy symbol search in every shard, best score first"""
+        def search(shard: Shard) -> List[Dict[str, Any]]:
+            results = shard.indexer.fuzzy_search(query, limit)
+            self._prefix_paths(shard, results)
+            return results
+
+        results = [result for _, shard_results in self._fan_out(search) for result in shard_results]
+        results.sort(key=lambda result: -result.get("score", 0))
+        return results[:limit]
+
+    def semantic_search(self, query: str, limit: int = 20, symbol_type: Optional[str] = None,
+                        language: Optional[str] = None, wait: bool = False) -> List[Dict[str, Any]]:
+        """Semantic search in every shard, best score first, see CodebaseIndexer.semantic_search"""
+        def search(shard: Shard) -> List[Dict[str, Any]]:
+            results = shard.indexer.semantic_search(query, limit, symbol_type, language, wait)
+            self._prefix_paths(shard, results)
+            return results
+
+        results = [result for _, shard_results in self._fan_out(search) for result in shard_results]
+        results.sort(key=lambda result: -result["score"])
+        return results[:limit]
+
+    def get_semantic_status(self) -> Dict[str, Any]:
+        shards = {shard.name: shard.indexer.get_semantic_status() for shard in self.shards}
+        return {
+            "ready": all(status["ready"] for status in shards.values()),
+            "refreshing": any(status["refreshing"] for status in shards.values()),
+            "vectors": sum(status["vectors"] for status in shards.values()),
+            "symbols": sum(status["symbols"] for status in shards.values()),
+            "pending": sum(status["pending"] for status in shards.values()),
+            "shards": shards,
+        }
+
+    def get_file_symbols(self, file_path: str, fields: Optional[List[str]] = None,
+                         limit: Optional[int] = None, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        shard, rel_path = self._route(file_path)
+        page = shard.indexer.get_file_symbols(rel_path, fields, limit, cursor)
+        self._prefix_paths(shard, page)
+        return page
+
+    def get_symbol_by_location(self, file_path: str, line: int) -> Optional[Dict[str, Any]]:
+        shard, rel_path = self._route(file_path)
+        symbol = shard.indexer.get_symbol_by_location(rel_path, line)
+        if symbol:
+            self._prefix_paths(shard, [symbol])
+        return symbol
+
+    def get_dependencies(self, file_path: str) -> List[str]:
+        shard, rel_path = self._route(file_path)
+        return shard.indexer.get_dependencies(rel_path)
+
+    def get_dependents(self, module_name: str) -> List[str]:
+        """Files in any shard that import a module (a path is resolved in its own shard)"""
+        owner, rel_path = self._route(module_name) if os.sep in module_name else (None, module_name)
+
+        def dependents(shard: Shard) -> List[str]:
+            name = rel_path if shard is owner else module_name
+            return [self._to_workspace(shard, path) for path in shard.indexer.get_dependents(name)]
+
+        return sorted({path for _, paths in self._fan_out(dependents) for path in paths})
+
+    def transitive_dependencies(self, file_path: str) -> List[str]:
+        shard, rel_path = self._route(file_path)
+        return [self._to_workspace(shard, path) for path in shard.indexer.transitive_dependencies(rel_path)]
+
+    def transitive_dependents(self, file_path: str) -> List[str]:
+        shard, rel_path = self._route(file_path)
+        return [self._to_workspace(shard, path) for path in shard.indexer.transitive_dependents(rel_path)]
+
+    # Indexing
+
+    def estimate_files(self, max_file_size: int = 1024 * 1024) -> int:
+        return sum(count for _, count in self._fan_out(lambda shard: shard.indexer.estimate_files(max_file_size)))
+
+    def index_workspace(self, force: bool = False, max_file_size: int = 1024 * 1024, progress_callback=None,
+                        parse_mode: Optional[str] = None, cancel_event: Optional[threading.Event] = None,
+                        resume_since: Optional[float] = None, claimed: bool = False) -> bool:
+        """
+        Index every shard, several at a time, see CodebaseIndexer.index_workspace
+
+        Progress is summed over the shards and reported at most progress_rate
+        times a second.
+        """
+        with self.index_lock:
+            if self.indexing_in_progress and not claimed:
+                logger.warning("Indexing already in progress, skipping")
+                return False
+            self.indexing_in_progress = True
+
+        progress: Dict[str, Tuple[int, int]] = {}
+        progress_lock = threading.Lock()
+        interval = 1.0 / self.progress_rate if self.progress_rate else 0.0
+        last_report = [0.0]
+
+        def shard_progress(shard: Shard):
+            def report(processed_files: int, total_files: int, current_file: Optional[str] = None):
+                if not progress_callback:
+                    return
+                with progress_lock:
+                    progress[shard.name] = (processed_files, total_files)
+                    now = time.monotonic()
+                    if now - last_report[0] < interval:
+                        return
+                    last_report[0] = now
+                    processed = sum(p for p, _ in progress.values())
+                    total = sum(t for _, t in progress.values())
+                # A shard's last report is a status message rather than a file
+                current = (self._to_workspace(shard, current_file)
+                           if current_file and processed_files < total_files else shard.prefix or shard.name)
+                progress_callback(processed, total, current)
+            return report
+
+        def index(shard: Shard) -> bool:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            return shard.indexer.index_workspace(force=force, max_file_size=max_file_size,
+                                                 progress_callback=shard_progress(shard),
+                                                 parse_mode=parse_mode, cancel_event=cancel_event,
+                                                 resume_since=resume_since)
+
+        start_time = time.time()
+        try:
+            if progress_callback:
+                progress_callback(0, 0, "")
+            with ThreadPoolExecutor(max_workers=self.index_workers,
+                                    thread_name_prefix='codebase-shard-index') as executor:
+                results = list(executor.map(index, self.shards))
+            success = all(results)
+
+            processed = sum(p for p, _ in progress.values())
+            total = sum(t for _, t in progress.values())
+            if progress_callback:
+                if cancel_event is not None and cancel_event.is_set():
+                    progress_callback(processed, total, "Indexing cancelled")
+                elif success:
+                    progress_callback(total, total, "Indexing completed successfully!")
+            logger.info(f"Indexed {len(self.shards)} shards in {time.time() - start_time:.2f} seconds")
+            return success
+        finally:
+            self.indexing_in_progress = False
+
+    def reindex_paths(self, changed: Iterable[str], removed: Iterable[str] = (),
+                      max_file_size: int = 1024 * 1024) -> bool:
+        """Update changed and removed files in the shards that own them"""
+        groups: Dict[str, Tuple[Shard, List[str], List[str]]] = {}
+        for paths, slot in ((changed, 1), (removed, 2)):
+            for path in paths:
+                if path == '.':
+                    # The watcher lost events: every shard needs a full pass
+                    for shard in self.shards:
+                        groups.setdefault(shard.name, (shard, [], []))[1].append('.')
+                    continue
+                shard, rel_path = self._route(path)
+                groups.setdefault(shard.name, (shard, [], []))[slot].append(rel_path)
+                if os.path.basename(path) in IGNORE_FILES:
+                    # Ignore files also apply to the packages below them
+                    directory = os.path.dirname(os.path.normpath(path))
+                    for other in self.shards[1:]:
+                        if other is not shard and (not directory or other.prefix.startswith(directory + os.sep)):
+                            groups.setdefault(other.name, (other, [], []))[1].append('.')
+        results = [shard.indexer.reindex_paths(shard_changed, shard_removed, max_file_size)
+                   for shard, shard_changed, shard_removed in groups.values()]
+        return all(results)
+
+    def prioritize_files(self, paths: Iterable[str], reindex: bool = True) -> Dict[str, int]:
+        """Index files the user is working on first, in the shards that own them"""
+        groups: Dict[str, Tuple[Shard, List[str]]] = {}
+        for path in paths:
+            shard, rel_path = self._route(path)
+            groups.setdefault(shard.name, (shard, []))[1].append(rel_path)
+        totals: Dict[str, int] = {"hot": 0, "promoted": 0, "reindexed": 0}
+        for shard, shard_paths in groups.values():
+            for key, count in shard.indexer.prioritize_files(shard_paths, reindex).items():
+                totals[key] = totals.get(key, 0) + count
+        return totals
+
+    def start_watching(self, debounce: float = 0.2) -> bool:
+        """Watch the whole workspace once and reindex changes in the shards that own them"""
+        if self.watcher and self.watcher.running:
+            return True
+        try:
+            self.watcher = create_watcher(
+                self.workspace_root,
+                lambda changed, removed: self.reindex_paths(changed, removed),
+                self.shards[0].indexer._should_watch_dir,
+                debounce=debounce
+            )
+            self.watcher.start()
+            return True
+        except Exception as e:
+            logger.error(f"Error starting file watcher: {e}")
+            self.watcher = None
+            return False
+
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def _load_job_checkpoint(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.db_dir, 'index_job.json'), 'r', encoding='utf-8') as f:
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error(f"Error reading indexing job checkpoint: {e}")
+            return None
+
+    def _set_job_checkpoint(self, value: Optional[str]):
+        path = os.path.join(self.db_dir, 'index_job.json')
+        try:
+            if value is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            # Replace atomically so a crash never leaves half a record
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.error(f"Error saving indexing job checkpoint: {e}")
+
+    def default_snapshot_path(self) -> str:
+        return os.path.join(self.workspace_root, '.tribe', 'codebase_index.snapshot')
+
+    def export_snapshot(self, path: Optional[str] = None, compress: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Write one snapshot of every shard, see CodebaseIndexer.export_snapshot
+
+        Paths in the snapshot are relative to the workspace root, so it can be
+        imported into a sharded or a single index alike.
+        """
+        path = path or self.default_snapshot_path()
+        try:
+            writer = SnapshotWriter(path)
+            try:
+                for shard in self.shards:
+                    with shard.indexer.read_pool.connection() as conn:
+                        writer.add_index(conn, shard.prefix)
+            except BaseException:
+                writer.abort()
+                raise
+            info = writer.close(compress)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Error exporting index snapshot: {e}")
+            return None
+        info["path"] = path
+        return info
+
+    def import_snapshot(self, path: Optional[str] = None,
+                        max_file_size: int = 1024 * 1024) -> Optional[Dict[str, Any]]:
+        """Seed every shard from a snapshot, see CodebaseIndexer.import_snapshot"""
+        with self.index_lock:
+            if self.indexing_in_progress:
+                logger.warning("Indexing in progress, not importing snapshot")
+                return None
+            self.indexing_in_progress = True
+
+        try:
+            totals: Dict[str, int] = {}
+            with SnapshotReader(path or self.default_snapshot_path(), temp_dir=self.db_dir) as reader:
+                for shard in self.shards:
+                    counts = shard.indexer.import_snapshot(max_file_size=max_file_size, snapshot=reader,
+                                                           prefix=shard.prefix)
+                    if counts is None:
+                        return None
+                    for key, count in counts.items():
+                        totals[key] = totals.get(key, 0) + count
+            return totals
+        finally:
+            self.indexing_in_progress = False
+
+    # Status and maintenance
+
+    def get_index_status(self) -> Dict[str, Any]:
+        """Status of the whole index, summed over shards, with each shard's counts"""
+        shards = {shard.name: shard.indexer.get_index_status() for shard in self.shards}
+        return {
+            "last_indexed": max((status["last_indexed"] for status in shards.values()), default=0),
+            "file_count": sum(status["file_count"] for status in shards.values()),
+            "symbol_count": sum(status["symbol_count"] for status in shards.values()),
+            "indexing_in_progress": self.indexing_in_progress or any(
+                status["indexing_in_progress"] for status in shards.values()),
+            "watching": bool(self.watcher and self.watcher.running),
+            "hot_files": sum(status.get("hot_files", 0) for status in shards.values()),
+            "shards": {shard.name: dict(shards[shard.name], path=shard.prefix) for shard in self.shards},
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Metrics of every shard"""
+        return {
+            "shards": {shard.name: shard.indexer.metrics.snapshot() for shard in self.shards},
+            "index_status": self.get_index_status(),
+        }
+
+    def clear_index(self) -> bool:
+        return all([shard.indexer.clear_index() for shard in self.shards])
+
+    def close(self):
+        """Stop watching and any indexing job, and close every shard"""
+        self.stop_watching()
+        job = self.active_job
+        if job and not job.done:
+            job.interrupted = True
+            job.cancel_event.set()
+            job.thread.join()
+        for shard in self.shards:
+            shard.indexer.close()
+        self._executor.shutdown(wait=False)
+
+
+def create_indexer(workspace_root: str, sharded: Optional[str] = None, **kwargs):
+    """
+    Create the index of a workspace, sharded per package if asked to
+
+    Args:
+        workspace_root: Root directory of the workspace
+        sharded: "on" to always shard, "auto" to shard when the workspace has
+                 at least two packages, "off" for a single database (defaults to
+                 the MIGHTYDEV_INDEX_SHARDS environment variable, then "off")
+        kwargs: Passed to the indexer
+
+    Returns:
+        A CodebaseIndexer or a ShardedIndexer
+    """
+    mode = (sharded or os.environ.get('MIGHTYDEV_INDEX_SHARDS') or 'off').lower()
+    if mode in ('on', '1', 'true'):
+        return ShardedIndexer(workspace_root, **kwargs)
+    if mode == 'auto':
+        if len(discover_packages(workspace_root, _should_scan_dir)) >= 2:
+            return ShardedIndexer(workspace_root, **kwargs)
+    return CodebaseIndexer(workspace_root, **kwargs)
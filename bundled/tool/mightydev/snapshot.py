@@ -0,0 +1,326 @@
+"""
+Portable snapshots of the codebase index.
+
+A snapshot holds the files, symbols, references and imports of an index,
+keyed by content hash: each distinct file content is stored once, and files
+map paths to contents. Machine-specific state (stat fingerprints, file ids,
+resolved import targets, timestamps) is left out, so a snapshot exported on
+one machine can seed the index of a fresh clone on another. On import, only
+files whose content hash matches are taken from the snapshot; the rest are
+reindexed as usual.
+
+A snapshot is a compact SQLite database with a snapshot_info table holding
+its format version. Exported snapshots are gzip-compressed by default. An
+uncompressed snapshot is immutable and is opened read-only and memory-mapped,
+so it can serve queries directly; a compressed one is expanded to a
+temporary file first.
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 'mightydev-index-snapshot'
+SNAPSHOT_VERSION = 1
+
+_SQLITE_MAGIC = b'SQLite format 3\x00'
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# Memory map at most this much of a snapshot
+_MMAP_SIZE = 1 << 30
+
+_SCHEMA = [
+    'CREATE TABLE snapshot_info (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID',
+    '''CREATE TABLE contents (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT UNIQUE,
+        language TEXT,
+        size INTEGER
+    )''',
+    'CREATE TABLE files (path TEXT PRIMARY KEY, content_id INTEGER) WITHOUT ROWID',
+    '''CREATE TABLE symbols (
+        content_id INTEGER,
+        seq INTEGER,
+        name TEXT,
+        type TEXT,
+        line_start INTEGER,
+        line_end INTEGER,
+        column_start INTEGER,
+        column_end INTEGER,
+        signature TEXT,
+        docstring TEXT,
+        parent TEXT,
+        byte_start INTEGER,
+        byte_end INTEGER,
+        PRIMARY KEY (content_id, seq)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE dependencies (
+        content_id INTEGER,
+        seq INTEGER,
+        target TEXT,
+        PRIMARY KEY (content_id, seq)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE symbol_references (
+        content_id INTEGER,
+        line INTEGER,
+        column INTEGER,
+        name TEXT,
+        PRIMARY KEY (content_id, line, column, name)
+    ) WITHOUT ROWID''',
+]
+
+# Symbol columns in the order of the index writer's symbol rows
+_SYMBOL_COLUMNS = ('name, type, line_start, line_end, column_start, column_end, '
+                   'signature, docstring, parent, byte_start, byte_end')
+
+SnapshotRecord = Tuple[List[Tuple], List[str], List[Tuple[str, int, int]]]
+
+
+def _to_portable(path: str) -> str:
+    return path.replace(os.sep, '/')
+
+
+def _from_portable(path: str) -> str:
+    return path.replace('/', os.sep)
+
+
+class SnapshotWriter:
+    """
+    Builds a snapshot from one or more index databases
+
+    Rows are written to a temporary database next to the target, which is
+    compacted, optionally compressed and renamed into place on close.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Where to write the snapshot
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-', suffix='.db')
+        os.close(fd)
+        self.conn = sqlite3.connect(self._tmp_path)
+        self.conn.execute('PRAGMA journal_mode = OFF')
+        self.conn.execute('PRAGMA synchronous = OFF')
+        for statement in _SCHEMA:
+            self.conn.execute(statement)
+        self._content_ids: Dict[str, int] = {}
+        self.file_count = 0
+        self.symbol_count = 0
+
+    def add_index(self, source: sqlite3.Connection, prefix: str = ''):
+        """
+        Copy the files of an index database into the snapshot
+
+        Args:
+            source: Connection to an index database (e.g. from its read pool)
+            prefix: Directory of the index relative to the snapshot root, for the
+                    shards of a sharded index
+        """
+        files = source.execute('''
+        SELECT id, path, language, size, content_hash FROM files
+        WHERE content_hash IS NOT NULL
+        ORDER BY path
+        ''').fetchall()
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN')
+        for file_id, path, language, size, content_hash in files:
+            if prefix:
+                path = os.path.join(prefix, path)
+            content_id = self._content_ids.get(content_hash)
+            if content_id is None:
+                cursor.execute('INSERT INTO contents (content_hash, language, size) VALUES (?, ?, ?)',
+                               (content_hash, language, size))
+                content_id = self._content_ids[content_hash] = cursor.lastrowid
+                symbols = source.execute(f'''
+                SELECT {_SYMBOL_COLUMNS} FROM symbols WHERE file_id = ? ORDER BY id
+                ''', (file_id,)).fetchall()
+                cursor.executemany(f'''
+                INSERT INTO symbols (content_id, seq, {_SYMBOL_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(content_id, seq) + tuple(row) for seq, row in enumerate(symbols)])
+                cursor.executemany('''
+                INSERT INTO dependencies (content_id, seq, target) VALUES (?, ?, ?)
+                ''', [(content_id, seq, target) for seq, (target,) in enumerate(source.execute(
+                    'SELECT target FROM dependencies WHERE source_file_id = ? ORDER BY id', (file_id,)))])
+                cursor.executemany('''
+                INSERT OR IGNORE INTO symbol_references (content_id, line, column, name) VALUES (?, ?, ?, ?)
+                ''', [(content_id,) + tuple(row) for row in source.execute(
+                    'SELECT line, column, name FROM symbol_references WHERE file_id = ?', (file_id,))])
+                self.symbol_count += len(symbols)
+            cursor.execute('INSERT OR REPLACE INTO files (path, content_id) VALUES (?, ?)',
+                           (_to_portable(path), content_id))
+            self.file_count += 1
+        self.conn.commit()
+
+    def close(self, compress: bool = True) -> Dict[str, Any]:
+        """
+        Finish the snapshot
+
+        Args:
+            compress: gzip the snapshot (smaller to ship, but expanded before use)
+
+        Returns:
+            The snapshot's info: format, version, counts and size in bytes
+        """
+        info = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'created': time.time(),
+            'file_count': self.file_count,
+            'content_count': len(self._content_ids),
+            'symbol_count': self.symbol_count,
+        }
+        try:
+            self.conn.executemany('INSERT INTO snapshot_info (key, value) VALUES (?, ?)',
+                                  [(key, str(value)) for key, value in info.items()])
+            self.conn.commit()
+            self.conn.execute('VACUUM')
+            self.conn.close()
+
+            if compress:
+                compressed = self._tmp_path + '.gz'
+                with open(self._tmp_path, 'rb') as src, open(compressed, 'wb') as raw:
+                    # A fixed mtime keeps snapshots of the same index byte-identical
+                    with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+                os.remove(self._tmp_path)
+                self._tmp_path = compressed
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        info['compressed'] = compress
+        info['bytes'] = os.path.getsize(self.path)
+        return info
+
+    def abort(self):
+        """Discard the snapshot being written"""
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+        for path in (self._tmp_path, self._tmp_path + '.gz'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class SnapshotReader:
+    """
+    Read-only view of a snapshot
+
+    Raises ValueError if the file isn't a snapshot or was written by a newer,
+    incompatible version.
+    """
+
+    def __init__(self, path: str, temp_dir: Optional[str] = None):
+        """
+        Args:
+            path: Snapshot file, compressed or not
+            temp_dir: Where to expand a compressed snapshot (defaults to its directory)
+        """
+        self.path = path
+        self._expanded_path = None
+        with open(path, 'rb') as f:
+            magic = f.read(len(_SQLITE_MAGIC))
+
+        db_path = path
+        if magic.startswith(_GZIP_MAGIC):
+            fd, self._expanded_path = tempfile.mkstemp(dir=temp_dir or os.path.dirname(os.path.abspath(path)),
+                                                       prefix='.snapshot-', suffix='.db')
+            try:
+                with gzip.open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            except (OSError, EOFError) as e:
+                self.close()
+                raise ValueError(f"Corrupt snapshot {path}: {e}") from None
+            db_path = self._expanded_path
+        elif magic != _SQLITE_MAGIC:
+            raise ValueError(f"Not an index snapshot: {path}")
+
+        # Snapshots never change once written, so SQLite can skip locking entirely
+        uri = Path(db_path).resolve().as_uri() + '?mode=ro&immutable=1'
+        try:
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.conn.execute(f'PRAGMA mmap_size = {_MMAP_SIZE}')
+            self.info = dict(self.conn.execute('SELECT key, value FROM snapshot_info'))
+        except sqlite3.Error as e:
+            self.close()
+            raise ValueError(f"Not an index snapshot: {path} ({e})") from None
+
+        if self.info.get('format') != SNAPSHOT_FORMAT:
+            self.close()
+            raise ValueError(f"Not an index snapshot: {path}")
+        version = int(self.info.get('version', 0))
+        if version > SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"Snapshot version {version} is newer than supported version {SNAPSHOT_VERSION}")
+
+    def files(self, prefix: str = '') -> Iterator[Tuple[str, int, str, str]]:
+        """
+        Files in the snapshot
+
+        Args:
+            prefix: Only files below this directory, with paths relative to it
+
+        Yields:
+            (relative path, content id, content hash, language)
+        """
+        sql = '''
+        SELECT f.path, c.id, c.content_hash, c.language
+        FROM files f JOIN contents c ON f.content_id = c.id
+        '''
+        params = []
+        if prefix:
+            portable = _to_portable(prefix).rstrip('/') + '/'
+            # Paths between "prefix/" and "prefix0" ('0' follows '/') are below it
+            sql += ' WHERE f.path >= ? AND f.path < ?'
+            params = [portable, portable[:-1] + '0']
+        for path, content_id, content_hash, language in self.conn.execute(sql, params).fetchall():
+            if prefix:
+                path = path[len(portable):]
+            yield _from_portable(path), content_id, content_hash, language
+
+    def record(self, content_id: int) -> SnapshotRecord:
+        """
+        Parsed form of a content, as the index writer takes it
+
+        Returns:
+            (symbol rows, dependencies, references)
+        """
+        symbols = self.conn.execute(f'''
+        SELECT {_SYMBOL_COLUMNS} FROM symbols WHERE content_id = ? ORDER BY seq
+        ''', (content_id,)).fetchall()
+        dependencies = [target for (target,) in self.conn.execute(
+            'SELECT target FROM dependencies WHERE content_id = ? ORDER BY seq', (content_id,))]
+        references = self.conn.execute('''
+        SELECT name, line, column FROM symbol_references WHERE content_id = ?
+        ''', (content_id,)).fetchall()
+        return symbols, dependencies, references
+
+    def close(self):
+        conn = getattr(self, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.conn = None
+        if self._expanded_path and os.path.exists(self._expanded_path):
+            os.remove(self._expanded_path)
+            self._expanded_path = None
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,188 @@
+"""
+SQLite storage layer for the codebase index.
+
+The index database runs in WAL mode so that a single writer (the indexing
+pipeline) and many readers (query methods called from client threads) can work
+at the same time. Readers draw read-only connections from a bounded pool and
+every checkout runs inside one read transaction, so a query sees a consistent
+snapshot of the index even while a reindex is committing batches.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to the connection that writes the index
+WRITE_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),    # WAL makes NORMAL durable across application crashes
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -64000),       # ~64MB page cache
+    ('mmap_size', 268435456),     # 256MB
+    ('wal_autocheckpoint', 4000), # Checkpoint less often during large ingests
+    ('busy_timeout', 5000),
+]
+
+# Pragmas applied to pooled read-only connections
+READ_PRAGMAS = [
+    ('query_only', 'ON'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -16000),       # ~16MB page cache per reader
+    ('mmap_size', 268435456),
+    ('busy_timeout', 5000),
+]
+
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas: List[tuple]):
+    """Apply a pragma profile to a connection"""
+    for name, value in pragmas:
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+def connect(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Open a read-write connection to the index database with the write profile
+
+    Args:
+        db_path: Path to the SQLite database file
+        check_same_thread: Passed through to sqlite3.connect
+
+    Returns:
+        A configured connection
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    _apply_pragmas(conn, WRITE_PRAGMAS)
+    return conn
+
+
+def connect_read_only(db_path: str) -> sqlite3.Connection:
+    """
+    Open a read-only connection to the index database with the read profile
+
+    The connection runs in autocommit mode; callers control read transactions
+    themselves (see ReadConnectionPool.connection).
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        A configured read-only connection
+    """
+    uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+    _apply_pragmas(conn, READ_PRAGMAS)
+    return conn
+
+
+class ReadConnectionPool:
+    """
+    Bounded pool of read-only connections to the index database.
+
+    Connections are created lazily up to max_size and handed to one thread at a
+    time. When every connection is checked out, callers wait for one to be
+    returned instead of opening more.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 4):
+        """
+        Args:
+            db_path: Path to the SQLite database file
+            max_size: Maximum number of open read connections
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, open a new one, or wait for one to be returned"""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Read connection pool is closed")
+                create = self._created < self.max_size
+                if create:
+                    self._created += 1
+
+            if create:
+                try:
+                    return connect_read_only(self.db_path)
+                except sqlite3.Error:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            # Every connection is checked out; wait for one to come back, then
+            # re-check in case a broken connection was discarded meanwhile
+            try:
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, closing it if the pool was closed"""
+        if self._closed:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a read connection for the duration of a with block
+
+        All statements in the block run in a single read transaction, so they
+        observe one consistent snapshot of the index.
+        """
+        conn = self._acquire()
+        healthy = True
+        try:
+            conn.execute('BEGIN')
+            yield conn
+        except sqlite3.Error:
+            healthy = False
+            raise
+        finally:
+            if healthy:
+                try:
+                    conn.execute('ROLLBACK')
+                except sqlite3.Error:
+                    healthy = False
+            if healthy:
+                self._release(conn)
+            else:
+                # Don't hand a connection in an unknown state to the next caller
+                self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection and free its slot in the pool"""
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    def close(self):
+        """Close all idle connections; checked out ones are closed when returned"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,826 @@
+"""
+Vector store for embedding retrieval at scale.
+
+Vectors live in append-only segments on disk. Each vector is stored as int8
+with a float32 scale of its own (scalar quantization, a quarter of the
+float32 size), and its score against a query is the int8 dot product times
+the scale. New vectors are appended to the active segment, which is also
+kept in memory; once full it is sealed, and sealed segments are
+memory-mapped read-only.
+
+Search is sublinear once the IVF (inverted file) index is trained: k-means
+centroids partition the vectors into lists, and a query only scores the
+vectors in the nprobe lists whose centroids score highest. Compaction
+rewrites sealed segments with the rows of each list stored contiguously, so
+probing a list reads one slice of the memory map.
+
+Deletes are tombstones: rows are masked out of results and logged, and
+compaction drops them for good. IVF training (and retraining as the store
+grows) and compaction run on a background thread.
+
+python -m mightydev.vectorstore runs a recall/latency benchmark against
+exact float32 search.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+MANIFEST = 'manifest.json'
+
+# Rows converted to float32 and scored at a time; small enough to stay in cache
+_SCORE_CHUNK = 512
+# Rows assigned to centroids at a time during training and compaction
+_ASSIGN_CHUNK = 8192
+
+
+def quantize(vectors: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    Scalar-quantize float vectors to int8 with a scale per vector
+
+    Returns:
+        (int8 vectors, float32 scales) such that vectors ~= int8 vectors * scales
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+
+def _score(vectors, scales, query: 'np.ndarray') -> 'np.ndarray':
+    """Scores of int8 (or float16, with scales None) rows against a float32 query"""
+    out = np.empty(len(vectors), dtype=np.float32)
+    buffer = np.empty((min(len(vectors), _SCORE_CHUNK), len(query)), dtype=np.float32)
+    for start in range(0, len(vectors), _SCORE_CHUNK):
+        chunk = vectors[start:start + _SCORE_CHUNK]
+        converted = buffer[:len(chunk)]
+        converted[...] = chunk
+        np.dot(converted, query, out=out[start:start + len(chunk)])
+    if scales is not None:
+        out *= scales
+    return out
+
+
+def _assign(vectors: 'np.ndarray', centroids: 'np.ndarray') -> 'np.ndarray':
+    """IVF list of each float32 vector: the centroid with the highest inner product"""
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        lists[start:start + _ASSIGN_CHUNK] = np.argmax(vectors[start:start + _ASSIGN_CHUNK] @ centroids.T, axis=1)
+    return lists
+
+
+def kmeans(data: 'np.ndarray', k: int, iterations: int = 10, seed: int = 0) -> 'np.ndarray':
+    """
+    Spherical k-means: centroids are unit vectors and points go to the highest inner product
+
+    Args:
+        data: float32 vectors, one per row
+        k: Number of centroids
+        iterations: Lloyd iterations
+        seed: Seed of the initial centroid choice
+
+    Returns:
+        (k, dimension) float32 centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        lists = _assign(data, centroids)
+        order = np.argsort(lists, kind='stable')
+        counts = np.bincount(lists, minlength=k)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        sums = np.add.reduceat(data[order], starts[filled], axis=0)
+        centroids[filled] = sums
+        # Empty lists restart from random points
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class _Segment:
+    """Rows of one segment: int8 vectors, scales, ids and IVF lists, plus the tombstone mask"""
+
+    def __init__(self, number: int, dimension: int, ivf_version: int = 0):
+        self.number = number
+        self.dimension = dimension
+        self.ivf_version = ivf_version  # Version of the centroids the lists were assigned with
+        self.sealed = False
+        self.rows = 0
+        self.vectors = np.zeros((0, dimension), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.offsets: Optional['np.ndarray'] = None  # Row range of each list, once clustered
+        self.deleted = np.zeros(0, dtype=bool)
+        self.deleted_count = 0
+
+    @property
+    def live(self) -> int:
+        return self.rows - self.deleted_count
+
+    def meta(self) -> Dict[str, Any]:
+        return {"number": self.number, "sealed": self.sealed, "rows": self.rows,
+                "ivf_version": self.ivf_version, "clustered": self.offsets is not None}
+
+
+class VectorStore:
+    """
+    Persistent store of int8-quantized vectors keyed by int64 ids
+
+    Safe to use from several threads: writes are serialized, and searches run
+    against the segments as they were when the search started.
+    """
+
+    def __init__(self, path: str, dimension: int, segment_rows: int = 65536, nprobe: Optional[int] = None,
+                 train_min_rows: int = 10000):
+        """
+        Args:
+            path: Directory of the store (created if missing)
+            dimension: Dimension of the vectors
+            segment_rows: Rows of the active segment before it is sealed
+            nprobe: IVF lists scored per query (default: about 1/16 of the lists)
+            train_min_rows: Live rows before background maintenance trains the IVF index
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for the vector store")
+        self.path = path
+        self.dimension = dimension
+        self.segment_rows = segment_rows
+        self.nprobe = nprobe
+        self.train_min_rows = train_min_rows
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._centroids: Optional['np.ndarray'] = None
+        self._ivf_version = 0
+        self._trained_rows = 0
+        self._next_segment = 1
+        self._next_id = 0
+        self._tombstone_log = 'tombstones-0.log'
+        self._files: Dict[str, Any] = {}  # Append handles of the active segment's files
+        self._maintenance: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        os.makedirs(path, exist_ok=True)
+        self._open()
+
+    # Files
+
+    def _file(self, number: int, kind: str) -> str:
+        return os.path.join(self.path, f'seg-{number:06d}.{kind}')
+
+    def _write_manifest(self):
+        manifest = {
+            "version": STORE_VERSION,
+            "dimension": self.dimension,
+            "segments": [segment.meta() for segment in self._segments],
+            "next_segment": self._next_segment,
+            "tombstones": self._tombstone_log,
+            "ivf": {"version": self._ivf_version, "trained_rows": self._trained_rows,
+                    "nlist": len(self._centroids) if self._centroids is not None else 0},
+        }
+        tmp_path = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+
+    def _open(self):
+        """Load the manifest, map sealed segments, load the active one and apply tombstones"""
+        try:
+            with open(os.path.join(self.path, MANIFEST), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            self._segments = [self._new_active_segment()]
+            self._write_manifest()
+            return
+        if manifest.get("version", 0) > STORE_VERSION:
+            raise ValueError(f"Vector store version {manifest['version']} is newer than supported")
+        if manifest["dimension"] != self.dimension:
+            raise ValueError(f"Vector store has dimension {manifest['dimension']}, not {self.dimension}")
+
+        self._next_segment = manifest["next_segment"]
+        self._tombstone_log = manifest["tombstones"]
+        ivf = manifest.get("ivf") or {}
+        self._ivf_version = ivf.get("version", 0)
+        self._trained_rows = ivf.get("trained_rows", 0)
+        if ivf.get("nlist"):
+            self._centroids = np.load(os.path.join(self.path, f'ivf-{self._ivf_version}.npy'))
+
+        for meta in manifest["segments"]:
+            if meta["sealed"]:
+                segment = self._map_segment(meta["number"], meta["rows"], meta["ivf_version"], meta["clustered"])
+            else:
+                segment = self._load_active_segment(meta["number"], meta["ivf_version"])
+            self._segments.append(segment)
+
+        by_number = {segment.number: segment for segment in self._segments}
+        log_path = os.path.join(self.path, self._tombstone_log)
+        if os.path.exists(log_path):
+            entries = np.fromfile(log_path, dtype=np.int64)
+            entries = entries[:len(entries) // 2 * 2].reshape(-1, 2)
+            for number, row in entries:
+                segment = by_number.get(int(number))
+                if segment is not None and row < segment.rows and not segment.deleted[row]:
+                    segment.deleted[row] = True
+                    segment.deleted_count += 1
+        self._next_id = max((int(segment.ids[:segment.rows].max()) + 1
+                             for segment in self._segments if segment.rows), default=0)
+
+    def _map_segment(self, number: int, rows: int, ivf_version: int, clustered: bool) -> _Segment:
+        """Memory-map a sealed segment read-only"""
+        segment = _Segment(number, self.dimension, ivf_version)
+        segment.sealed = True
+        segment.rows = rows
+        if rows:
+            segment.vectors = np.memmap(self._file(number, 'vectors'), dtype=np.int8, mode='r',
+                                        shape=(rows, self.dimension))
+            segment.scales = np.memmap(self._file(number, 'scales'), dtype=np.float32, mode='r', shape=(rows,))
+            segment.ids = np.memmap(self._file(number, 'ids'), dtype=np.int64, mode='r', shape=(rows,))
+            segment.lists = np.memmap(self._file(number, 'lists'), dtype=np.int32, mode='r', shape=(rows,))
+        if clustered:
+            segment.offsets = np.fromfile(self._file(number, 'offsets'), dtype=np.int64)
+        segment.deleted = np.zeros(rows, dtype=bool)
+        return segment
+
+    def _new_active_segment(self) -> _Segment:
+        segment = _Segment(self._next_segment, self.dimension, self._ivf_version)
+        self._next_segment += 1
+        self._grow(segment, self.segment_rows)
+        self._files = {kind: open(self._file(segment.number, kind), 'ab')
+                       for kind in ('vectors', 'scales', 'lists', 'ids')}
+        return segment
+
+    def _load_active_segment(self, number: int, ivf_version: int) -> _Segment:
+        """Load the active segment into memory, dropping a partially written last row"""
+        arrays = {
+            'vectors': np.fromfile(self._file(number, 'vectors'), dtype=np.int8),
+            'scales': np.fromfile(self._file(number, 'scales'), dtype=np.float32),
+            'lists': np.fromfile(self._file(number, 'lists'), dtype=np.int32),
+            'ids': np.fromfile(self._file(number, 'ids'), dtype=np.int64),
+        }
+        rows = min(len(arrays['vectors']) // self.dimension, len(arrays['scales']),
+                   len(arrays['lists']), len(arrays['ids']))
+        segment = _Segment(number, self.dimension, ivf_version)
+        self._grow(segment, max(rows, self.segment_rows))
+        segment.vectors[:rows] = arrays['vectors'][:rows * self.dimension].reshape(rows, self.dimension)
+        segment.scales[:rows] = arrays['scales'][:rows]
+        segment.lists[:rows] = arrays['lists'][:rows]
+        segment.ids[:rows] = arrays['ids'][:rows]
+        segment.rows = rows
+        self._files = {}
+        for kind, itemsize in (('vectors', self.dimension), ('scales', 4), ('lists', 4), ('ids', 8)):
+            path = self._file(number, kind)
+            os.truncate(path, rows * itemsize)
+            self._files[kind] = open(path, 'ab')
+        return segment
+
+    @staticmethod
+    def _grow(segment: _Segment, capacity: int):
+        """Preallocate the in-memory arrays of the active segment"""
+        rows = segment.rows
+        for name, shape, dtype in (('vectors', (capacity, segment.dimension), np.int8),
+                                   ('scales', (capacity,), np.float32), ('ids', (capacity,), np.int64),
+                                   ('lists', (capacity,), np.int32), ('deleted', (capacity,), bool)):
+            array = np.zeros(shape, dtype=dtype)
+            array[:rows] = getattr(segment, name)[:rows]
+            setattr(segment, name, array)
+
+    def _seal_active(self):
+        """Seal the full active segment, map it, and start a new one"""
+        active = self._segments[-1]
+        for f in self._files.values():
+            f.close()
+        sealed = self._map_segment(active.number, active.rows, active.ivf_version, False)
+        sealed.deleted[:] = active.deleted[:active.rows]
+        sealed.deleted_count = active.deleted_count
+        self._segments[-1] = sealed
+        self._segments.append(self._new_active_segment())
+        self._write_manifest()
+
+    # Writes
+
+    def add(self, vectors: Sequence, ids: Optional[Sequence[int]] = None) -> 'np.ndarray':
+        """
+        Add vectors; adding an id that is already stored replaces its vector
+
+        Args:
+            vectors: (n, dimension) float vectors
+            ids: Ids of the vectors (default: consecutive new ids)
+
+        Returns:
+            The ids of the vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        quantized, scales = quantize(vectors)
+        with self._lock:
+            if ids is None:
+                ids = np.arange(self._next_id, self._next_id + len(vectors), dtype=np.int64)
+            else:
+                ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+                if len(ids) != len(vectors):
+                    raise ValueError("ids and vectors differ in length")
+                self._delete_locked(ids)
+            if len(ids):
+                self._next_id = max(self._next_id, int(ids.max()) + 1)
+            if self._centroids is not None:
+                lists = _assign(vectors, self._centroids)
+            else:
+                lists = np.full(len(vectors), -1, dtype=np.int32)
+
+            start = 0
+            while start < len(vectors):
+                active = self._segments[-1]
+                if active.rows >= self.segment_rows:
+                    self._seal_active()
+                    active = self._segments[-1]
+                end = start + min(len(vectors) - start, self.segment_rows - active.rows)
+                rows = slice(active.rows, active.rows + end - start)
+                active.vectors[rows] = quantized[start:end]
+                active.scales[rows] = scales[start:end]
+                active.lists[rows] = lists[start:end]
+                active.ids[rows] = ids[start:end]
+                # Ids go last: a row is complete once its id is on disk
+                self._files['vectors'].write(quantized[start:end].tobytes())
+                self._files['scales'].write(scales[start:end].tobytes())
+                self._files['lists'].write(lists[start:end].tobytes())
+                self._files['ids'].write(ids[start:end].tobytes())
+                for f in self._files.values():
+                    f.flush()
+                active.rows += end - start
+                start = end
+        return ids
+
+    def _delete_locked(self, ids: 'np.ndarray') -> int:
+        entries = []
+        for segment in self._segments:
+            rows = segment.rows
+            hits = np.flatnonzero(np.isin(segment.ids[:rows], ids) & ~segment.deleted[:rows])
+            if len(hits):
+                segment.deleted[hits] = True
+                segment.deleted_count += len(hits)
+                entries.append(np.column_stack([np.full(len(hits), segment.number, dtype=np.int64), hits]))
+        if not entries:
+            return 0
+        entries = np.concatenate(entries).astype(np.int64)
+        with open(os.path.join(self.path, self._tombstone_log), 'ab') as f:
+            f.write(entries.tobytes())
+        return len(entries)
+
+    def delete(self, ids: Sequence[int]) -> int:
+        """
+        Delete vectors by id
+
+        Returns:
+            Number of vectors deleted
+        """
+        with self._lock:
+            return self._delete_locked(np.asarray(ids, dtype=np.int64).reshape(-1))
+
+    # Search
+
+    def default_nprobe(self) -> int:
+        if self.nprobe:
+            return self.nprobe
+        nlist = len(self._centroids) if self._centroids is not None else 1
+        return max(1, nlist // 16)
+
+    def search(self, query: Sequence[float], k: int = 10, nprobe: Optional[int] = None,
+               exact: bool = False) -> List[Tuple[int, float]]:
+        """
+        Find the vectors with the highest inner product with a query
+
+        Args:
+            query: Float vector
+            k: Number of results
+            nprobe: IVF lists to score (default: default_nprobe())
+            exact: Score every vector instead of probing the IVF index
+
+        Returns:
+            (id, score) pairs, best first
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        with self._lock:
+            segments = [(segment, segment.rows) for segment in self._segments]
+            centroids, ivf_version = self._centroids, self._ivf_version
+            nprobe = nprobe or self.default_nprobe()
+
+        probe = None
+        if centroids is not None and not exact and nprobe < len(centroids):
+            centroid_scores = centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        all_scores, all_ids = [], []
+        for segment, rows in segments:
+            if not rows:
+                continue
+            if probe is not None and segment.ivf_version == ivf_version and segment.offsets is not None:
+                # Clustered: each probed list is one contiguous slice
+                for lst in probe:
+                    start, end = int(segment.offsets[lst]), int(segment.offsets[lst + 1])
+                    if start == end:
+                        continue
+                    live = ~segment.deleted[start:end]
+                    scores = _score(segment.vectors[start:end], segment.scales[start:end], query)
+                    all_scores.append(scores[live])
+                    all_ids.append(np.asarray(segment.ids[start:end])[live])
+                continue
+            if probe is not None and segment.ivf_version == ivf_version:
+                candidates = np.flatnonzero(np.isin(segment.lists[:rows], probe) & ~segment.deleted[:rows])
+            else:
+                candidates = np.flatnonzero(~segment.deleted[:rows])
+            if len(candidates) == rows:
+                scores = _score(segment.vectors[:rows], segment.scales[:rows], query)
+                ids = np.asarray(segment.ids[:rows])
+            else:
+                scores = _score(segment.vectors[candidates], segment.scales[candidates], query)
+                ids = np.asarray(segment.ids[candidates])
+            all_scores.append(scores)
+            all_ids.append(ids)
+
+        if not all_scores:
+            return []
+        scores = np.concatenate(all_scores)
+        ids = np.concatenate(all_ids)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    # IVF training and compaction
+
+    def _sample(self, segments: List[Tuple[_Segment, int]], size: int, seed: int) -> 'np.ndarray':
+        """Dequantized float32 sample of the live vectors"""
+        live = [(segment, np.flatnonzero(~segment.deleted[:rows])) for segment, rows in segments]
+        total = sum(len(rows) for _, rows in live)
+        picks = np.sort(np.random.default_rng(seed).choice(total, min(size, total), replace=False))
+        parts, base = [], 0
+        for segment, rows in live:
+            chosen = rows[picks[(picks >= base) & (picks < base + len(rows))] - base]
+            base += len(rows)
+            if len(chosen):
+                parts.append(np.asarray(segment.vectors[chosen], dtype=np.float32) *
+                             np.asarray(segment.scales[chosen])[:, None])
+        return np.concatenate(parts)
+
+    def train(self, nlist: Optional[int] = None, sample_size: Optional[int] = None, iterations: int = 10,
+              seed: int = 0) -> int:
+        """
+        Train the IVF index with k-means over a sample of the live vectors
+
+        Sealed segments are reassigned to the new lists by the next compaction
+        and are scored in full until then.
+
+        Args:
+            nlist: Number of lists (default: 4 * sqrt(live rows), at most 4096)
+            sample_size: Vectors to train on (default: 40 per list, at least 10000)
+            iterations: k-means iterations
+            seed: Seed of the sample and the initial centroids
+
+        Returns:
+            The number of lists, or 0 if the store is empty
+        """
+        with self._lock:
+            segments = [(segment, segment.rows) for segment in self._segments]
+        live = sum(segment.live for segment, _ in segments)
+        if not live:
+            return 0
+        nlist = min(nlist or max(1, min(4096, int(4 * math.sqrt(live)))), live)
+        sample = self._sample(segments, sample_size or max(nlist * 40, 10000), seed)
+        started = time.time()
+        centroids = kmeans(sample, nlist, iterations, seed)
+
+        with self._lock:
+            version = self._ivf_version + 1
+            np.save(os.path.join(self.path, f'ivf-{version}.npy'), centroids)
+            previous = self._ivf_version
+            self._centroids, self._ivf_version, self._trained_rows = centroids, version, live
+
+            # The active segment is small and in memory, so it is reassigned right away
+            active = self._segments[-1]
+            rows = active.rows
+            vectors = active.vectors[:rows].astype(np.float32) * active.scales[:rows, None]
+            active.lists[:rows] = _assign(vectors, centroids)
+            active.ivf_version = version
+            self._files['lists'].close()
+            with open(self._file(active.number, 'lists'), 'wb') as f:
+                f.write(active.lists[:rows].tobytes())
+            self._files['lists'] = open(self._file(active.number, 'lists'), 'ab')
+            self._write_manifest()
+        old_path = os.path.join(self.path, f'ivf-{previous}.npy')
+        if os.path.exists(old_path):
+            os.remove(old_path)
+        logger.info(f"Trained IVF index with {nlist} lists on {len(sample)} vectors "
+                    f"in {time.time() - started:.2f} seconds")
+        return nlist
+
+    def _write_segment(self, number: int, vectors, scales, ids, lists, offsets):
+        for kind, array in (('vectors', vectors), ('scales', scales), ('ids', ids), ('lists', lists),
+                            ('offsets', offsets)):
+            if array is None:
+                continue
+            with open(self._file(number, kind), 'wb') as f:
+                f.write(np.ascontiguousarray(array).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self, deleted_ratio: float = 0.2) -> Dict[str, int]:
+        """
+        Rewrite sealed segments that need it
+
+        A sealed segment is rewritten if it isn't clustered by the current IVF
+        lists or at least deleted_ratio of its rows are tombstones. Rewritten
+        segments drop their tombstones, are merged up to segment_rows, and store
+        the rows of each list contiguously. Deletes made while compacting are
+        carried over.
+
+        Returns:
+            Counts of segments rewritten and written, and of rows dropped
+        """
+        with self._compact_lock:
+            with self._lock:
+                trained = self._centroids is not None
+                candidates = [
+                    segment for segment in self._segments if segment.sealed and (
+                        (trained and (segment.offsets is None or segment.ivf_version != self._ivf_version)) or
+                        (segment.rows and segment.deleted_count / segment.rows >= deleted_ratio))
+                ]
+                if not candidates:
+                    return {"segments_rewritten": 0, "segments_written": 0, "rows_dropped": 0}
+                kept = {segment.number: np.flatnonzero(~segment.deleted[:segment.rows]) for segment in candidates}
+                centroids, ivf_version = self._centroids, self._ivf_version
+
+            # Group candidates into outputs of at most segment_rows live rows
+            groups, group, group_rows = [], [], 0
+            for segment in candidates:
+                if group and group_rows + len(kept[segment.number]) > self.segment_rows:
+                    groups.append(group)
+                    group, group_rows = [], 0
+                group.append(segment)
+                group_rows += len(kept[segment.number])
+            if group:
+                groups.append(group)
+
+            outputs = []
+            for group in groups:
+                vectors = np.concatenate([np.asarray(s.vectors[kept[s.number]]) for s in group])
+                scales = np.concatenate([np.asarray(s.scales[kept[s.number]]) for s in group])
+                ids = np.concatenate([np.asarray(s.ids[kept[s.number]]) for s in group])
+                offsets = None
+                order = np.arange(len(ids))
+                if centroids is not None:
+                    lists = _assign(vectors.astype(np.float32) * scales[:, None], centroids)
+                    order = np.argsort(lists, kind='stable')
+                    lists = lists[order]
+                    offsets = np.searchsorted(lists, np.arange(len(centroids) + 1)).astype(np.int64)
+                    vectors, scales, ids = vectors[order], scales[order], ids[order]
+                else:
+                    lists = np.full(len(ids), -1, dtype=np.int32)
+                with self._lock:
+                    number = self._next_segment
+                    self._next_segment += 1
+                self._write_segment(number, vectors, scales, ids, lists, offsets)
+                # New row of each kept row, for carrying over deletes
+                position = np.empty(len(order), dtype=np.int64)
+                position[order] = np.arange(len(order))
+                outputs.append((group, number, len(ids), offsets is not None, position))
+
+            with self._lock:
+                replaced = {segment.number for segment in candidates}
+                new_segments = []
+                for group, number, rows, clustered, position in outputs:
+                    segment = self._map_segment(number, rows, ivf_version if clustered else 0, clustered)
+                    base = 0
+                    for old in group:
+                        rows_kept = kept[old.number]
+                        deleted_since = np.flatnonzero(old.deleted[rows_kept])
+                        segment.deleted[position[base + deleted_since]] = True
+                        segment.deleted_count += len(deleted_since)
+                        base += len(rows_kept)
+                    new_segments.append(segment)
+
+                first = next(i for i, segment in enumerate(self._segments) if segment.number in replaced)
+                remaining = [segment for segment in self._segments if segment.number not in replaced]
+                self._segments = remaining[:first] + new_segments + remaining[first:]
+
+                # Start a fresh tombstone log holding only the rows still masked
+                log_name = f'tombstones-{self._next_segment}.log'
+                entries = [np.column_stack([np.full(segment.deleted_count, segment.number, dtype=np.int64),
+                                            np.flatnonzero(segment.deleted[:segment.rows])])
+                           for segment in self._segments if segment.deleted_count]
+                with open(os.path.join(self.path, log_name), 'wb') as f:
+                    if entries:
+                        f.write(np.concatenate(entries).astype(np.int64).tobytes())
+                old_log, self._tombstone_log = self._tombstone_log, log_name
+                self._write_manifest()
+
+            for number in replaced:
+                for kind in ('vectors', 'scales', 'ids', 'lists', 'offsets'):
+                    path = self._file(number, kind)
+                    if os.path.exists(path):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            # Still mapped by a search on some platforms; it is unreferenced either way
+                            pass
+            old_log_path = os.path.join(self.path, old_log)
+            if os.path.exists(old_log_path):
+                os.remove(old_log_path)
+            dropped = sum(segment.rows - len(kept[segment.number]) for segment in candidates)
+            logger.info(f"Compacted {len(candidates)} segments into {len(outputs)}, dropping {dropped} rows")
+            return {"segments_rewritten": len(candidates), "segments_written": len(outputs),
+                    "rows_dropped": dropped}
+
+    def maintain(self):
+        """Train or retrain the IVF index when due, then compact"""
+        live = len(self)
+        if self._centroids is None:
+            if live >= self.train_min_rows:
+                self.train()
+        elif live >= 4 * self._trained_rows:
+            # Lists grow too long as the store grows; retrain for the new size
+            self.train()
+        self.compact()
+
+    def start_maintenance(self, interval: float = 30.0):
+        """Run maintain every interval seconds on a background thread"""
+        if self._maintenance and self._maintenance.is_alive():
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.maintain()
+                except Exception as e:
+                    logger.error(f"Error maintaining vector store {self.path}: {e}")
+
+        self._stop.clear()
+        self._maintenance = threading.Thread(target=run, name="vector-store-maintenance", daemon=True)
+        self._maintenance.start()
+
+    def stop_maintenance(self):
+        self._stop.set()
+        if self._maintenance:
+            self._maintenance.join()
+            self._maintenance = None
+
+    # Status
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(segment.live for segment in self._segments)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = list(self._segments)
+            return {
+                "live": sum(segment.live for segment in segments),
+                "rows": sum(segment.rows for segment in segments),
+                "deleted": sum(segment.deleted_count for segment in segments),
+                "segments": len(segments),
+                "clustered_segments": sum(1 for segment in segments if segment.offsets is not None
+                                          and segment.ivf_version == self._ivf_version),
+                "nlist": len(self._centroids) if self._centroids is not None else 0,
+                "nprobe": self.default_nprobe(),
+                "ivf_version": self._ivf_version,
+                "bytes": sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path)),
+            }
+
+    def close(self):
+        """Stop maintenance and close the active segment's files"""
+        self.stop_maintenance()
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+
+def _clustered_dataset(count: int, dimension: int, clusters: int, rng) -> 'np.ndarray':
+    """Normalized vectors around random centers, shaped like sentence embeddings"""
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    noise = rng.standard_normal((count, dimension), dtype=np.float32)
+    data = centers[rng.integers(0, clusters, count)] + noise
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {"p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3)}
+
+
+def benchmark(count: int = 100000, dimension: int = 384, queries: int = 200, k: int = 10,
+              nprobes: Sequence[int] = (1, 4, 8, 16, 32, 64, 128), vectors: Optional['np.ndarray'] = None,
+              clusters: int = 2000, seed: int = 0) -> Dict[str, Any]:
+    """
+    Measure recall and latency of the store against exact float32 search
+
+    Args:
+        count: Vectors in the synthetic dataset (ignored if vectors is given)
+        dimension: Dimension of the synthetic vectors
+        queries: Number of queries, perturbed copies of dataset vectors
+        k: Results per query
+        nprobes: IVF probe counts to measure
+        vectors: Real embeddings to use instead of synthetic ones
+        clusters: Centers of the synthetic dataset
+        seed: Random seed
+
+    Returns:
+        Build timings, and recall@k with p50/p99 latency for exact float32
+        search, exact int8 search and IVF search at each nprobe
+    """
+    rng = np.random.default_rng(seed)
+    if vectors is None:
+        data = _clustered_dataset(count, dimension, clusters, rng)
+    else:
+        data = np.asarray(vectors, dtype=np.float32)
+        data = data / np.maximum(np.linalg.norm(data, axis=1, keepdims=True), 1e-12)
+    queries_data = data[rng.integers(0, len(data), queries)] + 0.1 * rng.standard_normal(
+        (queries, data.shape[1]), dtype=np.float32)
+    queries_data /= np.linalg.norm(queries_data, axis=1, keepdims=True)
+
+    truth, exact_times = [], []
+    for query in queries_data:
+        started = time.perf_counter()
+        scores = data @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        exact_times.append(time.perf_counter() - started)
+        truth.append(set(top.tolist()))
+
+    results: Dict[str, Any] = {"vectors": len(data), "dimension": data.shape[1], "queries": queries, "k": k}
+    with tempfile.TemporaryDirectory(prefix='vectorstore-bench-') as path:
+        store = VectorStore(path, data.shape[1])
+        started = time.perf_counter()
+        for start in range(0, len(data), 10000):
+            store.add(data[start:start + 10000])
+        results["add_seconds"] = round(time.perf_counter() - started, 3)
+        started = time.perf_counter()
+        store.train()
+        results["train_seconds"] = round(time.perf_counter() - started, 3)
+        started = time.perf_counter()
+        store.compact()
+        results["compact_seconds"] = round(time.perf_counter() - started, 3)
+        results["store"] = store.stats()
+
+        def measure(**options) -> Dict[str, Any]:
+            times, hits = [], 0
+            for query, expected in zip(queries_data, truth):
+                started = time.perf_counter()
+                found = store.search(query, k, **options)
+                times.append(time.perf_counter() - started)
+                hits += len(expected & {vector_id for vector_id, _ in found})
+            return dict(recall=round(hits / (k * len(truth)), 4), **_latency(times))
+
+        results["exact_float32"] = dict(recall=1.0, **_latency(exact_times))
+        results["exact_int8"] = measure(exact=True)
+        results["ivf"] = {nprobe: measure(nprobe=nprobe) for nprobe in nprobes
+                          if nprobe <= results["store"]["nlist"]}
+        store.close()
+    return results
+
+
+def _parse_args(args: List[str]) -> argparse.Namespace:
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        prog="mightydev.vectorstore",
+        description="Recall/latency benchmark of the vector store against exact search",
+    )
+    parser.add_argument("--count", type=int, default=100000, help="Synthetic vectors")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64, 128], help="IVF probes to measure")
+    parser.add_argument("--vectors", help=".npy file of real embeddings to use instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser.parse_args(args)
+
+
+def main() -> None:
+    """Run the benchmark and print the results as JSON."""
+    args = _parse_args(sys.argv[1:])
+    vectors = np.load(args.vectors) if args.vectors else None
+    results = benchmark(count=args.count, dimension=args.dimension, queries=args.queries, k=args.k,
+                        nprobes=args.nprobe, vectors=vectors, seed=args.seed)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
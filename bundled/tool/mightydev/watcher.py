@@ -0,0 +1,318 @@
+"""
+Filesystem watchers that drive incremental reindexing of the codebase index.
+
+InotifyWatcher uses Linux inotify through ctypes; PollingWatcher compares stat
+snapshots on an interval and works everywhere. Both feed raw events into a
+debouncer that coalesces them per path and hands batches of changed and
+removed paths (relative to the workspace root) to a callback once the
+workspace has been quiet for a short moment.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Set, Tuple
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Callback receiving (changed paths, removed paths); returns False to have the
+# batch delivered again later (e.g. while a full index holds the writer)
+ChangeCallback = Callable[[Set[str], Set[str]], bool]
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+               IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class FileWatcher:
+    """
+    Base class for watchers: debounces and coalesces events into batches.
+
+    Subclasses report events with _changed(path) and _removed(path), using paths
+    relative to the workspace root, from their own watch thread.
+    """
+
+    def __init__(self, workspace_root: str, on_change: ChangeCallback,
+                 should_watch_dir: Callable[[str], bool], debounce: float = 0.2,
+                 max_delay: float = 0.8):
+        """
+        Args:
+            workspace_root: Root directory to watch
+            on_change: Callback receiving (changed, removed) relative paths
+            should_watch_dir: Returns False for directory names to skip (e.g. node_modules)
+            debounce: Deliver a batch once no event arrived for this many seconds
+            max_delay: Deliver a batch at the latest this many seconds after its first event
+        """
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.on_change = on_change
+        self.should_watch_dir = should_watch_dir
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._pending: Dict[str, bool] = {}  # path -> True if changed, False if removed
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start watching"""
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._watch, name=f"{type(self).__name__}", daemon=True),
+            threading.Thread(target=self._dispatch, name="codebase-watch-dispatch", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Watching {self.workspace_root} for changes ({type(self).__name__})")
+
+    def stop(self):
+        """Stop watching and wait for the watcher threads to exit"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def _watch(self):
+        """Watch loop, implemented by subclasses"""
+        raise NotImplementedError
+
+    def _record(self, rel_path: str, changed: bool):
+        """Record an event; the latest event for a path wins"""
+        now = time.monotonic()
+        with self._pending_lock:
+            if not self._pending:
+                self._first_event = now
+            self._pending[rel_path] = changed
+            self._last_event = now
+
+    def _changed(self, rel_path: str):
+        self._record(rel_path, True)
+
+    def _removed(self, rel_path: str):
+        self._record(rel_path, False)
+
+    def _dispatch(self):
+        """Deliver coalesced batches once events settle"""
+        while not self._stop.wait(0.05):
+            now = time.monotonic()
+            with self._pending_lock:
+                if not self._pending:
+                    continue
+                if now - self._last_event < self.debounce and now - self._first_event < self.max_delay:
+                    continue
+                batch = self._pending
+                self._pending = {}
+
+            changed = {path for path, is_change in batch.items() if is_change}
+            removed = {path for path, is_change in batch.items() if not is_change}
+            try:
+                delivered = self.on_change(changed, removed)
+            except Exception as e:
+                logger.error(f"Error handling file changes: {e}")
+                delivered = True
+
+            if delivered is False:
+                # Put the batch back under any newer events and retry shortly
+                with self._pending_lock:
+                    batch.update(self._pending)
+                    self._pending = batch
+                    self._first_event = self._last_event = time.monotonic()
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(path, self.workspace_root)
+
+
+class InotifyWatcher(FileWatcher):
+    """Recursive watcher built on Linux inotify"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = -1
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> absolute directory path
+
+    @staticmethod
+    def available() -> bool:
+        """Whether inotify can be used on this platform"""
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            return hasattr(libc, 'inotify_init1')
+        except OSError:
+            return False
+
+    def _add_tree(self, root: str, report_files: bool):
+        """Watch a directory and its subdirectories, optionally reporting their files as changed"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                logger.warning(f"Cannot watch {directory}: {os.strerror(error)}")
+                continue
+            self._dirs[wd] = directory
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.should_watch_dir(entry.name):
+                                stack.append(entry.path)
+                        elif report_files:
+                            # Created before the watch was in place
+                            self._changed(self._rel(entry.path))
+            except OSError:
+                continue
+
+    def _drop_tree(self, root: str):
+        """Stop watching a directory that went away, and everything below it"""
+        prefix = root + os.sep
+        for wd, directory in list(self._dirs.items()):
+            if directory == root or directory.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def _watch(self):
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            logger.error(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+            return
+        try:
+            self._add_tree(self.workspace_root, report_files=False)
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._handle_events(data)
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+            self._dirs.clear()
+
+    def _handle_events(self, data: bytes):
+        """Translate raw inotify events into changed/removed paths"""
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; report every file so nothing is missed
+                logger.warning("inotify queue overflowed, rescanning workspace")
+                self._changed('.')
+                continue
+
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._drop_tree(directory)
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if not self.should_watch_dir(name):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path, report_files=True)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._drop_tree(path)
+                    self._removed(self._rel(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._changed(self._rel(path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._removed(self._rel(path))
+
+
+class PollingWatcher(FileWatcher):
+    """Portable watcher that compares stat snapshots of the workspace"""
+
+    def __init__(self, *args, interval: float = 1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int, int]]:
+        """Stat every file under the workspace, keyed by relative path"""
+        snapshot = {}
+        stack = [self.workspace_root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.should_watch_dir(entry.name):
+                                    stack.append(entry.path)
+                            else:
+                                st = entry.stat()
+                                snapshot[self._rel(entry.path)] = (st.st_size, st.st_mtime_ns, st.st_ino)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return snapshot
+
+    def _watch(self):
+        previous = self._snapshot()
+        while not self._stop.wait(self.interval):
+            current = self._snapshot()
+            for path, fingerprint in current.items():
+                if previous.get(path) != fingerprint:
+                    self._changed(path)
+            for path in previous.keys() - current.keys():
+                self._removed(path)
+            previous = current
+
+
+def create_watcher(workspace_root: str, on_change: ChangeCallback,
+                   should_watch_dir: Callable[[str], bool], **kwargs) -> FileWatcher:
+    """
+    Create the best watcher for this platform: inotify on Linux, polling elsewhere
+
+    Args:
+        workspace_root: Root directory to watch
+        on_change: Callback receiving (changed, removed) relative paths
+        should_watch_dir: Returns False for directory names to skip
+        **kwargs: Passed to the watcher (debounce, max_delay)
+
+    Returns:
+        An unstarted watcher
+    """
+    if InotifyWatcher.available():
+        return InotifyWatcher(workspace_root, on_change, should_watch_dir, **kwargs)
+    return PollingWatcher(workspace_root, on_change, should_watch_dir, **kwargs)
@@ -656,6 +656,80 @@ export class CrewAIExtension {
         };
     }
     
+    /**
+     * Subscribe to events pushed by the CrewAI server
+     *
+     * Keeps a connection open on which the server streams one JSON line per event,
+     * and reconnects after the server restarts until the subscription is disposed.
+     * @param topics Topics to receive; entries ending in "." match a prefix (e.g. "codebase_index.")
+     * @param listener Function to call with each event's topic and data
+     * @returns Function to end the subscription
+     */
+    public subscribe(topics: string[], listener: (event: string, data: any) => void): () => void {
+        const net = require('net');
+        let client: any;
+        let disposed = false;
+        let retryTimer: NodeJS.Timeout | undefined;
+
+        const connect = async () => {
+            const port = await this._getServerPort();
+            if (disposed) {
+                return;
+            }
+            client = new net.Socket();
+            let buffer = '';
+
+            client.connect(port, 'localhost', () => {
+                client.write(JSON.stringify({ command: 'subscribe', payload: { topics } }) + '\n');
+                traceDebug(`Subscribed to server events: ${topics.join(', ')}`);
+            });
+
+            client.on('data', (chunk: Buffer) => {
+                buffer += chunk.toString();
+                let newline = buffer.indexOf('\n');
+                while (newline !== -1) {
+                    const line = buffer.substring(0, newline).trim();
+                    buffer = buffer.substring(newline + 1);
+                    newline = buffer.indexOf('\n');
+                    if (!line) {
+                        continue;
+                    }
+                    try {
+                        const message = JSON.parse(line);
+                        // The first line acknowledges the subscription; heartbeats only keep it alive
+                        if (message.event && message.event !== 'heartbeat') {
+                            listener(message.event, message.data);
+                        }
+                    } catch (error) {
+                        traceError(`Error handling server event: ${error}. Line was: "${line}"`);
+                    }
+                }
+            });
+
+            client.on('error', (err: Error) => {
+                traceDebug(`Server event subscription error: ${err}`);
+            });
+
+            client.on('close', () => {
+                if (!disposed) {
+                    retryTimer = setTimeout(connect, 1000);
+                }
+            });
+        };
+
+        connect().catch((error) => traceError('Error subscribing to server events:', error));
+
+        return () => {
+            disposed = true;
+            if (retryTimer) {
+                clearTimeout(retryTimer);
+            }
+            if (client) {
+                client.destroy();
+            }
+        };
+    }
+
     /**
      * Dispose method to clean up resources
      */
@@ -52,6 +52,7 @@ export class ServerManager {
     private _notifications: Notification[] = [];
     private _eventListeners: Map<string, ((data: any) => void)[]> = new Map();
     private _notificationListeners: ((notifications: Notification[]) => void)[] = [];
+    private _unsubscribeEvents: (() => void) | undefined;
     
     constructor(private readonly _context: vscode.ExtensionContext) {
         this._crewAIExtension = new CrewAIExtension(this._context);
@@ -138,6 +139,10 @@ export class ServerManager {
      */
     public async stopServer(): Promise<void> {
         try {
+            if (this._unsubscribeEvents) {
+                this._unsubscribeEvents();
+                this._unsubscribeEvents = undefined;
+            }
             await this._crewAIExtension.stopServer();
             this._connected = false;
             this._addNotification({
@@ -174,51 +179,25 @@ export class ServerManager {
         this._crewAIExtension.onServerOutput((data: string) => {
             // Log all server output to help debugging
             traceInfo(`SERVER OUTPUT: ${data}`);
-            
-            // Check for progress update markers
-            if (data.includes('PROGRESS_UPDATE:')) {
-                try {
-                    // Extract the JSON data from the marker - only process the current line
-                    const startIdx = data.indexOf('PROGRESS_UPDATE:') + 'PROGRESS_UPDATE:'.length;
-                    // Find the end of the JSON (before any new line or debug markers)
-                    let endIdx = data.indexOf('\n', startIdx);
-                    if (endIdx === -1) endIdx = data.length;
-                    
-                    const jsonStr = data.substring(startIdx, endIdx).trim();
-                    
-                    traceInfo(`Found progress data: ${jsonStr}`);
-                    
-                    try {
-                        const progressData = JSON.parse(jsonStr);
-                        
-                        // No longer need to skip simulated progress as it's been removed
-                        // Just log the progress data
-                        traceInfo(`Processing progress update: ${JSON.stringify(progressData)}`);
-                        
-                        // Send progress update to the webview
-                        vscode.commands.executeCommand('crewPanelProvider.updateProgress', {
-                            type: 'CODEBASE_INDEX_PROGRESS',
-                            payload: progressData
-                        }).then(() => {
-                            traceInfo(`Successfully sent progress update to webview: ${JSON.stringify(progressData)}`);
-                        }, (error: Error) => {
-                            traceError(`Error sending progress update from server output: ${error}`);
-                        });
-                        
-                        // Log that we processed a progress update
-                        traceInfo(`Processed progress update: ${JSON.stringify(progressData)}`);
-                    } catch (jsonError) {
-                        traceError(`Error parsing JSON from progress update: ${jsonError}. String was: "${jsonStr}"`);
-                    }
-                } catch (error) {
-                    traceError(`Error processing progress update: ${error}`);
-                }
+        });
+        
+        // Indexing progress is pushed by the server, already limited to a few updates a second
+        if (this._unsubscribeEvents) {
+            this._unsubscribeEvents();
+        }
+        this._unsubscribeEvents = this._crewAIExtension.subscribe(['codebase_index.'], (event: string, data: any) => {
+            if (event !== 'codebase_index.progress') {
+                return;
             }
+            traceDebug(`Processing progress update: ${JSON.stringify(data)}`);
             
-            // Also check for DEBUG markers
-            if (data.includes('DEBUG_INDEXER:')) {
-                traceInfo(`DEBUG FROM INDEXER: ${data}`);
-            }
+            // Send progress update to the webview
+            vscode.commands.executeCommand('crewPanelProvider.updateProgress', {
+                type: 'CODEBASE_INDEX_PROGRESS',
+                payload: data
+            }).then(undefined, (error: Error) => {
+                traceError(`Error sending progress update to webview: ${error}`);
+            });
         });
     }
     
@@ -325,22 +325,25 @@ export class CodebaseIndexerTool implements Tool {
     examples = [
         '{ "action": "index", "force": false, "max_file_size": 1048576 }',
         '{ "action": "search", "query": "UserService", "symbol_type": "class", "language": "typescript" }',
+        '{ "action": "semantic_search", "query": "retry a failed HTTP request with backoff" }',
         '{ "action": "find_references", "symbol_name": "fetchData" }',
         '{ "action": "get_dependencies", "file_path": "src/services/api.ts" }',
-        '{ "action": "get_file_symbols", "file_path": "src/models/user.ts" }'
+        '{ "action": "transitive_dependents", "file_path": "src/services/api.ts" }',
+        '{ "action": "get_file_symbols", "file_path": "src/models/user.ts" }',
+        '{ "action": "import_snapshot", "path": ".tribe/codebase_index.snapshot" }'
     ];
 
     parameters = [
         {
             name: 'action',
             type: 'string',
-            description: 'The indexing action to perform (index, search, find_references, get_dependencies, get_file_symbols, etc.)',
+            description: 'The indexing action to perform (index, search, semantic_search, find_references, get_dependencies, get_file_symbols, status, metrics, job_status, cancel, export_snapshot, import_snapshot, etc.)',
             required: true
         },
         {
             name: 'query',
             type: 'string',
-            description: 'Search query for symbol names',
+            description: 'Search query for symbol names, or a description of the code for semantic_search',
             required: false
         },
         {
@@ -386,6 +389,37 @@ export class CodebaseIndexerTool implements Tool {
             type: 'number',
             description: 'Line number for location-based queries',
             required: false
+        },
+        {
+            name: 'fields',
+            type: 'array',
+            description: 'Fields to return for search, find_references and get_file_symbols (e.g. ["name", "path", "line_start"]); omit "code" to keep results small',
+            required: false
+        },
+        {
+            name: 'cursor',
+            type: 'string',
+            description: 'next_cursor from a previous result, to fetch the next page',
+            required: false
+        },
+        {
+            name: 'job_id',
+            type: 'string',
+            description: 'Indexing job returned by index, for job_status and cancel (defaults to the latest job)',
+            required: false
+        },
+        {
+            name: 'path',
+            type: 'string',
+            description: 'Snapshot file for export_snapshot and import_snapshot (defaults to .tribe/codebase_index.snapshot)',
+            required: false
+        },
+        {
+            name: 'compress',
+            type: 'boolean',
+            description: 'Compress the exported snapshot; an uncompressed one is memory-mapped as is',
+            required: false,
+            default: true
         }
     ];
     
@@ -406,12 +440,22 @@ export class CodebaseIndexerTool implements Tool {
                     return await this._performIndexing(params);
                 case 'search':
                     return await this._searchSymbols(params);
+                case 'semantic_search':
+                    return await this._callCrewAITool('codebase_index', {
+                        action: 'semantic_search',
+                        query: params.query,
+                        symbol_type: params.symbol_type,
+                        language: params.language
+                    });
                 case 'find_references':
                     return await this._findReferences(params);
                 case 'get_dependencies':
                     return await this._getDependencies(params);
                 case 'get_dependents':
                     return await this._getDependents(params);
+                case 'transitive_dependents':
+                case 'transitive_dependencies':
+                    return await this._getTransitive(action, params);
                 case 'get_file_symbols':
                     return await this._getFileSymbols(params);
                 case 'get_symbol_by_location':
@@ -420,6 +464,18 @@ export class CodebaseIndexerTool implements Tool {
                     return await this._clearIndex();
                 case 'status':
                     return await this._getStatus();
+                case 'metrics':
+                    return await this._callCrewAITool('codebase_index', { action: 'metrics' });
+                case 'job_status':
+                    return await this._callCrewAITool('codebase_index', { action: 'job_status', job_id: params.job_id });
+                case 'cancel':
+                    return await this._callCrewAITool('codebase_index', { action: 'cancel', job_id: params.job_id });
+                case 'export_snapshot':
+                    return await this._callCrewAITool('codebase_index', {
+                        action: 'export_snapshot', path: params.path, compress: params.compress
+                    });
+                case 'import_snapshot':
+                    return await this._callCrewAITool('codebase_index', { action: 'import_snapshot', path: params.path });
                 default:
                     return { error: `Unknown action: ${action}` };
             }
@@ -455,7 +511,7 @@ export class CodebaseIndexerTool implements Tool {
                 location: vscode.ProgressLocation.Notification,
                 title: "Indexing Codebase",
                 cancellable: true
-            }, async (progress, _token) => {
+            }, async (progress, token) => {
                 // Show the initial progress
                 progress.report({ 
                     message: "Starting indexing...",
@@ -491,16 +547,27 @@ export class CodebaseIndexerTool implements Tool {
                     }
                 };
                 
-                // Call the Python indexer with progress tracking
+                // Start a background indexing job on the Python side
                 // Force true to ensure a complete reindex
-                result = await this._callCrewAITool('codebase_index', {
+                const started = await this._callCrewAITool('codebase_index', {
                     action: 'index',
                     force: true, // Always force reindex when user requests it
                     max_file_size,
-                    with_progress: true,
-                    progress_callback: progressListener
+                    with_progress: true
+                });
+                if (started.status !== 'success' || !started.job_id) {
+                    result = started;
+                    return result;
+                }
+                
+                // Cancelling the notification cancels the job; batches already written are kept
+                token.onCancellationRequested(() => {
+                    this._callCrewAITool('codebase_index', { action: 'cancel', job_id: started.job_id })
+                        .catch((error: any) => traceError(`Error cancelling indexing job: ${error}`));
                 });
                 
+                // Wait for the job to finish; the server also pushes progress events to the webview
+                result = await this._waitForIndexJob(started.job_id, progressListener);
                 return result;
             });
 
@@ -509,7 +576,8 @@ export class CodebaseIndexerTool implements Tool {
                 result = await this._callCrewAITool('codebase_index', {
                     action: 'index',
                     force,
-                    max_file_size
+                    max_file_size,
+                    wait: true
                 });
             }
             
@@ -529,6 +597,28 @@ export class CodebaseIndexerTool implements Tool {
         }
     }
     
+    /**
+     * Poll a background indexing job until it finishes
+     */
+    private async _waitForIndexJob(jobId: string, onProgress: (data: any) => void): Promise<any> {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const status = await this._callCrewAITool('codebase_index', { action: 'job_status', job_id: jobId });
+            if (status.status !== 'success') {
+                return status;
+            }
+            
+            const job = status.job;
+            onProgress(job);
+            if (job.state === 'completed') {
+                return { status: 'success', message: 'Indexing completed successfully', job, index_status: status.index_status };
+            }
+            if (job.state === 'failed' || job.state === 'cancelled' || job.state === 'interrupted') {
+                return { status: 'error', message: job.error || `Indexing ${job.state}`, job, index_status: status.index_status };
+            }
+        }
+    }
+    
     /**
      * Send a progress update to the webview
      */
@@ -587,7 +677,7 @@ export class CodebaseIndexerTool implements Tool {
      * Search for symbols in the codebase
      */
     private async _searchSymbols(params: Record<string, any>): Promise<any> {
-        const { query, symbol_type, language, limit } = params;
+        const { query, symbol_type, language, limit, fields, cursor } = params;
         
         if (!query) {
             return { error: 'Query parameter is required' };
@@ -598,7 +688,9 @@ export class CodebaseIndexerTool implements Tool {
             query,
             symbol_type,
             language,
-            limit
+            limit,
+            fields,
+            cursor
         });
     }
     
@@ -606,7 +698,7 @@ export class CodebaseIndexerTool implements Tool {
      * Find references to a symbol
      */
     private async _findReferences(params: Record<string, any>): Promise<any> {
-        const { symbol_name, file_path } = params;
+        const { symbol_name, file_path, limit, fields, cursor } = params;
         
         if (!symbol_name) {
             return { error: 'symbol_name parameter is required' };
@@ -615,7 +707,10 @@ export class CodebaseIndexerTool implements Tool {
         return await this._callCrewAITool('codebase_index', {
             action: 'find_references',
             symbol_name,
-            file_path
+            file_path,
+            limit,
+            fields,
+            cursor
         });
     }
     
@@ -651,11 +746,27 @@ export class CodebaseIndexerTool implements Tool {
         });
     }
     
+    /**
+     * Get every file that a file depends on, or that depends on it, transitively
+     */
+    private async _getTransitive(action: string, params: Record<string, any>): Promise<any> {
+        const file_path = params.file_path || params.module_name;
+        
+        if (!file_path) {
+            return { error: 'file_path parameter is required' };
+        }
+        
+        return await this._callCrewAITool('codebase_index', {
+            action,
+            file_path
+        });
+    }
+    
     /**
      * Get symbols defined in a file
      */
     private async _getFileSymbols(params: Record<string, any>): Promise<any> {
-        const { file_path } = params;
+        const { file_path, limit, fields, cursor } = params;
         
         if (!file_path) {
             return { error: 'file_path parameter is required' };
@@ -663,7 +774,10 @@ export class CodebaseIndexerTool implements Tool {
         
         return await this._callCrewAITool('codebase_index', {
             action: 'get_file_symbols',
-            file_path
+            file_path,
+            limit,
+            fields,
+            cursor
         });
     }
     
@@ -0,0 +1,11 @@
+"""
+Shared setup for the tests of the bundled mightydev package.
+"""
+
+import pathlib
+import sys
+
+# The server and its mightydev package are bundled as plain modules, not installed
+TOOL_ROOT = pathlib.Path(__file__).parent.parent.parent.parent / "bundled" / "tool"
+if str(TOOL_ROOT) not in sys.path:
+    sys.path.insert(0, str(TOOL_ROOT))
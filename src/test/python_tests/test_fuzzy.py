@@ -0,0 +1,46 @@
+"""
+Tests for fuzzy symbol search on tables far larger than its candidate cap.
+"""
+
+import random
+
+import pytest
+from hamcrest import assert_that, is_
+from mightydev.indexer import FuzzySymbolTable
+
+WORDS = ["get", "set", "load", "save", "symbol", "by", "location", "list"]
+
+
+def _rows(count, seed=0):
+    """camelCase names built from a few shared words, so posting lists are long"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(2, 5))]
+        name = words[0] + "".join(w.capitalize() for w in words[1:]) + str(i)
+        rows.append((i, name, i // 50))
+    return rows
+
+
+@pytest.fixture
+def table():
+    """20k names with get_symbol_by_location added halfway through the second batch"""
+    rows = _rows(20000)
+    target = (len(rows), "get_symbol_by_location", 10**6)
+    table = FuzzySymbolTable(max_candidates=200)
+    table.replace_files([], rows[:10000])
+    table.replace_files([], rows[10000:15000] + [target] + rows[15000:])
+    return table
+
+
+@pytest.mark.parametrize("query", ["gSBL", "getSymbolByLocation", "get_symbol_by_loc"])
+def test_matches_beyond_the_candidate_cap_are_found(table, query):
+    """[user-004] Late-loaded names are scored despite long posting lists"""
+    assert_that(table.search(query, 5)[0][2], is_("get_symbol_by_location"))
+
+
+def test_exact_initials_survive_compaction(table):
+    """[user-004] Rebuilding the table keeps the exact-initials lookup"""
+    table.replace_files(range(0, 200), [])
+    table._compact()
+    assert_that(table.search("gSBL", 5)[0][2], is_("get_symbol_by_location"))
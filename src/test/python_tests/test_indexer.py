@@ -0,0 +1,254 @@
+"""
+Tests for the counters, the watcher fallback and the paginated queries of the codebase index.
+"""
+
+import shutil
+
+import pytest
+from hamcrest import assert_that, is_
+from mightydev.indexer import CodebaseIndexer, ResultPage
+
+FUNCTION = "def f():\n    pass\n"
+
+
+def _pages(fetch, **kwargs):
+    """Rows of every page of a paginated query, and the number of pages"""
+    rows = []
+    pages = 0
+    cursor = None
+    while True:
+        page = fetch(cursor=cursor, **kwargs)
+        rows.extend(page)
+        pages += 1
+        cursor = page.next_cursor
+        if not cursor:
+            return rows, pages
+
+
+def _table_counts(indexer):
+    files = indexer.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    symbols = indexer.conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+    return files, symbols
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("a.py", "b.py", "c.py", "sub/x.py", "sub/y.py"):
+        (tmp_path / name).write_text(FUNCTION)
+    return tmp_path
+
+
+@pytest.fixture
+def large_workspace(tmp_path):
+    for module in range(3):
+        lines = []
+        for i in range(20):
+            lines.append(f"def get_item_{i}(x):\n    return helper(x)\n")
+        (tmp_path / f"m{module}.py").write_text("\n".join(lines))
+    return tmp_path
+
+
+@pytest.fixture
+def indexer(workspace):
+    indexer = CodebaseIndexer(str(workspace))
+    indexer.index_workspace()
+    yield indexer
+    indexer.close()
+
+
+def test_counters_match_tables_after_indexing(indexer):
+    """The counters equal the table counts after a full pass."""
+    assert_that((indexer.file_count, indexer.symbol_count), is_(_table_counts(indexer)))
+    assert_that(indexer.file_count, is_(5))
+
+
+def test_removing_a_directory_and_its_files_counts_each_file_once(indexer, workspace):
+    """A directory reported along with the files in it removes each file once."""
+    shutil.rmtree(workspace / "sub")
+
+    assert_that(
+        indexer.reindex_paths([], ["sub", "sub/x.py", "sub/y.py", "sub/x.py"]),
+        is_(True),
+    )
+
+    assert_that((indexer.file_count, indexer.symbol_count), is_(_table_counts(indexer)))
+    assert_that(indexer.file_count, is_(3))
+
+
+def test_removing_unindexed_paths_leaves_counters_alone(indexer):
+    """Removing paths the index never had doesn't move the counters."""
+    indexer.reindex_paths([], ["missing.py", "gone/"])
+
+    assert_that((indexer.file_count, indexer.symbol_count), is_(_table_counts(indexer)))
+
+
+def test_status_recounts_drifted_counters(indexer):
+    """get_index_status replaces drifted counters with the table counts."""
+    indexer.file_count = 99
+    indexer._counts_checked = 0.0
+
+    status = indexer.get_index_status()
+
+    assert_that(status["file_count"], is_(5))
+    assert_that(indexer.file_count, is_(5))
+
+
+def test_counters_persist_across_restarts(indexer, workspace):
+    """A reopened index starts from the stored counters."""
+    (workspace / "a.py").unlink()
+    indexer.reindex_paths([], ["a.py"])
+    expected = _table_counts(indexer)
+    indexer.close()
+
+    reopened = CodebaseIndexer(str(workspace))
+    try:
+        assert_that((reopened.file_count, reopened.symbol_count), is_(expected))
+    finally:
+        reopened.close()
+
+
+def test_full_pass_fallback_asks_to_retry_while_indexing(indexer, workspace):
+    """[user-006] A "." batch is requeued, not dropped, while another run holds the writer"""
+    (workspace / "d.py").write_text(FUNCTION)
+    indexer.indexing_in_progress = True
+    assert_that(indexer.reindex_paths(["."]), is_(False))
+
+    indexer.indexing_in_progress = False
+    assert_that(indexer.reindex_paths(["."]), is_(True))
+    assert_that(_table_counts(indexer), is_((6, 6)))
+
+
+def test_full_pass_fallback_reports_a_failed_pass(indexer, monkeypatch):
+    """[user-006] A full pass that fails is reported so the watcher retries it"""
+
+    def fail(max_age=30.0):
+        raise OSError("scan failed")
+
+    monkeypatch.setattr(indexer.scanner, "take_snapshot", fail)
+    assert_that(indexer.reindex_paths([".gitignore"]), is_(False))
+    assert_that(indexer.indexing_in_progress, is_(False))
+
+
+@pytest.fixture
+def importing_workspace(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "util.py").write_text(
+        "class K:\n    def helper(self):\n        pass\n\n"
+        + "def helper(x):\n    return x\n"
+    )
+    (tmp_path / "main.py").write_text(
+        "from pkg.util import helper\n\ndef run():\n    return helper(1)\n"
+    )
+    return tmp_path
+
+
+def _helper_use(indexer):
+    """symbol_id of the use of helper in main.py, and the id of the function helper"""
+    (use,) = indexer.find_references("helper")
+    functions = [
+        row["id"]
+        for row in indexer.search_symbols("helper")
+        if row["type"] == "function"
+    ]
+    return use["symbol_id"], functions[0] if functions else None
+
+
+def test_imported_names_resolve_to_their_symbol(importing_workspace):
+    """[user-009] A use of an imported function points at it, not at a same-named method"""
+    indexer = CodebaseIndexer(str(importing_workspace))
+    indexer.index_workspace()
+    try:
+        use, function = _helper_use(indexer)
+        assert_that(use, is_(function))
+
+        # Rewriting the imported file gives its symbols new ids
+        (importing_workspace / "pkg" / "util.py").write_text(
+            "\n\ndef helper(x):\n    return x\n"
+        )
+        indexer.reindex_paths(["pkg/util.py"])
+        use, function = _helper_use(indexer)
+        assert_that(use, is_(function))
+
+        (importing_workspace / "pkg" / "util.py").unlink()
+        indexer.reindex_paths([], ["pkg/util.py"])
+        assert_that(_helper_use(indexer), is_((None, None)))
+    finally:
+        indexer.close()
+
+
+@pytest.fixture
+def large_indexer(large_workspace):
+    indexer = CodebaseIndexer(str(large_workspace))
+    indexer.index_workspace()
+    yield indexer
+    indexer.close()
+
+
+def test_search_pages_add_up_to_the_full_result(large_indexer):
+    """Paging through a search returns every row once, in the same order."""
+    fields = ["name", "path", "line_start"]
+    everything = large_indexer.search_symbols("get_item", limit=None, fields=fields)
+
+    rows, pages = _pages(
+        large_indexer.search_symbols, query="get_item", limit=7, fields=fields
+    )
+
+    assert_that(len(everything), is_(60))
+    assert_that(rows, is_(list(everything)))
+    assert_that(pages, is_(9))
+
+
+def test_reference_pages_add_up_to_the_full_result(large_indexer):
+    """Paging through references returns every reference once, in the same order."""
+    everything = large_indexer.find_references("helper", limit=None)
+
+    rows, _ = _pages(large_indexer.find_references, symbol_name="helper", limit=11)
+
+    assert_that(len(everything), is_(60))
+    assert_that(rows, is_(list(everything)))
+
+
+def test_file_symbol_pages_add_up_to_the_full_result(large_indexer):
+    """Paging through a file's symbols returns them in line order."""
+    rows, _ = _pages(
+        large_indexer.get_file_symbols,
+        file_path="m1.py",
+        limit=6,
+        fields=["name", "line_start"],
+    )
+
+    assert_that(
+        [row["name"] for row in rows], is_([f"get_item_{i}" for i in range(20)])
+    )
+    assert_that(
+        [row["line_start"] for row in rows],
+        is_(sorted(row["line_start"] for row in rows)),
+    )
+
+
+def test_projection_returns_only_the_requested_fields(large_indexer):
+    """A fields projection limits each row to those fields."""
+    page = large_indexer.search_symbols("get_item_3", limit=5, fields=["name", "path"])
+
+    assert_that(all(set(row) == {"name", "path"} for row in page), is_(True))
+
+
+def test_unknown_fields_and_bad_cursors_are_rejected(large_indexer):
+    """Unknown fields and malformed cursors raise ValueError."""
+    with pytest.raises(ValueError):
+        large_indexer.search_symbols("get_item", fields=["name", "nonsense"])
+    with pytest.raises(ValueError):
+        large_indexer.search_symbols("get_item", cursor="not-a-cursor")
+
+
+def test_result_pages_do_not_share_state():
+    """[user-011] Each page has its own sort keys and cursor."""
+    first, second = ResultPage(), ResultPage([{"name": "f"}])
+    first.sort_keys.append(("f", 1))
+    first.next_cursor = "abc"
+
+    assert_that(second.sort_keys, is_([]))
+    assert_that(second.next_cursor, is_(None))
+    assert_that(second, is_([{"name": "f"}]))
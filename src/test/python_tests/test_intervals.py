@@ -0,0 +1,78 @@
+"""
+Tests for the innermost-symbol interval index and its cache.
+"""
+
+import random
+
+import pytest
+from hamcrest import assert_that, is_
+from mightydev.intervals import IntervalCache, SymbolIntervals
+
+# (symbol id, first line, last line): a class with two methods, the first
+# holding a nested function, then a module-level variable
+NESTED = [(1, 1, 20), (2, 3, 10), (3, 5, 7), (4, 12, 18), (5, 22, 22)]
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        (0, None),
+        (1, 1),
+        (2, 1),
+        (3, 2),
+        (5, 3),
+        (7, 3),
+        (8, 2),
+        (11, 1),
+        (12, 4),
+        (19, 1),
+        (21, None),
+        (22, 5),
+        (100, None),
+    ],
+)
+def test_find_returns_the_innermost_symbol(line, expected):
+    """[user-015] Nested ranges resolve to the deepest symbol covering the line."""
+    intervals = SymbolIntervals(reversed(NESTED))
+    assert_that(intervals.find(line), is_(expected))
+
+
+def test_equal_spans_prefer_the_symbol_defined_last():
+    """[user-015] Of two symbols on the same lines, the later (nested) one wins."""
+    intervals = SymbolIntervals([(7, 30, 32), (6, 30, 32)])
+    assert_that(intervals.find(31), is_(7))
+
+
+def test_find_matches_a_linear_scan():
+    """[user-015] Random nested ranges agree with scanning every symbol."""
+    rng = random.Random(0)
+    rows = []
+    for symbol_id in range(1, 200):
+        start = rng.randint(1, 500)
+        rows.append((symbol_id, start, start + rng.choice([0, 1, 5, 30, 200])))
+
+    def innermost(line):
+        covering = [
+            (end - start, -symbol_id)
+            for symbol_id, start, end in rows
+            if start <= line <= end
+        ]
+        return -min(covering)[1] if covering else None
+
+    intervals = SymbolIntervals(rows)
+    for line in range(0, 760):
+        assert_that(intervals.find(line), is_(innermost(line)))
+
+
+def test_cache_drops_entries_loaded_before_an_invalidation():
+    """[user-015] A reader racing the writer does not store stale intervals."""
+    cache = IntervalCache(max_files=2)
+    generation = cache.generation
+    cache.invalidate(["a.py"])
+    cache.put("a.py", SymbolIntervals(NESTED), generation)
+    assert_that(cache.get("a.py"), is_(None))
+
+    for path in ("a.py", "b.py", "c.py"):
+        cache.put(path, SymbolIntervals(NESTED), cache.generation)
+    assert_that(cache.get("a.py"), is_(None))
+    assert_that(cache.get("c.py").find(5), is_(3))
@@ -0,0 +1,87 @@
+"""
+Tests for cancelling and resuming background indexing jobs.
+"""
+
+import pytest
+from hamcrest import assert_that, is_
+from mightydev.indexer import CodebaseIndexer
+from mightydev.jobs import CANCELLED, COMPLETED, INTERRUPTED, IndexJob
+
+FUNCTION = "def f():\n    pass\n"
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    for name in ("a.py", "b.py", "c.py"):
+        (tmp_path / name).write_text(FUNCTION)
+    return tmp_path
+
+
+def _file_count(indexer):
+    return indexer.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+def _start_blocked_job(indexer):
+    """Start a job that waits for the indexing run another caller holds"""
+    indexer.indexing_in_progress = True
+    job, started = indexer.start_index_job()
+    assert_that(started, is_(True))
+    return job
+
+
+def test_cancelled_job_is_not_resumed(workspace):
+    """[user-018] A cancelled job stops without indexing and leaves no checkpoint."""
+    indexer = CodebaseIndexer(str(workspace))
+    try:
+        job = _start_blocked_job(indexer)
+        indexer.cancel_index_job(job.id)
+        job.thread.join(5)
+
+        assert_that(job.state, is_(CANCELLED))
+        assert_that(_file_count(indexer), is_(0))
+        indexer.indexing_in_progress = False
+        assert_that(indexer.resume_index_job(), is_(None))
+    finally:
+        indexer.close()
+
+
+def test_interrupted_job_resumes_on_the_next_start(workspace):
+    """[user-018] A job stopped by shutdown keeps its checkpoint and completes after a restart."""
+    indexer = CodebaseIndexer(str(workspace))
+    job = _start_blocked_job(indexer)
+    indexer.close()
+    assert_that(job.state, is_(INTERRUPTED))
+
+    indexer = CodebaseIndexer(str(workspace))
+    try:
+        resumed = indexer.resume_index_job()
+        resumed.thread.join(30)
+
+        assert_that(resumed.id, is_(job.id))
+        assert_that(resumed.resumed, is_(True))
+        assert_that(resumed.state, is_(COMPLETED))
+        assert_that(_file_count(indexer), is_(3))
+        assert_that(indexer.resume_index_job(), is_(None))
+    finally:
+        indexer.close()
+
+
+def test_resumed_forced_job_skips_files_it_already_indexed(workspace):
+    """[user-018] Files indexed since a forced job was created are not reindexed on resume."""
+    indexer = CodebaseIndexer(str(workspace))
+    try:
+        job = IndexJob({"force": True})
+        indexer.index_workspace()
+        (workspace / "d.py").write_text(FUNCTION)
+        before = dict(indexer.conn.execute("SELECT path, indexed_time FROM files"))
+
+        indexer._set_job_checkpoint(job.checkpoint())
+        resumed = indexer.resume_index_job()
+        resumed.thread.join(30)
+
+        after = dict(indexer.conn.execute("SELECT path, indexed_time FROM files"))
+        assert_that(resumed.state, is_(COMPLETED))
+        assert_that(sorted(after), is_(["a.py", "b.py", "c.py", "d.py"]))
+        assert_that({path: after[path] for path in before}, is_(before))
+    finally:
+        indexer.close()
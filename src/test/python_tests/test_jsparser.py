@@ -0,0 +1,140 @@
+"""
+Tests for the JavaScript/TypeScript symbol extractor.
+"""
+
+from hamcrest import assert_that, has_item, is_
+from mightydev.jsparser import JsSymbol, parse_javascript
+
+SOURCE = """import { a } from './a';
+const fs = require("fs");
+// class Fake { }
+const s = "class Nope {";
+const re = /[{]/g;
+const t = `${x} { not a block`;
+
+export class Widget extends Base {
+  static count = 0;
+  constructor(el) {
+    this.el = el;
+  }
+  async render() {
+    return helper(this.el);
+  }
+}
+
+export function helper(x) {
+  return x + 1;
+}
+
+const arrow = (a, b) => a + b;
+
+interface Shape {
+  area(): number;
+}
+
+enum Color { Red, Green }
+"""
+
+
+def test_symbols_with_their_line_ranges():
+    """Classes, methods, functions, arrow functions, interfaces and enums are found with their lines."""
+    symbols, _, _ = parse_javascript(SOURCE)
+
+    assert_that(
+        symbols,
+        is_(
+            [
+                JsSymbol("Widget", "class", 8, 16, "", ""),
+                JsSymbol("constructor", "method", 10, 12, "constructor(el)", "Widget"),
+                JsSymbol("render", "method", 13, 15, "render()", "Widget"),
+                JsSymbol("helper", "function", 18, 20, "export function helper(x)", ""),
+                JsSymbol("arrow", "function", 22, 22, "const arrow = (a, b) =>", ""),
+                JsSymbol("Shape", "interface", 24, 26, "", ""),
+                JsSymbol("Color", "enum", 28, 28, "", ""),
+            ]
+        ),
+    )
+
+
+def test_imported_modules_in_order():
+    """Every import form contributes its module specifier, in source order."""
+    source = (
+        "import x, { y } from 'm1'\n"
+        'import * as z from "m2"\n'
+        "export { q } from './m3'\n"
+        "const w = require('m4')\n"
+        "import('m5')\n"
+    )
+
+    _, modules, _ = parse_javascript(source)
+
+    assert_that(modules, is_(["m1", "m2", "./m3", "m4", "m5"]))
+
+
+def test_references_with_line_and_column():
+    """Uses of identifiers are reported with 1-based lines and 0-based columns."""
+    _, _, references = parse_javascript(SOURCE)
+
+    assert_that(references, has_item(("helper", 14, 11)))
+    assert_that(references, has_item(("Base", 8, 28)))
+
+
+def test_braces_in_literals_and_comments_are_ignored():
+    """Braces inside strings, templates, regular expressions and comments don't open blocks."""
+    source = (
+        "const y = a / b; const r = /re}/.test(s);\n"
+        "const t = `a ${ {b: 1}.b } }`;\n"
+        "/* } */ const u = '}';\n"
+        "function after() {}\n"
+    )
+
+    symbols, _, _ = parse_javascript(source)
+
+    assert_that(
+        symbols, is_([JsSymbol("after", "function", 4, 4, "function after()", "")])
+    )
+
+
+def test_class_members_and_typescript_signatures():
+    """Property arrow functions and accessors are methods; declaration prefixes stay in the signature."""
+    source = (
+        "export default async function main(a: string): Promise<void> {\n"
+        "}\n"
+        "class A { private x = () => { return 1 }; get y() { return 2 } }\n"
+    )
+
+    symbols, _, _ = parse_javascript(source)
+
+    assert_that(
+        [(symbol.name, symbol.type, symbol.parent) for symbol in symbols],
+        is_(
+            [
+                ("main", "function", ""),
+                ("A", "class", ""),
+                ("x", "method", "A"),
+                ("y", "method", "A"),
+            ]
+        ),
+    )
+    assert_that(
+        symbols[0].signature, is_("export default async function main(a: string)")
+    )
+
+
+def test_deeply_nested_and_unterminated_code():
+    """Deep nesting and unclosed blocks don't raise."""
+    nested = (
+        "function outer() {\n"
+        + "{\n" * 5000
+        + "}\n" * 5000
+        + "}\nfunction after() {}\n"
+    )
+
+    symbols, _, _ = parse_javascript(nested)
+    broken, _, _ = parse_javascript("function broken() {\n  if (x) {\n")
+
+    assert_that(
+        [(symbol.name, symbol.line_start, symbol.line_end) for symbol in symbols],
+        is_([("outer", 1, 10002), ("after", 10003, 10003)]),
+    )
+    assert_that([symbol.name for symbol in broken], is_(["broken"]))
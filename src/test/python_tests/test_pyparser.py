@@ -0,0 +1,90 @@
+"""
+Tests for the single-pass Python symbol extractor.
+"""
+
+from hamcrest import assert_that, has_item, is_
+from mightydev.pyparser import PySymbol, parse_python
+
+SOURCE = '''import os
+from .util import helper
+
+LIMIT: int = 10
+a, *rest = 1, 2, 3
+
+
+class Foo:
+    """A foo."""
+
+    size: int = 0
+
+    async def fetch(self, url, *, timeout=None):
+        return await helper(url)
+
+    def bar(self):
+        def baz(x):
+            return os.path.join(x)
+
+        return baz(LIMIT)
+'''
+
+
+def _by_name(symbols):
+    return {symbol.name: symbol for symbol in symbols}
+
+
+def test_async_methods_keep_their_prefix():
+    """[user-014] async defs in a class are methods with an "async" signature."""
+    symbols, _, _ = parse_python(SOURCE)
+
+    assert_that(
+        _by_name(symbols)["fetch"],
+        is_(
+            PySymbol(
+                "fetch",
+                "method",
+                13,
+                14,
+                4,
+                32,
+                "async fetch(self, url, *, timeout)",
+                "",
+                "Foo",
+            )
+        ),
+    )
+
+
+def test_nested_functions_get_a_qualified_parent():
+    """[user-014] A function inside a method has the qualified method as parent."""
+    symbols, _, _ = parse_python(SOURCE)
+    by_name = _by_name(symbols)
+
+    assert_that(by_name["bar"].parent, is_("Foo"))
+    assert_that(by_name["baz"].type, is_("function"))
+    assert_that(by_name["baz"].parent, is_("Foo.bar"))
+    assert_that(by_name["baz"].signature, is_("baz(x)"))
+
+
+def test_module_level_assignments_are_variables():
+    """[user-014] Annotated and unpacking assignments at module level are variables."""
+    symbols, _, _ = parse_python(SOURCE)
+    variables = [
+        (symbol.name, symbol.signature, symbol.line_start)
+        for symbol in symbols
+        if symbol.type == "variable"
+    ]
+
+    # Class attributes are not module-level and stay out
+    assert_that(
+        variables,
+        is_([("LIMIT", "LIMIT: int", 4), ("a", "a", 5), ("rest", "rest", 5)]),
+    )
+
+
+def test_imports_and_references():
+    """[user-014] Imports keep relative dots; attribute loads are references."""
+    _, imports, references = parse_python(SOURCE)
+
+    assert_that(imports, is_(["os", ".util.helper"]))
+    assert_that(references, has_item(("join", 18, 27)))
+    assert_that(references, has_item(("LIMIT", 20, 19)))
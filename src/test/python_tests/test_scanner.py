@@ -0,0 +1,164 @@
+"""
+Tests for the gitignore handling of the workspace scanner.
+"""
+
+import pytest
+from hamcrest import assert_that, contains_inanyorder, is_
+from mightydev.scanner import IgnoreRules, WorkspaceScanner
+
+RULES = [
+    "# comment",
+    "*.log",
+    "!keep.log",
+    "build/",
+    "/dist",
+    "docs/**/*.md",
+    "**/gen",
+    "foo/**",
+    "a?c.py",
+    "[abc]x.py",
+    "[!z]y.py",
+    "\\#literal",
+    "trail\\ ",
+]
+
+
+@pytest.mark.parametrize(
+    "rel_path, is_dir, expected",
+    [
+        ("x.log", False, True),
+        ("sub/x.log", False, True),
+        ("keep.log", False, False),
+        ("build", True, True),
+        ("sub/build", True, True),
+        ("build", False, None),
+        ("dist", True, True),
+        ("sub/dist", True, None),
+        ("docs/a.md", False, True),
+        ("docs/x/y/a.md", False, True),
+        ("sub/docs/a.md", False, None),
+        ("gen", True, True),
+        ("x/y/gen", True, True),
+        ("foo/a/b", False, True),
+        ("foo", True, None),
+        ("abc.py", False, True),
+        ("a/c.py", False, None),
+        ("bx.py", False, True),
+        ("dx.py", False, None),
+        ("ay.py", False, True),
+        ("zy.py", False, None),
+        ("#literal", False, True),
+        ("# comment", False, None),
+        ("trail ", False, True),
+        ("trail", False, None),
+    ],
+)
+def test_gitignore_patterns(rel_path, is_dir, expected):
+    """Patterns follow gitignore: anchoring, "**", directory-only, negation, classes and escapes."""
+    assert_that(IgnoreRules(RULES).match(rel_path, is_dir), is_(expected))
+
+
+def test_last_matching_pattern_wins():
+    """A later pattern overrides an earlier one in either direction."""
+    rules = IgnoreRules(["*.py", "!keep.py", "keep.py"])
+
+    assert_that(rules.match("keep.py", False), is_(True))
+    assert_that(IgnoreRules(["*.py", "!keep.py"]).match("keep.py", False), is_(False))
+
+
+@pytest.mark.parametrize(
+    "rel_path, is_dir",
+    [("a.log", False), ("out", True), ("out", False), ("x/out/y.py", False)],
+)
+def test_combined_patterns_match_like_individual_ones(rel_path, is_dir):
+    """The single-regex fast path for rules without negations matches like the rules one by one."""
+    combined = IgnoreRules(["*.log", "out/", "/x/out/*.py"])
+    one_by_one = IgnoreRules(["*.log", "out/", "/x/out/*.py", "!never-matches"])
+
+    assert_that(
+        combined.match(rel_path, is_dir), is_(one_by_one.match(rel_path, is_dir))
+    )
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    files = {
+        ".gitignore": "*.log\nbuild/\n/vendor\n",
+        "main.py": "",
+        "debug.log": "",
+        "build/out.py": "",
+        "vendor/lib.py": "",
+        "src/vendor/lib.py": "",
+        "src/.gitignore": "generated_*.py\n!generated_keep.py\n",
+        "src/app.py": "",
+        "src/generated_a.py": "",
+        "src/generated_keep.py": "",
+        "src/deep/generated_b.py": "",
+        "notes/.tribeignore": "*\n",
+        "notes/todo.py": "",
+        "node_modules/pkg/index.js": "",
+        "web/app.js": "",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+@pytest.fixture
+def scanner(workspace):
+    return WorkspaceScanner(
+        str(workspace), {".py", ".js"}, lambda name: name != "node_modules"
+    )
+
+
+def test_scan_honours_nested_ignore_files(scanner):
+    """A scan prunes what the ignore files at every level exclude."""
+    found = [rel_path.replace("\\", "/") for _, rel_path, _, _ in scanner.scan().files]
+
+    assert_that(
+        found,
+        contains_inanyorder(
+            "main.py",
+            "src/vendor/lib.py",
+            "src/app.py",
+            "src/generated_keep.py",
+            "web/app.js",
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    "rel_path, expected",
+    [
+        ("main.py", False),
+        ("build/out.py", True),
+        ("vendor/lib.py", True),
+        ("src/vendor/lib.py", False),
+        ("src/generated_a.py", True),
+        ("src/deep/generated_b.py", True),
+        ("src/generated_keep.py", False),
+        ("notes/todo.py", True),
+    ],
+)
+def test_is_ignored_without_a_scan(scanner, rel_path, expected):
+    """is_ignored loads the ignore files of a path's directories on demand."""
+    assert_that(scanner.is_ignored(rel_path), is_(expected))
+
+
+def test_snapshot_is_reused_once(scanner):
+    """take_snapshot hands out the latest scan once, then scans again."""
+    snapshot = scanner.scan()
+
+    assert_that(scanner.take_snapshot() is snapshot, is_(True))
+    assert_that(scanner.take_snapshot() is snapshot, is_(False))
+
+
+def test_scans_made_by_take_snapshot_are_not_reused(scanner, workspace):
+    """[user-008] A file created after take_snapshot scanned is found by the next one."""
+    scanner.take_snapshot()
+    (workspace / "late.py").write_text("")
+
+    found = [rel_path for _, rel_path, _, _ in scanner.take_snapshot().files]
+    assert_that("late.py" in found, is_(True))
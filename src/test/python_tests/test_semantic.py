@@ -0,0 +1,37 @@
+"""
+Tests for the text that semantic search embeds for each symbol.
+"""
+
+import pytest
+from hamcrest import assert_that, is_
+from mightydev.semantic import _symbol_text
+
+
+@pytest.mark.parametrize(
+    "name, symbol_type, signature, parent, expected",
+    [
+        ("get", "method", "get(self, x)", "A", "method A.get(self, x)"),
+        ("top", "function", "top(a, *b)", "", "function top(a, *b)"),
+        ("VAL", "variable", "VAL: int", "", "variable VAL: int"),
+        ("A", "class", "", "", "class A"),
+        ("Inner", "class", "", "Outer", "class Outer.Inner"),
+        ("h", "function", "function h(x)", "", "function h(x)"),
+        ("x", "method", "private x = () =>", "W", "W.x: private x = () =>"),
+    ],
+)
+def test_declaration_names_the_symbol_once(
+    name, symbol_type, signature, parent, expected
+):
+    """The first line qualifies the symbol's name without repeating it."""
+    text = _symbol_text(name, symbol_type, signature, "", parent, "")
+
+    assert_that(text, is_(expected))
+
+
+def test_docstring_and_code_follow_the_declaration():
+    """The docstring and the start of the code come after the declaration, one per line."""
+    text = _symbol_text(
+        "get", "method", "get(self, x)", "Get x.", "A", "def get(self, x):"
+    )
+
+    assert_that(text, is_("method A.get(self, x)\nGet x.\ndef get(self, x):"))
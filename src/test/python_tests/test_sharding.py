@@ -0,0 +1,204 @@
+"""
+Tests for path globs in the sharded monorepo index.
+"""
+
+import os
+
+import pytest
+from hamcrest import assert_that, contains_inanyorder, is_
+from mightydev.indexer import CodebaseIndexer
+from mightydev.sharding import ShardedIndexer
+
+MODULE = "def get_thing(x):\n    return helper(x)\n\n\ndef helper(x):\n    return x\n"
+
+
+@pytest.fixture
+def monorepo(tmp_path):
+    for directory in ("packages/a", "packages/b", "tools"):
+        (tmp_path / directory).mkdir(parents=True)
+        for name in ("m0.py", "m1.py"):
+            (tmp_path / directory / name).write_text(MODULE)
+    (tmp_path / "top.py").write_text(MODULE)
+    return tmp_path
+
+
+@pytest.fixture
+def sharded(monorepo):
+    indexer = ShardedIndexer(str(monorepo))
+    indexer.index_workspace()
+    yield indexer
+    indexer.close()
+
+
+@pytest.fixture
+def single(monorepo, tmp_path_factory):
+    indexer = CodebaseIndexer(
+        str(monorepo), db_path=str(tmp_path_factory.mktemp("single") / "index.db")
+    )
+    indexer.index_workspace()
+    yield indexer
+    indexer.close()
+
+
+def _shard(sharded, prefix):
+    return next(shard for shard in sharded.shards if shard.prefix == prefix)
+
+
+def test_shards_follow_the_package_layout(sharded):
+    """Each package is a shard, and everything else is in the root shard."""
+    assert_that(
+        [shard.prefix for shard in sharded.shards],
+        contains_inanyorder(
+            "", os.path.join("packages", "a"), os.path.join("packages", "b")
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    "path_glob, expected",
+    [
+        (None, (True, None, False)),
+        ("packages/a/*.py", (True, "*.py", False)),
+        ("packages/a/sub/**", (True, "sub/**", False)),
+        ("packages/**", (True, None, True)),
+        ("*/a/*", (True, None, True)),
+        ("p*/b/*", (True, None, True)),
+        ("packages/?/m1.py", (True, None, True)),
+        ("packages/b/*", (False, None, False)),
+        ("tools/*", (False, None, False)),
+        ("packages/ab/*", (False, None, False)),
+    ],
+)
+def test_shard_glob_translation(sharded, path_glob, expected):
+    """Globs are rewritten for a shard, matched against workspace paths, or rule the shard out."""
+    shard = _shard(sharded, os.path.join("packages", "a"))
+
+    assert_that(sharded._shard_glob(shard, path_glob), is_(expected))
+
+
+def test_root_shard_keeps_the_glob(sharded):
+    """The root shard's paths are workspace paths already."""
+    assert_that(
+        sharded._shard_glob(_shard(sharded, ""), "*/a/*"), is_((True, "*/a/*", False))
+    )
+
+
+@pytest.mark.parametrize(
+    "path_glob",
+    [
+        "packages/**",
+        "*/a/*",
+        "p*/b/*",
+        "packages/a/*",
+        "packages/?/m1.py",
+        "*m1.py",
+        "tools/*",
+        "*",
+        "zz*",
+    ],
+)
+def test_sharded_glob_search_matches_a_single_index(sharded, single, path_glob):
+    """Glob-filtered searches return what one index of the whole workspace returns, page after page."""
+    expected = single.search_symbols(
+        "get_thing", limit=None, path_glob=path_glob, fields=["name", "path"]
+    )
+
+    rows = []
+    cursor = None
+    while True:
+        page = sharded.search_symbols(
+            "get_thing",
+            limit=2,
+            path_glob=path_glob,
+            fields=["name", "line_start"],
+            cursor=cursor,
+        )
+        assert_that(any("path" in row for row in page), is_(False))
+        rows.extend(page)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+
+    assert_that(len(rows), is_(len(expected)))
+    paths = [
+        row["path"]
+        for row in sharded.search_symbols("get_thing", limit=None, path_glob=path_glob)
+    ]
+    assert_that(paths, contains_inanyorder(*[row["path"] for row in expected]))
+
+
+@pytest.fixture
+def ignoring_monorepo(tmp_path):
+    files = {
+        ".gitignore": "generated/\n*.gen.py\npackages/c/\n",
+        "packages/.gitignore": "skip/\n",
+        "packages/a/m.py": MODULE,
+        "packages/a/generated/big.py": MODULE,
+        "packages/b/m.py": MODULE,
+        "packages/b/x.gen.py": MODULE,
+        "packages/b/skip/s.py": MODULE,
+        "packages/c/m.py": MODULE,
+        "top.py": MODULE,
+    }
+    for name, content in files.items():
+        path = tmp_path / "repo" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path / "repo"
+
+
+def _indexed_paths(indexer):
+    return sorted(
+        {
+            row["path"]
+            for row in indexer.search_symbols("get_thing", limit=None, fields=["path"])
+        }
+    )
+
+
+def test_sharded_index_honours_ignore_files_above_packages(ignoring_monorepo, tmp_path):
+    """Ignore files at the root and above a package apply inside its shard, as in a single index."""
+    sharded = ShardedIndexer(str(ignoring_monorepo))
+    single = CodebaseIndexer(
+        str(ignoring_monorepo), db_path=str(tmp_path / "single.db")
+    )
+    try:
+        sharded.index_workspace()
+        single.index_workspace()
+
+        assert_that(_indexed_paths(sharded), is_(_indexed_paths(single)))
+        assert_that(
+            _indexed_paths(sharded),
+            is_(
+                [
+                    os.path.join("packages", "a", "m.py"),
+                    os.path.join("packages", "b", "m.py"),
+                    "top.py",
+                ]
+            ),
+        )
+
+        # Changing the root ignore file re-scans the packages below it
+        (ignoring_monorepo / ".gitignore").write_text("*.gen.py\n")
+        sharded.reindex_paths([".gitignore"])
+        single.reindex_paths([".gitignore"])
+
+        assert_that(_indexed_paths(sharded), is_(_indexed_paths(single)))
+        assert_that(
+            os.path.join("packages", "a", "generated", "big.py")
+            in _indexed_paths(sharded),
+            is_(True),
+        )
+    finally:
+        sharded.close()
+        single.close()
+
+
+def test_snapshot_import_is_refused_while_indexing(sharded):
+    """A sharded snapshot import doesn't start while another run holds the index."""
+    with sharded.index_lock:
+        sharded.indexing_in_progress = True
+    try:
+        assert_that(sharded.import_snapshot(), is_(None))
+    finally:
+        sharded.indexing_in_progress = False
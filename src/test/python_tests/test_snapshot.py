@@ -0,0 +1,119 @@
+"""
+Tests for exporting the codebase index to a snapshot and seeding another index from it.
+"""
+
+import shutil
+
+import pytest
+from hamcrest import assert_that, is_
+from mightydev.indexer import CodebaseIndexer
+
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/util.py": "def helper(x):\n    return x\n\n\nclass Box:\n    def get(self):\n        return helper(1)\n",
+    "main.py": "from pkg.util import helper\n\n\ndef run():\n    return helper(2)\n",
+    "web/app.js": "import { a } from './a';\nexport function render(el) {\n  return a(el);\n}\n",
+    "web/a.js": "export function a(x) {\n  return x;\n}\n",
+}
+
+
+def _index_rows(indexer):
+    """Everything the index knows about the workspace, without machine-specific ids"""
+    conn = indexer.conn
+    return {
+        "files": sorted(
+            conn.execute("SELECT path, language, size, content_hash FROM files")
+        ),
+        "symbols": sorted(conn.execute("""
+                SELECT f.path, s.name, s.type, s.line_start, s.line_end,
+                       s.column_start, s.column_end, s.signature, s.docstring, s.parent
+                FROM symbols s JOIN files f ON s.file_id = f.id
+                """)),
+        "references": sorted(
+            conn.execute("""
+                SELECT f.path, r.line, r.column, r.name, tf.path, s.line_start
+                FROM symbol_references r
+                JOIN files f ON r.file_id = f.id
+                LEFT JOIN symbols s ON r.symbol_id = s.id
+                LEFT JOIN files tf ON s.file_id = tf.id
+                """),
+            key=repr,
+        ),
+        "dependencies": sorted(
+            conn.execute("""
+                SELECT f.path, d.target, tf.path
+                FROM dependencies d
+                JOIN files f ON d.source_file_id = f.id
+                LEFT JOIN files tf ON d.target_file_id = tf.id
+                """),
+            key=repr,
+        ),
+    }
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "origin"
+    for name, content in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return root
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_snapshot_round_trip(workspace, tmp_path, compress):
+    """[user-021] An index seeded from a snapshot matches one built by parsing."""
+    origin = CodebaseIndexer(str(workspace), db_path=str(tmp_path / "origin.db"))
+    origin.index_workspace()
+    snapshot_path = str(tmp_path / "index.snapshot")
+    info = origin.export_snapshot(snapshot_path, compress=compress)
+    expected = _index_rows(origin)
+    origin.close()
+    assert_that(info["file_count"], is_(len(FILES)))
+
+    clone = tmp_path / "clone"
+    shutil.copytree(str(workspace), str(clone))
+    seeded = CodebaseIndexer(str(clone), db_path=str(tmp_path / "clone.db"))
+    try:
+        counts = seeded.import_snapshot(snapshot_path)
+        assert_that(
+            counts,
+            is_({"imported": len(FILES), "unchanged": 0, "stale": 0, "missing": 0}),
+        )
+        assert_that(_index_rows(seeded), is_(expected))
+
+        # A following pass keeps what was imported
+        seeded.index_workspace()
+        assert_that(_index_rows(seeded), is_(expected))
+    finally:
+        seeded.close()
+
+
+def test_stale_and_missing_files_are_left_to_indexing(workspace, tmp_path):
+    """[user-021] Files that changed since the export are parsed, not imported."""
+    origin = CodebaseIndexer(str(workspace), db_path=str(tmp_path / "origin.db"))
+    origin.index_workspace()
+    snapshot_path = str(tmp_path / "index.snapshot")
+    origin.export_snapshot(snapshot_path)
+    origin.close()
+
+    clone = tmp_path / "clone"
+    shutil.copytree(str(workspace), str(clone))
+    (clone / "main.py").write_text(FILES["main.py"] + "\n\ndef extra():\n    pass\n")
+    (clone / "new.py").write_text("def fresh():\n    pass\n")
+
+    seeded = CodebaseIndexer(str(clone), db_path=str(tmp_path / "clone.db"))
+    parsed = CodebaseIndexer(str(clone), db_path=str(tmp_path / "parsed.db"))
+    try:
+        counts = seeded.import_snapshot(snapshot_path)
+        assert_that(
+            counts,
+            is_({"imported": len(FILES) - 1, "unchanged": 0, "stale": 1, "missing": 1}),
+        )
+        seeded.index_workspace()
+        parsed.index_workspace()
+        assert_that(_index_rows(seeded), is_(_index_rows(parsed)))
+    finally:
+        seeded.close()
+        parsed.close()
@@ -0,0 +1,127 @@
+"""
+Tests for the memory-mapped int8 vector store and its IVF index.
+"""
+
+import pytest
+from hamcrest import assert_that, greater_than_or_equal_to, is_, less_than
+
+np = pytest.importorskip("numpy")
+
+from mightydev import vectorstore  # noqa: E402
+
+DIMENSION = 32
+
+
+@pytest.fixture
+def data():
+    return vectorstore._clustered_dataset(6000, DIMENSION, 60, np.random.default_rng(1))
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "store")
+
+
+@pytest.fixture
+def store(store_path, data):
+    store = vectorstore.VectorStore(
+        store_path, DIMENSION, segment_rows=2000, train_min_rows=1000
+    )
+    store.add(data)
+    yield store
+    store.close()
+
+
+def _top_ids(results):
+    return [vector_id for vector_id, _ in results]
+
+
+def test_quantization_error_is_within_half_a_step(data):
+    """Each int8 component is within half a quantization step of the float value."""
+    quantized, scales = vectorstore.quantize(data)
+
+    error = np.abs(quantized * scales[:, None] - data) / scales[:, None]
+
+    assert_that(float(error.max()), less_than(0.5 + 1e-4))
+
+
+def test_exact_search_finds_the_vector_itself(store, data):
+    """A stored vector is its own best match."""
+    assert_that(len(store), is_(6000))
+    assert_that(_top_ids(store.search(data[123], 5, exact=True))[0], is_(123))
+
+
+def test_delete_and_replace(store, data):
+    """Deleted ids drop out of results, and adding an existing id replaces its vector."""
+    assert_that(store.delete([123, 124, 999999]), is_(2))
+    assert_that(
+        set(_top_ids(store.search(data[123], 10, exact=True))) & {123, 124}, is_(set())
+    )
+
+    store.add(data[5:6], ids=[6])
+
+    assert_that(set(_top_ids(store.search(data[5], 2, exact=True))), is_({5, 6}))
+    assert_that(len(store), is_(5998))
+
+
+def test_ivf_search_recalls_exact_results(store, data):
+    """After training, probing the IVF lists finds most of the exact top 10."""
+    assert_that(store.train(), greater_than_or_equal_to(1))
+    store.compact(deleted_ratio=0.0)
+    queries = data[np.random.default_rng(2).choice(len(data), 50, replace=False)]
+
+    found = 0
+    for query in queries:
+        exact = set(_top_ids(store.search(query, 10, exact=True)))
+        found += len(exact & set(_top_ids(store.search(query, 10))))
+
+    assert_that(found / (10 * len(queries)), greater_than_or_equal_to(0.9))
+    # Compaction clusters the sealed segments; the active one is scored in full
+    sealed = sum(1 for segment in store._segments if segment.sealed)
+    assert_that(sealed, greater_than_or_equal_to(2))
+    assert_that(store.stats()["clustered_segments"], is_(sealed))
+
+
+def test_compaction_drops_tombstones(store, data):
+    """Compaction removes deleted rows without changing results."""
+    store.delete(list(range(0, 1500)))
+    before = _top_ids(store.search(data[2000], 10, exact=True))
+
+    store.compact(deleted_ratio=0.2)
+
+    stats = store.stats()
+    assert_that(stats["deleted"], is_(0))
+    assert_that(stats["live"], is_(4500))
+    assert_that(_top_ids(store.search(data[2000], 10, exact=True)), is_(before))
+
+
+def test_reopened_store_keeps_vectors_and_deletes(store, store_path, data):
+    """Vectors, deletes and the IVF index survive a reopen."""
+    store.train()
+    store.delete([7])
+    expected = store.search(data[42], 10)
+    store.close()
+
+    reopened = vectorstore.VectorStore(store_path, DIMENSION, segment_rows=2000)
+    try:
+        assert_that(len(reopened), is_(5999))
+        assert_that(7 in _top_ids(reopened.search(data[7], 10, exact=True)), is_(False))
+        assert_that(_top_ids(reopened.search(data[42], 10)), is_(_top_ids(expected)))
+    finally:
+        reopened.close()
+
+
+def test_torn_append_is_discarded_on_open(store, store_path, data):
+    """A partial row left by a crash mid-append is ignored when the store is reopened."""
+    active = store._segments[-1]
+    store.close()
+    with open(store._file(active.number, "vectors"), "ab") as f:
+        f.write(b"\x01" * 10)
+
+    reopened = vectorstore.VectorStore(store_path, DIMENSION, segment_rows=2000)
+    try:
+        assert_that(len(reopened), is_(6000))
+        reopened.add(data[:1])
+        assert_that(len(reopened), is_(6001))
+    finally:
+        reopened.close()